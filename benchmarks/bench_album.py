@@ -0,0 +1,154 @@
+"""Benchmark gallery posts: separate photos versus one album.
+
+Runs the real telegram.Bot against FakeBotAPI. Each uploaded image costs
+``--upload`` seconds on top of the round trip, whether it is uploaded on
+its own or inside a media group request. Compares
+
+* separate: one sendPhoto with the button per image (the old behaviour),
+* album: one sendMediaGroup uploading every file, plus the button message,
+* pre-uploaded: parallel uploads to a staging chat, then the album by
+  file_id; a second post of the same images skips the uploads entirely.
+* cached without a staging chat: the album uploads every file once and
+  keeps the file_ids Telegram returns, so a second post reuses them.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from PIL import Image
+from telegram import Bot
+
+from benchmarks.fake_api import FakeBotAPI
+from post_buddy.file_id_cache import FileIdCache
+from post_buddy.sender import send_album_post, send_button_post
+
+
+class UploadCostAPI(FakeBotAPI):
+    """FakeBotAPI where every uploaded file adds a fixed delay"""
+
+    def __init__(self, rtt, upload):
+        super().__init__(rtt)
+        self.upload = upload
+
+    async def do_request(self, url, method, request_data=None, *args, **kwargs):
+        if request_data is not None and request_data.contains_files:
+            files = len(request_data.multipart_data or {})
+            await asyncio.sleep(files * self.upload)
+        return await super().do_request(url, method, request_data, *args, **kwargs)
+
+
+def make_images(directory, count):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"image_{i}.jpg")
+        Image.new("RGB", (64, 64), (i * 20 % 256, 0, 0)).save(path)
+        paths.append(path)
+    return paths
+
+
+async def timed(api, coroutine):
+    api.api_calls.clear()
+    started = time.perf_counter()
+    await coroutine
+    elapsed = time.perf_counter() - started
+    calls = sum(n for method, n in api.api_calls.items() if method != "getMe")
+    return elapsed, calls
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--rtt", type=float, default=0.1)
+    parser.add_argument("--upload", type=float, default=0.3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_images(directory, args.images)
+        api = UploadCostAPI(args.rtt, args.upload)
+        async with Bot("1:fake", request=api, get_updates_request=api) as bot:
+
+            async def separate():
+                for path in paths:
+                    await send_button_post(
+                        bot, "@channel", "post", "https://x.test", "Go", path
+                    )
+
+            cache = FileIdCache(os.path.join(directory, "file_ids.json"))
+            inline_cache = FileIdCache(os.path.join(directory, "inline_ids.json"))
+            runs = [
+                ("separate photos", separate()),
+                (
+                    "album, uploaded inline",
+                    send_album_post(
+                        bot, "@channel", "post", "https://x.test", "Go", paths
+                    ),
+                ),
+                (
+                    "album, parallel pre-upload",
+                    send_album_post(
+                        bot,
+                        "@channel",
+                        "post",
+                        "https://x.test",
+                        "Go",
+                        paths,
+                        cache,
+                        staging_chat="@staging",
+                    ),
+                ),
+                (
+                    "album, file_ids cached",
+                    send_album_post(
+                        bot,
+                        "@channel",
+                        "post",
+                        "https://x.test",
+                        "Go",
+                        paths,
+                        cache,
+                        staging_chat="@staging",
+                    ),
+                ),
+                (
+                    "album, no staging, first",
+                    send_album_post(
+                        bot,
+                        "@channel",
+                        "post",
+                        "https://x.test",
+                        "Go",
+                        paths,
+                        inline_cache,
+                    ),
+                ),
+                (
+                    "album, no staging, cached",
+                    send_album_post(
+                        bot,
+                        "@channel",
+                        "post",
+                        "https://x.test",
+                        "Go",
+                        paths,
+                        inline_cache,
+                    ),
+                ),
+            ]
+            print(
+                f"{args.images} images, {args.rtt * 1000:.0f} ms round trip, "
+                f"{args.upload * 1000:.0f} ms per uploaded image"
+            )
+            for name, coroutine in runs:
+                elapsed, calls = await timed(api, coroutine)
+                print(f"{name:28} {elapsed:6.2f}s  {calls:3d} API calls")
+            cache.flush()
+            with open(cache.path) as f:
+                print("cached file_ids:", len(json.load(f)))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+"""Load test: many admins creating posts at the same time.
+
+Every simulated admin walks through /start -> insert_post -> select URL ->
+select label -> skip_text -> add_image -> photo -> confirm_post. All steps of all
+admins are queued at once (each admin's steps in order), so the run only
+completes if every user's updates are processed in order. sendPhoto is
+made slow to show whether one admin's upload holds up everybody else.
+
+With --metrics the mean time per handler and per Bot API method is printed
+after each run, as recorded by post_buddy.metrics.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.fake_api import (
+    FakeBotAPI,
+    callback_update,
+    command_update,
+    percentile,
+    photo_update,
+)
+from post_buddy import callbacks, metrics
+from post_buddy.delivery import RetryingRequest
+
+CHANNEL_ID = -100500
+
+
+def flow(api, bot_module, user_id):
+    url_id = bot_module.urls_and_labels["urls"].id_of("https://example.com")
+    label_id = bot_module.urls_and_labels["labels"].id_of("Open")
+    return [
+        command_update(api, user_id, "/start"),
+        callback_update(api, user_id, "insert_post"),
+        callback_update(api, user_id, callbacks.encode(callbacks.SELECT_URL, url_id)),
+        callback_update(
+            api, user_id, callbacks.encode(callbacks.SELECT_LABEL, label_id)
+        ),
+        callback_update(api, user_id, "skip_text"),
+        callback_update(api, user_id, "add_image"),
+        photo_update(api, user_id),
+        callback_update(api, user_id, "confirm_post"),
+    ]
+
+
+async def run(bot_module, workers, args):
+    api = FakeBotAPI(rtt=args.rtt, method_latency={"sendPhoto": args.send_latency})
+    builder = (
+        bot_module.Application.builder()
+        .token("123456:fake")
+        .request(RetryingRequest(api) if args.metrics else api)
+        .get_updates_request(api)
+    )
+    application = bot_module.build_application(builder, workers=workers)
+    await application.initialize()
+    await api.initialize()
+    await application.updater.start_polling(poll_interval=0, timeout=10)
+    await application.start()
+
+    users = range(2000, 2000 + args.admins)
+    for user_id in users:
+        await bot_module.permissions.add_admin(user_id)
+    flows = {user_id: flow(api, bot_module, user_id) for user_id in users}
+
+    started = time.perf_counter()
+    waiters = []
+    for step in range(len(next(iter(flows.values())))):
+        for user_id, updates in flows.items():
+            waiters.append((user_id, started, api.expect_reply(user_id)))
+            api.push_update(updates[step])
+
+    finished = {}
+    timed_out = 0
+    for user_id, _, waiter in waiters:
+        try:
+            finished[user_id] = await asyncio.wait_for(waiter, timeout=args.timeout)
+        except asyncio.TimeoutError:
+            timed_out += 1
+    elapsed = time.perf_counter() - started
+
+    await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+
+    posts = sum(1 for _, _, chat_id in api.replies if str(chat_id) == str(CHANNEL_ID))
+    flow_times = [done - started for done in finished.values()]
+    print(
+        f"workers={workers:<3} {args.admins} flows in {elapsed:.2f}s "
+        f"({args.admins / elapsed:.1f} flows/s, "
+        f"{len(waiters) / elapsed:.1f} updates/s)  "
+        f"flow p50 {percentile(flow_times, 0.5):.2f}s "
+        f"p99 {percentile(flow_times, 0.99):.2f}s  "
+        f"posts {posts}/{args.admins}  missing replies {timed_out}"
+    )
+    if args.metrics:
+        print_means(metrics.HANDLER_SECONDS)
+        print_means(metrics.API_REQUEST_SECONDS)
+
+
+def print_means(histogram):
+    """Print and reset the mean of every series of a histogram, slowest first"""
+    summary = histogram.summary()
+    histogram.reset()
+    for (label,), (count, total) in sorted(
+        summary.items(), key=lambda item: -item[1][1] / item[1][0]
+    ):
+        print(f"    {label:28} {count:6} calls  mean {total / count * 1000:8.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--admins", type=int, default=20)
+    parser.add_argument("--rtt", type=float, default=0.02, help="API round trip (s)")
+    parser.add_argument("--send-latency", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument(
+        "--metrics", action="store_true", help="print handler and API latencies"
+    )
+    args = parser.parse_args()
+
+    # Keep the benchmark away from the real database and rate limits
+    os.environ["STORE_FILE"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["CHANNEL_IDS"] = str(CHANNEL_ID)
+    os.environ["PER_CHAT_RATE"] = os.environ["GLOBAL_RATE"] = "100000"
+    import telegram_post_buddy_bot
+
+    telegram_post_buddy_bot.urls_and_labels["urls"].add("https://example.com")
+    telegram_post_buddy_bot.urls_and_labels["labels"].add("Open")
+
+    for workers in args.workers:
+        await run(telegram_post_buddy_bot, workers, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
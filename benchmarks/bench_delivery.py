@@ -0,0 +1,91 @@
+"""Benchmark sends under flood control and flaky networking.
+
+Runs the real telegram.Bot against FakeBotAPI with injected failures: a
+share of requests is answered with HTTP 429 and a retry_after, and a
+share times out. Sends the same posts with the plain request and with
+RetryingRequest and reports how many went through and what it cost.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from telegram import Bot
+from telegram.error import TimedOut
+
+from benchmarks.fake_api import FakeBotAPI
+from post_buddy.delivery import RetryingRequest
+from post_buddy.fanout import fan_out
+
+
+class FlakyAPI(FakeBotAPI):
+    def __init__(self, rtt, flood_rate, timeout_rate, retry_after, seed):
+        super().__init__(rtt)
+        self.flood_rate = flood_rate
+        self.timeout_rate = timeout_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+
+    async def do_request(self, url, method, request_data=None, *args, **kwargs):
+        if url.endswith(("sendMessage", "sendPhoto")):
+            roll = self._random.random()
+            if roll < self.flood_rate:
+                await asyncio.sleep(self.rtt)
+                body = {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests",
+                    "parameters": {"retry_after": self.retry_after},
+                }
+                return 429, json.dumps(body).encode()
+            if roll < self.flood_rate + self.timeout_rate:
+                await asyncio.sleep(self.rtt)
+                raise TimedOut()
+        return await super().do_request(url, method, request_data, *args, **kwargs)
+
+
+async def run(request, api, channels):
+    async with Bot("1:fake", request=request, get_updates_request=api) as bot:
+
+        async def send(channel):
+            return await bot.send_message(chat_id=channel, text="post")
+
+        started = time.perf_counter()
+        results = await fan_out(send, channels, concurrency=20)
+        elapsed = time.perf_counter() - started
+    failed = sum(isinstance(result, Exception) for _, result in results)
+    return len(results) - failed, failed, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sends", type=int, default=200)
+    parser.add_argument("--rtt", type=float, default=0.05)
+    parser.add_argument("--flood-rate", type=float, default=0.1)
+    parser.add_argument("--timeout-rate", type=float, default=0.05)
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+
+    channels = [f"@channel_{i}" for i in range(args.sends)]
+    print(
+        f"{args.sends} sends, {args.flood_rate:.0%} flood waits of "
+        f"{args.retry_after}s, {args.timeout_rate:.0%} timeouts"
+    )
+    for name, wrap in (("plain", False), ("retrying", True)):
+        api = FlakyAPI(
+            args.rtt, args.flood_rate, args.timeout_rate, args.retry_after, seed=1
+        )
+        request = RetryingRequest(api, base_delay=0.1) if wrap else api
+        sent, failed, elapsed = await run(request, api, channels)
+        print(f"{name:9} sent {sent:4d}, failed {failed:4d} in {elapsed:.2f}s")
+        if wrap:
+            print(
+                "          "
+                + ", ".join(f"{k}={v}" for k, v in sorted(request.stats.items()))
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
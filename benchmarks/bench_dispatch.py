@@ -0,0 +1,173 @@
+"""Micro-benchmark of callback dispatch and keyboard construction.
+
+"before" replays the original button_handler if/elif chain (string equality
+and startswith tests evaluated top to bottom) on the old callback_data
+format; "after" resolves the new callback_data through CallbackRouter.
+Keyboards are compared by building them per call versus reusing a
+KeyboardCache entry. Permission checks compare the original getenv and
+string comparison per call with a Permissions set lookup.
+"""
+
+import argparse
+import asyncio
+import os
+import timeit
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from post_buddy import callbacks
+from post_buddy.keyboards import KeyboardCache
+from post_buddy.permissions import ADMIN, Permissions
+from post_buddy.registry import Registry
+from post_buddy.router import CallbackRouter
+from post_buddy.storage import Store
+
+# Branch order of the original button_handler
+EXACT_BEFORE = [
+    ("manage_admins", None),
+    ("view_admins", None),
+    ("remove_admin:", "prefix"),
+    ("add_admin", None),
+    ("manage_urls", None),
+    ("view_urls", None),
+    ("view_labels", None),
+    ("edit_url:", "prefix"),
+    ("edit_label:", "prefix"),
+    ("delete_url:", "prefix"),
+    ("delete_label:", "prefix"),
+    ("add_url", None),
+    ("add_label", None),
+    ("back_to_main", None),
+    ("insert_post", None),
+    ("url:", "prefix"),
+    ("label:", "prefix"),
+    ("add_text", None),
+    ("skip_text", None),
+    ("add_image", None),
+    ("skip_image", None),
+    ("new_url", None),
+    ("new_label", None),
+    ("confirm_post", None),
+    ("cancel_post", None),
+]
+
+
+def dispatch_before(data):
+    """Equivalent of the original if/elif chain"""
+    for name, kind in EXACT_BEFORE:
+        if kind == "prefix":
+            if data.startswith(name):
+                return name, data.replace(name, "")
+        elif data == name:
+            return name, None
+    return None, None
+
+
+def is_admin_before(user_id, admins):
+    """Equivalent of the original is_admin"""
+    return str(user_id) in admins or str(user_id) == os.getenv("OWNER_ID")
+
+
+def handler(name):
+    return name
+
+
+def build_router():
+    routes = {name: handler for name, kind in EXACT_BEFORE if kind is None}
+    opcodes = {opcode: handler for opcode in callbacks.OPCODES}
+    return CallbackRouter(routes, opcodes)
+
+
+def main_menu_keyboard():
+    return InlineKeyboardMarkup(
+        [
+            [InlineKeyboardButton("Manage Admins", callback_data="manage_admins")],
+            [InlineKeyboardButton("Manage URLs & Labels", callback_data="manage_urls")],
+            [InlineKeyboardButton("Insert Post", callback_data="insert_post")],
+        ]
+    )
+
+
+def url_keyboard(registry):
+    return InlineKeyboardMarkup(
+        [
+            [
+                InlineKeyboardButton(
+                    url, callback_data=callbacks.encode(callbacks.SELECT_URL, url_id)
+                )
+            ]
+            for url_id, url in registry.items()
+        ]
+    )
+
+
+def measure(label, statement, number):
+    seconds = min(timeit.repeat(statement, number=number, repeat=5))
+    print(f"{label:48} {seconds / number * 1e6:9.3f} µs/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--urls", type=int, default=50)
+    parser.add_argument("--admins", type=int, default=50)
+    args = parser.parse_args()
+
+    router = build_router()
+    old_samples = ["manage_admins", "cancel_post", "label:Play", "delete_url:x.com"]
+    new_samples = [
+        "manage_admins",
+        "cancel_post",
+        callbacks.encode(callbacks.SELECT_LABEL, 12),
+        callbacks.encode(callbacks.DELETE_URL, 345),
+    ]
+    for old, new in zip(old_samples, new_samples):
+        measure(f"before  {old}", lambda: dispatch_before(old), args.number)
+        measure(f"after   {new}", lambda: router.resolve(new), args.number)
+
+    os.environ.setdefault("OWNER_ID", "1")
+    admins = {str(user_id) for user_id in range(1000, 1000 + args.admins)}
+    store = Store(":memory:")
+    permissions = Permissions(store, os.environ["OWNER_ID"])
+
+    async def add_admins():
+        for user_id in admins:
+            await permissions.add_admin(int(user_id))
+
+    asyncio.run(add_admins())
+    # A user who is not an admin walks every check
+    measure(
+        f"before  admin check, {args.admins} admins",
+        lambda: is_admin_before(42, admins),
+        args.number,
+    )
+    measure(
+        f"after   admin check, {args.admins} admins",
+        lambda: permissions.has(42, ADMIN),
+        args.number,
+    )
+    store.close()
+
+    measure("main menu keyboard, built per call", main_menu_keyboard, args.number)
+    main_menu = main_menu_keyboard()
+    measure("main menu keyboard, prebuilt", lambda: main_menu, args.number)
+
+    registry = Registry(
+        (i, f"https://example.com/{i}", 0) for i in range(1, args.urls + 1)
+    )
+    cache = KeyboardCache()
+    number = max(1, args.number // 20)
+    measure(
+        f"{args.urls} URL keyboard, built per call",
+        lambda: url_keyboard(registry),
+        number,
+    )
+    measure(
+        f"{args.urls} URL keyboard, cached",
+        lambda: cache.get("urls", registry.version, lambda: url_keyboard(registry)),
+        number,
+    )
+
+
+if __name__ == "__main__":
+    main()
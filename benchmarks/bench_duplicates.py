@@ -0,0 +1,155 @@
+"""Repeated "Confirm & Send" taps must post exactly once.
+
+Several admins prepare a post each, then every admin's confirmation arrives
+many times at once. The first run uses the update processor
+build_application installs for ``--workers``. The other two process
+updates fully concurrently (as with concurrent_updates(True) or a webhook
+redelivering callbacks), so all the copies reach confirm_post while the
+first is still sending: once with the duplicate guard disabled and once
+with it enabled. Posts reaching the channel are counted; with the guard
+every admin must have exactly one, and the duplicates must not cost any
+Bot API calls beyond answering the callback.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from telegram import Update
+from telegram.ext import TypeHandler
+
+from benchmarks.fake_api import FakeBotAPI, callback_update, command_update
+from post_buddy import callbacks, metrics
+from post_buddy.idempotency import IdempotencyCache
+
+CHANNEL_ID = -100500
+
+
+async def run(bot_module, args, guard, concurrent):
+    api = FakeBotAPI(rtt=args.rtt)
+    builder = (
+        bot_module.Application.builder()
+        .token("123456:fake")
+        .request(api)
+        .get_updates_request(api)
+    )
+    if concurrent:
+        builder = builder.concurrent_updates(True)
+        application = bot_module.build_application(builder)
+    else:
+        application = bot_module.build_application(builder, workers=args.workers)
+    handled = Counter()
+
+    async def count_update(update, context):
+        handled["updates"] += 1
+
+    # Counts every update as it is processed, ahead of the bot's handlers
+    application.add_handler(TypeHandler(Update, count_update), group=-1)
+    await application.initialize()
+    await api.initialize()
+    await application.updater.start_polling(poll_interval=0, timeout=10)
+    await application.start()
+    # A zero ttl forgets every confirmation at once, disabling the guard
+    bot_module.sent_posts = IdempotencyCache(args.ttl if guard else 0)
+
+    url_id = bot_module.urls_and_labels["urls"].id_of("https://example.com")
+    label_id = bot_module.urls_and_labels["labels"].id_of("Open")
+    users = range(3000, 3000 + args.admins)
+    for user_id in users:
+        await bot_module.permissions.add_admin(user_id)
+    # Walk every admin up to the preview, one step at a time
+    for step in (
+        lambda user_id: command_update(api, user_id, "/start"),
+        lambda user_id: callback_update(api, user_id, "insert_post"),
+        lambda user_id: callback_update(
+            api, user_id, callbacks.encode(callbacks.SELECT_URL, url_id)
+        ),
+        lambda user_id: callback_update(
+            api, user_id, callbacks.encode(callbacks.SELECT_LABEL, label_id)
+        ),
+        lambda user_id: callback_update(api, user_id, "add_text"),
+        lambda user_id: command_update(api, user_id, f"Post by {user_id}"),
+        lambda user_id: callback_update(api, user_id, "skip_image"),
+    ):
+        waiters = []
+        for user_id in users:
+            waiters.append(api.expect_reply(user_id))
+            api.push_update(step(user_id))
+        await asyncio.wait_for(asyncio.gather(*waiters), timeout=10)
+
+    posts_before = count_posts(api)
+    calls_before = count_calls(api)
+    handled_before = handled["updates"]
+    duplicates_before = metrics.DUPLICATE_SENDS.value()
+    started = time.perf_counter()
+    for user_id in users:
+        for _ in range(args.taps):
+            api.push_update(callback_update(api, user_id, "confirm_post"))
+    # Wait until every confirmation has been handled. Per user in order, the
+    # copies after the first find the conversation over and get no answer
+    taps = args.admins * args.taps
+    while (
+        handled["updates"] - handled_before < taps
+        or application.update_processor.current_concurrent_updates
+    ):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+
+    posts = count_posts(api) - posts_before
+    extra_calls = count_calls(api) - calls_before
+    await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+
+    # At most each confirmation is answered; only the first also sends and edits
+    expected_calls = taps + args.admins * 2
+    processor = "concurrent" if concurrent else f"workers={args.workers}"
+    print(
+        f"{processor:11} guard {'on ' if guard else 'off'}  "
+        f"{taps} confirmations in {elapsed:.2f}s  "
+        f"channel posts {posts} (expected {args.admins})  "
+        f"absorbed {metrics.DUPLICATE_SENDS.value() - duplicates_before:.0f}  "
+        f"API calls {extra_calls} (at most {expected_calls})"
+    )
+    return posts
+
+
+def count_calls(api):
+    """Bot API calls made so far, not counting polling for updates"""
+    return sum(api.api_calls.values()) - api.api_calls["getUpdates"]
+
+
+def count_posts(api):
+    return sum(1 for _, _, chat_id in api.replies if str(chat_id) == str(CHANNEL_ID))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--admins", type=int, default=20)
+    parser.add_argument("--taps", type=int, default=5, help="confirmations per post")
+    parser.add_argument("--rtt", type=float, default=0.05, help="API round trip (s)")
+    parser.add_argument("--ttl", type=float, default=60)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    # Keep the benchmark away from the real database and rate limits
+    os.environ["STORE_FILE"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["CHANNEL_IDS"] = str(CHANNEL_ID)
+    os.environ["PER_CHAT_RATE"] = os.environ["GLOBAL_RATE"] = "100000"
+    import telegram_post_buddy_bot
+
+    telegram_post_buddy_bot.urls_and_labels["urls"].add("https://example.com")
+    telegram_post_buddy_bot.urls_and_labels["labels"].add("Open")
+
+    for guard, concurrent in ((True, False), (False, True), (True, True)):
+        posts = await run(telegram_post_buddy_bot, args, guard, concurrent)
+        if guard and posts != args.admins:
+            sys.exit(f"FAILED: {posts} posts sent for {args.admins} confirmed drafts")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,196 @@
+"""End-to-end load test of the bot over HTTP.
+
+Starts FakeBotAPIServer on localhost and runs telegram_post_buddy_bot
+against it through the real network stack (httpx, RetryingRequest,
+long-polling getUpdates). Every simulated admin walks the whole
+conversation, /start -> insert_post -> URL -> label -> skip_text ->
+skip_image (or add_image and a photo with --image) -> confirm_post, waiting
+for the bot's answer before the next step, like a person tapping through
+it. All admins run at the same time.
+
+Reported are flows and updates per second, latency percentiles per step
+and per whole flow, Bot API calls per flow by method, injected flood
+waits, and how many posts reached the channel.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import defaultdict
+
+from telegram.request import HTTPXRequest
+
+from benchmarks.fake_api import (
+    FakeBotAPI,
+    callback_update,
+    command_update,
+    percentile,
+    photo_update,
+)
+from benchmarks.fake_server import FakeBotAPIServer
+from post_buddy import callbacks
+from post_buddy.delivery import RetryingRequest
+
+CHANNEL_ID = -100500
+
+
+def flow(api, bot_module, user_id, image):
+    """(step name, update factory) pairs of one post creation"""
+    url_id = bot_module.urls_and_labels["urls"].id_of("https://example.com")
+    label_id = bot_module.urls_and_labels["labels"].id_of("Open")
+    steps = [
+        ("start", lambda: command_update(api, user_id, "/start")),
+        ("insert_post", lambda: callback_update(api, user_id, "insert_post")),
+        (
+            "select_url",
+            lambda: callback_update(
+                api, user_id, callbacks.encode(callbacks.SELECT_URL, url_id)
+            ),
+        ),
+        (
+            "select_label",
+            lambda: callback_update(
+                api, user_id, callbacks.encode(callbacks.SELECT_LABEL, label_id)
+            ),
+        ),
+        ("skip_text", lambda: callback_update(api, user_id, "skip_text")),
+    ]
+    if image:
+        steps.append(("add_image", lambda: callback_update(api, user_id, "add_image")))
+        steps.append(("photo", lambda: photo_update(api, user_id)))
+    else:
+        steps.append(
+            ("skip_image", lambda: callback_update(api, user_id, "skip_image"))
+        )
+    steps.append(
+        ("confirm_post", lambda: callback_update(api, user_id, "confirm_post"))
+    )
+    return steps
+
+
+async def walk(api, steps, user_id, step_times, timeout):
+    """Run one admin's flow; return its duration, or None if a step timed out"""
+    started = time.perf_counter()
+    for name, make_update in steps:
+        waiter = api.expect_reply(user_id)
+        sent = time.perf_counter()
+        api.push_update(make_update())
+        try:
+            answered = await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return None
+        step_times[name].append(answered - sent)
+    return time.perf_counter() - started
+
+
+async def run(bot_module, args):
+    api = FakeBotAPI(rtt=args.rtt, method_latency={"sendPhoto": args.send_latency})
+    server = FakeBotAPIServer(
+        api, flood_rate=args.flood_rate, retry_after=args.retry_after
+    )
+    await server.start()
+    # The same request the bot uses when started normally, unless the
+    # connection pool is resized; waiting for a free connection is not an error
+    if args.pool_size:
+        request = RetryingRequest(
+            HTTPXRequest(connection_pool_size=args.pool_size, pool_timeout=None)
+        )
+    else:
+        request = RetryingRequest()
+    builder = (
+        bot_module.Application.builder()
+        .token("123456:fake")
+        .base_url(server.base_url)
+        .request(request)
+        .get_updates_request(HTTPXRequest())
+    )
+    application = bot_module.build_application(builder, workers=args.workers)
+    await application.initialize()
+    await application.updater.start_polling(poll_interval=0, timeout=10)
+    await application.start()
+
+    users = range(5000, 5000 + args.admins)
+    for user_id in users:
+        await bot_module.permissions.add_admin(user_id)
+    calls_before = dict(api.api_calls)
+    step_times = defaultdict(list)
+
+    started = time.perf_counter()
+    durations = await asyncio.gather(
+        *(
+            walk(
+                api,
+                flow(api, bot_module, user_id, args.image),
+                user_id,
+                step_times,
+                args.timeout,
+            )
+            for user_id in users
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+    await server.stop()
+
+    finished = [duration for duration in durations if duration is not None]
+    updates = sum(len(times) for times in step_times.values())
+    posts = sum(1 for _, _, chat_id in api.replies if str(chat_id) == str(CHANNEL_ID))
+    print(
+        f"{args.admins} admins, workers={args.workers}, "
+        f"pool={args.pool_size or 'default'}: {len(finished)} flows in "
+        f"{elapsed:.2f}s ({len(finished) / elapsed:.1f} flows/s, "
+        f"{updates / elapsed:.1f} updates/s), posts {posts}/{args.admins}, "
+        f"timed out {args.admins - len(finished)}"
+    )
+    print(
+        f"flood waits injected {server.stats['flood_waits']}, "
+        f"retries {request.stats['retries']}, failed calls {request.stats['failures']}"
+    )
+    print(f"{'latency (s)':16} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7}")
+    for name, times in [*step_times.items(), ("whole flow", finished)]:
+        print(
+            f"{name:16} {percentile(times, 0.5):7.3f} {percentile(times, 0.95):7.3f} "
+            f"{percentile(times, 0.99):7.3f} {max(times, default=0):7.3f}"
+        )
+    print("Bot API calls per flow:")
+    for method, count in sorted(api.api_calls.items()):
+        if method != "getUpdates":
+            per_flow = (count - calls_before.get(method, 0)) / max(len(finished), 1)
+            print(f"    {method:22} {per_flow:6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--admins", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument(
+        "--pool-size", type=int, help="HTTP connections (default: PTB's 256)"
+    )
+    parser.add_argument("--rtt", type=float, default=0.05, help="API round trip (s)")
+    parser.add_argument("--send-latency", type=float, default=0.2)
+    parser.add_argument("--image", action="store_true", help="attach a photo")
+    parser.add_argument(
+        "--flood-rate", type=float, default=0.0, help="share of sends answered 429"
+    )
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=60, help="per step (s)")
+    args = parser.parse_args()
+
+    # Keep the benchmark away from the real database and rate limits
+    os.environ["STORE_FILE"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["CHANNEL_IDS"] = str(CHANNEL_ID)
+    os.environ["PER_CHAT_RATE"] = os.environ["GLOBAL_RATE"] = "100000"
+    import telegram_post_buddy_bot
+
+    telegram_post_buddy_bot.urls_and_labels["urls"].add("https://example.com")
+    telegram_post_buddy_bot.urls_and_labels["labels"].add("Open")
+    asyncio.run(run(telegram_post_buddy_bot, args))
+
+
+if __name__ == "__main__":
+    main()
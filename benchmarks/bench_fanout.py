@@ -0,0 +1,92 @@
+"""Benchmark the confirm_post fan-out against a fake Bot.
+
+Sends one post to many channels serially (the old behaviour) and through
+``fan_out`` with the shared rate limiter, then checks that no chat and no
+one-second window went over the configured limits.
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from benchmarks.fake_bot import FakeBot
+from post_buddy.fanout import fan_out
+from post_buddy.ratelimit import RateLimiter
+
+
+async def serial(bot, channels):
+    for channel in channels:
+        await bot.send_message(chat_id=channel, text="post")
+
+
+async def concurrent(bot, channels, limiter, concurrency):
+    async def send(channel):
+        return await bot.send_message(chat_id=channel, text="post")
+
+    return await fan_out(send, channels, limiter, concurrency)
+
+
+def check_limits(calls, per_chat_rate, global_rate, slack=0.01):
+    """Return a list of limit violations found in the recorded calls"""
+    violations = []
+    last_sent = {}
+    for sent_at, _, chat_id in calls:
+        previous = last_sent.get(chat_id)
+        if previous is not None and sent_at - previous < 1 / per_chat_rate - slack:
+            violations.append(
+                f"chat {chat_id} sent twice within {sent_at - previous:.3f}s"
+            )
+        last_sent[chat_id] = sent_at
+
+    times = [sent_at for sent_at, _, _ in calls]
+    start = 0
+    for end, sent_at in enumerate(times):
+        while sent_at - times[start] >= 1:
+            start += 1
+        # A token bucket with capacity one allows rate + 1 sends per second
+        if end - start + 1 > global_rate + 1:
+            violations.append(f"{end - start + 1} sends within one second")
+            break
+    return violations
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--channels", type=int, default=50)
+    parser.add_argument("--posts", type=int, default=2, help="posts per channel")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--per-chat-rate", type=float, default=1.0)
+    parser.add_argument("--global-rate", type=float, default=30.0)
+    args = parser.parse_args()
+
+    channels = [f"@channel_{i}" for i in range(args.channels)] * args.posts
+
+    bot = FakeBot(latency=args.latency)
+    started = time.perf_counter()
+    await serial(bot, channels)
+    serial_time = time.perf_counter() - started
+
+    bot = FakeBot(latency=args.latency)
+    limiter = RateLimiter(args.per_chat_rate, args.global_rate)
+    started = time.perf_counter()
+    results = await concurrent(bot, channels, limiter, args.concurrency)
+    fanout_time = time.perf_counter() - started
+
+    sends = len(channels)
+    print(
+        f"{sends} sends to {args.channels} channels, {args.latency * 1000:.0f} ms latency"
+    )
+    print(f"serial:  {serial_time:.2f}s ({sends / serial_time:.1f} msg/s)")
+    print(f"fan-out: {fanout_time:.2f}s ({sends / fanout_time:.1f} msg/s)")
+    print("methods:", dict(Counter(method for _, method, _ in bot.calls)))
+    errors = [result for _, result in results if isinstance(result, Exception)]
+    violations = check_limits(bot.calls, args.per_chat_rate, args.global_rate)
+    print(f"errors: {len(errors)}, limit violations: {len(violations)}")
+    for violation in violations[:10]:
+        print("  " + violation)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""Benchmark image preprocessing before upload.
+
+Generates large noisy test images (the worst case for compression), runs
+them through ImagePreprocessor and reports the bytes saved, the estimated
+upload time at a given bandwidth and the cost of a cache hit.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from PIL import Image
+
+from post_buddy.imaging import ImagePreprocessor
+
+
+def make_images(directory, width, height, count):
+    paths = []
+    for i in range(count):
+        image = Image.effect_noise((width, height), 40 + i).convert("RGB")
+        for fmt in ("png", "jpg"):
+            path = os.path.join(directory, f"image_{i}.{fmt}")
+            image.save(path, quality=95)
+            paths.append(path)
+    return paths
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=6000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--images", type=int, default=2)
+    parser.add_argument("--mbit", type=float, default=10.0, help="upload Mbit/s")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_images(directory, args.width, args.height, args.images)
+        preprocessor = ImagePreprocessor(cache_dir=os.path.join(directory, "cache"))
+
+        started = time.perf_counter()
+        prepared = await asyncio.gather(*map(preprocessor.prepare, paths))
+        cold = time.perf_counter() - started
+
+        # A fresh instance only finds the results on disk
+        warm_preprocessor = ImagePreprocessor(cache_dir=preprocessor.cache_dir)
+        started = time.perf_counter()
+        await asyncio.gather(*map(warm_preprocessor.prepare, paths))
+        warm = time.perf_counter() - started
+        preprocessor.shutdown()
+
+        bytes_per_second = args.mbit * 1e6 / 8
+        before = after = 0
+        for path, result in zip(paths, prepared):
+            size, new_size = os.path.getsize(path), os.path.getsize(result)
+            before += size
+            after += new_size
+            print(
+                f"{os.path.basename(path)}: {size / 1e6:.1f} MB -> "
+                f"{new_size / 1e6:.1f} MB"
+            )
+        print(
+            f"total {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB "
+            f"({100 * (1 - after / before):.0f}% smaller)"
+        )
+        print(
+            f"upload at {args.mbit:g} Mbit/s: {before / bytes_per_second:.1f}s -> "
+            f"{after / bytes_per_second:.1f}s"
+        )
+        print(f"preprocessing {len(paths)} images: {cold:.2f}s, cached: {warm:.3f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
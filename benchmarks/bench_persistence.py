@@ -0,0 +1,74 @@
+"""Benchmark saving drafts with many users on record.
+
+Fills a persistence backend with ``--users`` drafts, then measures one
+save round in which only ``--changed`` users edited their draft, the way
+the application reports changes every update_interval. Compares
+python-telegram-bot's PicklePersistence, which rewrites the whole file,
+with SQLitePersistence, which writes only the changed rows.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from telegram.ext import PicklePersistence
+
+from post_buddy.persistence import SQLitePersistence
+from post_buddy.storage import Store
+
+
+def draft(user_id, edit=0):
+    return {
+        "post_data": {
+            "url": f"https://example.com/{user_id}",
+            "label": "Open",
+            "text": f"Draft {edit} " + "lorem ipsum " * 20,
+            "images": [f"file-{user_id}-{i}" for i in range(3)],
+        },
+        "list_position": ["view_urls", 0],
+    }
+
+
+async def save_round(persistence, users, edit):
+    started = time.perf_counter()
+    for user_id in users:
+        await persistence.update_user_data(user_id, draft(user_id, edit))
+        await persistence.update_conversation("post_buddy", (user_id, user_id), 12)
+    await persistence.flush()
+    return time.perf_counter() - started
+
+
+async def bench(name, persistence, args):
+    await save_round(persistence, range(args.users), 0)
+    changed = range(0, args.users, args.users // args.changed)
+    timings = [await save_round(persistence, changed, edit) for edit in range(1, 6)]
+    best = min(timings)
+    print(
+        f"{name:20} {best * 1000:8.2f} ms per save round "
+        f"({best / len(changed) * 1e6:.0f} us per changed user)"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--changed", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{args.users} drafts stored, {args.changed} changed per round")
+    with tempfile.TemporaryDirectory() as directory:
+        pickle = PicklePersistence(os.path.join(directory, "drafts.pickle"))
+        # PicklePersistence loads lazily; prime its caches as the app would
+        await pickle.get_user_data()
+        await pickle.get_conversations("post_buddy")
+        await bench("PicklePersistence", pickle, args)
+
+        store = Store(os.path.join(directory, "drafts.db"))
+        await bench("SQLitePersistence", SQLitePersistence(store), args)
+        store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
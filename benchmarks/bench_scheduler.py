@@ -0,0 +1,107 @@
+"""Benchmark the post scheduler against a temporary store.
+
+Queues many posts due within about a second, measures how late each one is
+delivered and the overall throughput, and checks that every post is
+delivered exactly once. Then simulates a restart: posts already sent are
+not sent again, and a post that was in flight when the process died is
+flagged as interrupted rather than resent.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.fake_api import percentile
+from post_buddy.scheduler import PostScheduler
+from post_buddy.storage import Store
+
+
+async def run(store, posts, window, latency, concurrency):
+    delivered = Counter()
+    lags = []
+    done = asyncio.Event()
+
+    async def deliver(post):
+        lags.append(time.time() - post["send_at"])
+        await asyncio.sleep(latency)
+        delivered[post["n"]] += 1
+        if sum(delivered.values()) == posts:
+            done.set()
+
+    scheduler = PostScheduler(store, concurrency)
+    scheduler.start(deliver)
+    started = time.time()
+    for n in range(posts):
+        send_at = started + random.uniform(0, window)
+        await scheduler.schedule({"n": n, "send_at": send_at}, send_at)
+    queued = time.time() - started
+    await asyncio.wait_for(done.wait(), timeout=window + 60)
+    elapsed = time.time() - started
+    await scheduler.stop()
+    return delivered, lags, queued, elapsed
+
+
+async def restart(store, latency):
+    """Start a second scheduler on the same store and count what it resends"""
+    resent = Counter()
+
+    async def deliver(post):
+        resent[post["n"]] += 1
+
+    scheduler = PostScheduler(store)
+    scheduler.start(deliver)
+    await asyncio.sleep(latency + 0.2)
+    await scheduler.stop()
+    return resent
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--window", type=float, default=1.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        store = Store(path)
+        delivered, lags, queued, elapsed = await run(
+            store, args.posts, args.window, args.latency, args.concurrency
+        )
+        lags.sort()
+        duplicates = sum(1 for count in delivered.values() if count > 1)
+        print(
+            f"{args.posts} posts due within {args.window:.1f}s, "
+            f"{args.latency * 1000:.0f} ms per delivery"
+        )
+        print(f"queued in {queued:.2f}s, all delivered after {elapsed:.2f}s")
+        print(f"throughput: {args.posts / elapsed:.0f} posts/s")
+        print(
+            f"dispatch lag p50 {percentile(lags, 0.5) * 1000:.1f} ms, "
+            f"p99 {percentile(lags, 0.99) * 1000:.1f} ms"
+        )
+        print(f"delivered: {len(delivered)}, duplicates: {duplicates}")
+
+        # Pretend the process died while one post was being sent
+        post_id = await store.add_scheduled(time.time(), {"n": -1})
+        await store.set_scheduled_status(post_id, "sending")
+        store.close()
+
+        store = Store(path)
+        resent = await restart(store, args.latency)
+        statuses = dict(
+            store._conn.execute(
+                "SELECT status, COUNT(*) FROM scheduled_posts GROUP BY status"
+            ).fetchall()
+        )
+        store.close()
+        print(f"after restart: resent {sum(resent.values())}, statuses {statuses}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
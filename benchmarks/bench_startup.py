@@ -0,0 +1,90 @@
+"""Cold-start time of each entry point.
+
+Every entry point is imported in a fresh interpreter (without starting its
+window or event loop), several times over; the fastest run is reported,
+both for the import alone and for the whole process including interpreter
+start-up. The heavy third-party packages that got loaded are listed, which
+shows what the lazy imports keep out of the GUIs' start-up.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = (
+    "telegram_post_buddy_tk",
+    "telegram_post_buddy_qt",
+    "telegram_post_buddy_batch",
+    "telegram_post_buddy_bot",
+)
+
+HEAVY = ("telegram", "httpx", "PIL", "dotenv", "PyQt5", "tkinter")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+try:
+    import {module}
+except ImportError as e:
+    print(json.dumps({{"error": str(e)}}))
+else:
+    print(json.dumps({{
+        "seconds": time.perf_counter() - started,
+        "heavy": [name for name in {heavy!r} if name in sys.modules],
+    }}))
+"""
+
+
+def probe(module, cwd, env):
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - started
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS)
+    args = parser.parse_args()
+
+    # Run from an empty directory so the bot creates its database there
+    cwd = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.getenv("PYTHONPATH")])),
+        STORE_FILE=os.path.join(cwd, "bench.db"),
+    )
+    baseline = min(probe("sys", cwd, env)["process"] for _ in range(args.runs))
+    print(f"{'interpreter only':28} {'':>10} {baseline * 1000:8.1f} ms process")
+
+    for module in args.modules:
+        results = [probe(module, cwd, env) for _ in range(args.runs)]
+        if "error" in results[0]:
+            print(f"{module:28} skipped: {results[0]['error']}")
+            continue
+        imported = min(result["seconds"] for result in results)
+        process = min(result["process"] for result in results)
+        print(
+            f"{module:28} {imported * 1000:7.1f} ms import "
+            f"{process * 1000:8.1f} ms process  "
+            f"loads: {', '.join(results[0]['heavy']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
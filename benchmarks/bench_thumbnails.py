@@ -0,0 +1,60 @@
+"""Benchmark image previews for the GUIs.
+
+Compares the old preview path (decode the whole image, then shrink it)
+with ThumbnailCache, both on first use (reduced JPEG decoding) and when
+the thumbnail is already on disk.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from PIL import Image
+
+from post_buddy.thumbnails import ThumbnailCache
+
+
+def full_decode(path, size):
+    with Image.open(path) as image:
+        image.load()
+        image.thumbnail(size)
+        return image.size
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--megapixels", type=float, default=50)
+    parser.add_argument("--size", type=int, default=300)
+    args = parser.parse_args()
+
+    height = int((args.megapixels * 1e6 / 1.5) ** 0.5)
+    width = int(height * 1.5)
+    size = (args.size, args.size)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "photo.jpg")
+        Image.linear_gradient("L").resize((width, height)).convert("RGB").save(
+            path, quality=90
+        )
+        print(f"{width}x{height} JPEG, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        full = timed(full_decode, path, size)
+        cache = ThumbnailCache(size, cache_dir=os.path.join(directory, "thumbs"))
+        cold = timed(cache.get, path)
+        # A new instance, as after restarting the GUI
+        restarted = ThumbnailCache(size, cache_dir=cache.cache_dir)
+        warm = timed(restarted.get, path)
+        print(f"full decode + thumbnail: {full * 1000:.0f} ms")
+        print(f"draft decode (first use): {cold * 1000:.0f} ms")
+        print(f"cached on disk: {warm * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
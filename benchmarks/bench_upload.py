@@ -0,0 +1,137 @@
+"""Peak memory of uploading a large document through the real HTTP stack.
+
+A local HTTP server stands in for the Bot API and discards request bodies
+as they arrive, so only the client's memory is measured. Each mode runs in
+a fresh process and reports how far its peak RSS rose while sending:
+
+* buffered: an open file handle, which python-telegram-bot reads into
+  memory before encoding the request (the previous behaviour);
+* streaming: post_buddy.upload.upload_file, read in chunks by httpx;
+* mmap: the same, read through a memory map.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_api import BOT_USER
+
+MODES = ("buffered", "streaming", "mmap")
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def discard_requests(reader, writer):
+    """Answer every request like the Bot API, reading bodies in chunks"""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            headers = dict(line.split(": ", 1) for line in lines[1:] if ": " in line)
+            remaining = int(
+                headers.get("Content-Length", headers.get("content-length", 0))
+            )
+            while remaining:
+                chunk = await reader.read(min(remaining, 1 << 16))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+            if lines[0].split(" ")[1].endswith("/getMe"):
+                result = BOT_USER
+            else:
+                result = {
+                    "message_id": 1,
+                    "date": int(time.time()),
+                    "chat": {"id": 1, "type": "private"},
+                    "document": {"file_id": "doc", "file_unique_id": "doc"},
+                }
+            body = json.dumps({"ok": True, "result": result}).encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def send(mode, path):
+    from telegram import Bot
+    from telegram.request import HTTPXRequest
+
+    from post_buddy.upload import UploadProgress, upload_file
+
+    server = await asyncio.start_server(discard_requests, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    reports = []
+    request = HTTPXRequest(write_timeout=60, read_timeout=60)
+    async with Bot(
+        "123:fake", base_url=f"http://127.0.0.1:{port}/bot", request=request
+    ) as bot:
+        before = peak_rss_mb()
+        started = time.perf_counter()
+        if mode == "buffered":
+            with open(path, "rb") as document:
+                await bot.send_document(1, document)
+        else:
+            progress = UploadProgress(lambda sent, total: reports.append(sent))
+            with upload_file(path, progress, use_mmap=mode == "mmap") as document:
+                await bot.send_document(1, document)
+        elapsed = time.perf_counter() - started
+        after = peak_rss_mb()
+    server.close()
+    return {
+        "before": before,
+        "after": after,
+        "seconds": elapsed,
+        "progress_reports": len(reports),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--megabytes", type=int, default=50)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(send(args.child, args.path))))
+        return
+
+    path = os.path.join(tempfile.mkdtemp(), "document.bin")
+    with open(path, "wb") as f:
+        for _ in range(args.megabytes):
+            f.write(os.urandom(1 << 20))
+
+    print(f"{args.megabytes} MB document")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_upload", "--child", mode]
+            + ["--path", path],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output)
+        print(
+            f"{mode:10} peak RSS +{result['after'] - result['before']:6.1f} MB "
+            f"(peak {result['after']:6.1f} MB)  {result['seconds']:.2f}s  "
+            f"{result['progress_reports']} progress reports"
+        )
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Compare update-to-response latency of webhook and polling mode.
+
+Replays a stream of updates against the bot, once pushed to the local
+webhook server and once served through getUpdates, with a fake Bot API
+adding a simulated network round trip to every call. The stream is either
+read from a JSONL file of recorded Update objects (``--updates``) or
+generated: every user sends /start followed by /help messages.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fake_api import FakeBotAPI, command_update, percentile
+from post_buddy.storage import Store
+
+SECRET = "benchmark-secret"
+
+
+def synthetic_updates(api, users, messages):
+    updates = []
+    for user_id in range(1000, 1000 + users):
+        updates.append(command_update(api, user_id, "/start"))
+    for _ in range(messages):
+        for user_id in range(1000, 1000 + users):
+            updates.append(command_update(api, user_id, "/help"))
+    return updates
+
+
+def chat_of(update):
+    if "callback_query" in update:
+        return update["callback_query"]["message"]["chat"]["id"]
+    return update["message"]["chat"]["id"]
+
+
+async def replay(api, updates, deliver, rate):
+    """Deliver updates at a fixed rate and return the reply latencies"""
+    latencies = []
+
+    async def measure(update):
+        started = time.perf_counter()
+        reply = api.expect_reply(chat_of(update))
+        await deliver(update)
+        try:
+            replied = await asyncio.wait_for(reply, timeout=10)
+        except asyncio.TimeoutError:
+            return
+        latencies.append(replied - started)
+
+    tasks = []
+    for update in updates:
+        tasks.append(asyncio.create_task(measure(update)))
+        await asyncio.sleep(1 / rate)
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+async def run_mode(bot_module, mode, args, directory):
+    # A store per mode, so conversation states saved by one run do not
+    # change how the other run answers
+    bot_module.store = Store(os.path.join(directory, f"{mode}.db"))
+    api = FakeBotAPI(rtt=args.rtt)
+    builder = (
+        bot_module.Application.builder()
+        .token("123456:fake")
+        .request(api)
+        .get_updates_request(api)
+    )
+    application = bot_module.build_application(builder, workers=args.workers)
+    await application.initialize()
+    await api.initialize()
+
+    if args.updates:
+        with open(args.updates) as f:
+            updates = [json.loads(line) for line in f if line.strip()]
+    else:
+        updates = synthetic_updates(api, args.users, args.messages)
+
+    if mode == "webhook":
+        await application.updater.start_webhook(
+            listen="127.0.0.1",
+            port=args.port,
+            url_path="telegram",
+            secret_token=SECRET,
+            webhook_url=f"http://127.0.0.1:{args.port}/telegram",
+        )
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}")
+        rejected = await client.post(
+            "/telegram",
+            json=updates[0],
+            headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"},
+        )
+        assert rejected.status_code == 403, rejected.status_code
+
+        async def deliver(update):
+            # Telegram itself is one half round trip away from the server
+            await asyncio.sleep(args.rtt / 2)
+            await client.post(
+                "/telegram",
+                json=update,
+                headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+            )
+
+    else:
+        await application.updater.start_polling(poll_interval=0, timeout=10)
+
+        async def deliver(update):
+            api.push_update(update)
+
+    await application.start()
+    started = time.perf_counter()
+    latencies = await replay(api, updates, deliver, args.rate)
+    elapsed = time.perf_counter() - started
+
+    if mode == "webhook":
+        await client.aclose()
+    await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+
+    print(
+        f"{mode:8} {len(latencies)}/{len(updates)} answered in {elapsed:.2f}s  "
+        f"p50 {percentile(latencies, 0.5) * 1000:.1f} ms  "
+        f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms  "
+        f"api calls {dict(api.api_calls)}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", help="JSONL file with recorded updates")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=5, help="/help per user")
+    parser.add_argument("--rate", type=float, default=200, help="updates per second")
+    parser.add_argument("--rtt", type=float, default=0.05, help="API round trip (s)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8799)
+    args = parser.parse_args()
+
+    # Keep the benchmark away from the real database
+    directory = tempfile.mkdtemp()
+    os.environ["STORE_FILE"] = os.path.join(directory, "bench.db")
+    import telegram_post_buddy_bot
+
+    telegram_post_buddy_bot.store.close()
+    for mode in ("polling", "webhook"):
+        await run_mode(telegram_post_buddy_bot, mode, args, directory)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,224 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+
+from telegram.request import BaseRequest
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+
+
+class FakeBotAPI(BaseRequest):
+    """In-process stand-in for the Bot API, plugged in as the bot's request object.
+
+    Every call waits ``rtt`` seconds to mimic the network round trip, plus
+    any extra delay configured per method in ``method_latency``.
+    Updates pushed with :meth:`push_update` are served from getUpdates; every
+    outgoing message is recorded in ``replies`` as ``(timestamp, method,
+    chat_id)`` and announced to waiters registered with :meth:`expect_reply`.
+    """
+
+    def __init__(self, rtt=0.05, method_latency=None, clock=time.perf_counter):
+        self.rtt = rtt
+        self.method_latency = method_latency or {}
+        self.replies = []
+        self.api_calls = Counter()
+        self._clock = clock
+        self._updates = None
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._waiters = {}
+
+    @property
+    def read_timeout(self):
+        return 5.0
+
+    async def initialize(self):
+        if self._updates is None:
+            self._updates = asyncio.Queue()
+
+    async def shutdown(self):
+        pass
+
+    def next_update_id(self):
+        return next(self._update_ids)
+
+    def push_update(self, update):
+        """Queue an update dict for the next getUpdates call"""
+        self._updates.put_nowait(update)
+
+    def expect_reply(self, chat_id):
+        """Future resolved with the timestamp of the next message sent to chat_id"""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(chat_id, []).append(future)
+        return future
+
+    def _message(self, chat_id, text=""):
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": text,
+        }
+
+    def _photo_message(self, chat_id):
+        message = self._message(chat_id)
+        del message["text"]
+        file_id = f"fake-file-{message['message_id']}"
+        message["photo"] = [
+            {
+                "file_id": file_id,
+                "file_unique_id": file_id,
+                "width": 1280,
+                "height": 720,
+            }
+        ]
+        return message
+
+    def _record_reply(self, method, chat_id):
+        now = self._clock()
+        self.replies.append((now, method, chat_id))
+        # Replies arrive in order per chat, so resolve the oldest waiter
+        waiters = self._waiters.get(chat_id)
+        if waiters:
+            waiters.pop(0).set_result(now)
+
+    async def _get_updates(self, params):
+        # Long poll: return as soon as something is queued
+        updates = []
+        try:
+            updates.append(
+                await asyncio.wait_for(
+                    self._updates.get(), timeout=float(params.get("timeout") or 0.1)
+                )
+            )
+        except asyncio.TimeoutError:
+            return []
+        while not self._updates.empty() and len(updates) < 100:
+            updates.append(self._updates.get_nowait())
+        return updates
+
+    async def do_request(
+        self,
+        url,
+        method,
+        request_data=None,
+        read_timeout=None,
+        write_timeout=None,
+        connect_timeout=None,
+        pool_timeout=None,
+    ):
+        api_method = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+        return await self.respond(api_method, params)
+
+    async def respond(self, api_method, params):
+        """Answer one Bot API call with (HTTP status, JSON body).
+
+        Used in-process by do_request and over HTTP by FakeBotAPIServer.
+        """
+        self.api_calls[api_method] += 1
+
+        # Half the round trip before the server sees the request ...
+        await asyncio.sleep(self.rtt / 2 + self.method_latency.get(api_method, 0))
+        if api_method == "getMe":
+            result = BOT_USER
+        elif api_method == "getUpdates":
+            result = await self._get_updates(params)
+        elif api_method in ("sendMessage", "editMessageText"):
+            chat_id = params.get("chat_id", 0)
+            self._record_reply(api_method, chat_id)
+            result = self._message(chat_id, params.get("text", ""))
+        elif api_method == "sendPhoto":
+            chat_id = params.get("chat_id", 0)
+            self._record_reply(api_method, chat_id)
+            result = self._photo_message(chat_id)
+        elif api_method == "sendMediaGroup":
+            chat_id = params.get("chat_id", 0)
+            self._record_reply(api_method, chat_id)
+            media = params.get("media", [])
+            if isinstance(media, str):
+                media = json.loads(media)
+            result = [self._photo_message(chat_id) for _ in media]
+        else:
+            result = True
+        # ... and the other half for the response
+        await asyncio.sleep(self.rtt / 2)
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def user(user_id):
+    return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+
+
+def command_update(api, user_id, text):
+    """Update dict for a private message sent by user_id"""
+    entities = []
+    if text.startswith("/"):
+        entities = [
+            {"type": "bot_command", "offset": 0, "length": len(text.split()[0])}
+        ]
+    return {
+        "update_id": api.next_update_id(),
+        "message": {
+            "message_id": api.next_update_id(),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": user(user_id),
+            "text": text,
+            "entities": entities,
+        },
+    }
+
+
+def callback_update(api, user_id, data, message_id=1):
+    """Update dict for user_id pressing an inline button with callback data"""
+    return {
+        "update_id": api.next_update_id(),
+        "callback_query": {
+            "id": str(api.next_update_id()),
+            "chat_instance": str(user_id),
+            "from": user(user_id),
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": BOT_USER,
+                "text": "menu",
+            },
+        },
+    }
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def photo_update(api, user_id, file_id="fake-photo", media_group_id=None):
+    """Update dict for user_id sending a photo, optionally as part of an album"""
+    update = {
+        "update_id": api.next_update_id(),
+        "message": {
+            "message_id": api.next_update_id(),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": user(user_id),
+            "photo": [
+                {
+                    "file_id": file_id,
+                    "file_unique_id": file_id,
+                    "width": 1280,
+                    "height": 720,
+                }
+            ],
+        },
+    }
+    if media_group_id is not None:
+        update["message"]["media_group_id"] = media_group_id
+    return update
@@ -0,0 +1,36 @@
+import asyncio
+import itertools
+import time
+
+
+class FakeMessage:
+    """Just enough of telegram.Message for the send paths"""
+
+    def __init__(self, message_id, chat_id):
+        self.message_id = message_id
+        self.chat_id = chat_id
+
+
+class FakeBot:
+    """Stand-in for telegram.Bot that records every send instead of calling the API.
+
+    ``latency`` simulates the round trip of each call; ``calls`` holds
+    ``(timestamp, method, chat_id)`` tuples for later inspection.
+    """
+
+    def __init__(self, latency=0.05, clock=time.monotonic):
+        self.latency = latency
+        self.calls = []
+        self._clock = clock
+        self._message_ids = itertools.count(1)
+
+    async def _call(self, method, chat_id):
+        self.calls.append((self._clock(), method, chat_id))
+        await asyncio.sleep(self.latency)
+        return FakeMessage(next(self._message_ids), chat_id)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        return await self._call("sendMessage", chat_id)
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        return await self._call("sendPhoto", chat_id)
@@ -0,0 +1,142 @@
+"""FakeBotAPI served over HTTP, for end-to-end runs through the real client.
+
+The bot is pointed at the server with ``base_url``, so every call goes
+through httpx, python-telegram-bot's request encoding and RetryingRequest
+exactly as it would against api.telegram.org. Answers come from a
+FakeBotAPI (latency, recorded replies, queued updates); on top of that a
+share of the sending methods can be answered with flood control.
+"""
+
+import asyncio
+import email.parser
+import email.policy
+import json
+import random
+from collections import Counter
+from urllib.parse import parse_qsl
+
+# Methods that can be answered with an injected 429
+FLOODED_METHODS = frozenset(
+    ("sendMessage", "sendPhoto", "sendMediaGroup", "editMessageText")
+)
+
+
+def parse_body(content_type, body):
+    """Parameters of a Bot API request as a dict of strings"""
+    if content_type.startswith("application/json"):
+        return {key: str(value) for key, value in json.loads(body or b"{}").items()}
+    if content_type.startswith("multipart/form-data"):
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+        )
+        params = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if part.get_filename() is None:
+                params[name] = part.get_content()
+            else:
+                params[name] = f"attach://{part.get_filename()}"
+        return params
+    return dict(parse_qsl(body.decode()))
+
+
+class FakeBotAPIServer:
+    """HTTP front for a FakeBotAPI at ``http://host:port/bot<token>/<method>``.
+
+    With ``flood_rate`` that share of calls to FLOODED_METHODS is answered
+    with HTTP 429 and ``retry_after`` instead of being served; ``stats``
+    counts requests and injected flood waits.
+    """
+
+    def __init__(
+        self, api, host="127.0.0.1", port=0, flood_rate=0.0, retry_after=1, seed=1
+    ):
+        self.api = api
+        self.host = host
+        self.port = port
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._server = None
+        self._connections = set()
+
+    @property
+    def base_url(self):
+        """base_url for telegram.Bot / ApplicationBuilder"""
+        return f"http://{self.host}:{self.port}/bot"
+
+    async def start(self):
+        await self.api.initialize()
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # End long polls still waiting for updates
+            for task in self._connections:
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _read_request(self, reader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        headers = {}
+        for line in header_lines:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if not size:
+                    break
+                body += chunk[:-2]
+        else:
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+        path = request_line.split(" ")[1]
+        return path, headers, body
+
+    async def _serve(self, reader, writer):
+        # httpx keeps connections open, so serve requests until it closes
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                path, headers, body = await self._read_request(reader)
+                status, payload = await self._answer(path, headers, body)
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _answer(self, path, headers, body):
+        api_method = path.rsplit("/", 1)[-1]
+        self.stats["requests"] += 1
+        if api_method in FLOODED_METHODS and self._random.random() < self.flood_rate:
+            self.stats["flood_waits"] += 1
+            payload = {
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry later",
+                "parameters": {"retry_after": self.retry_after},
+            }
+            return 429, json.dumps(payload).encode()
+        params = parse_body(headers.get("content-type", ""), body)
+        chat_id = params.get("chat_id")
+        if chat_id is not None and chat_id.lstrip("-").isdigit():
+            # Waiters registered with expect_reply use numeric chat ids
+            params["chat_id"] = int(chat_id)
+        return await self.api.respond(api_method, params)
@@ -0,0 +1 @@
+"""Shared building blocks for the Telegram Post Buddy front-ends."""
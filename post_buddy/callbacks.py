@@ -0,0 +1,77 @@
+"""Compact callback_data encoding.
+
+Telegram limits callback_data to 64 bytes, so buttons referring to a stored
+URL, label, template or admin carry a short opcode plus the entry's numeric id in
+base 36 (e.g. ``"eu:1z"``) instead of the value itself.
+"""
+
+import string
+
+# Opcodes
+SELECT_URL = "u"
+SELECT_LABEL = "l"
+EDIT_URL = "eu"
+EDIT_LABEL = "el"
+DELETE_URL = "du"
+DELETE_LABEL = "dl"
+ADMIN_INFO = "ai"
+REMOVE_ADMIN = "ra"
+SELECT_TEMPLATE = "t"
+DELETE_TEMPLATE = "dt"
+# Page switches of paginated lists; the id is the page number
+URLS_PAGE = "pu"
+LABELS_PAGE = "pl"
+URL_PICKER_PAGE = "ps"
+LABEL_PICKER_PAGE = "pt"
+ADMINS_PAGE = "pa"
+TEMPLATES_PAGE = "pm"
+
+OPCODES = frozenset(
+    (
+        SELECT_URL,
+        SELECT_LABEL,
+        EDIT_URL,
+        EDIT_LABEL,
+        DELETE_URL,
+        DELETE_LABEL,
+        ADMIN_INFO,
+        REMOVE_ADMIN,
+        SELECT_TEMPLATE,
+        DELETE_TEMPLATE,
+        URLS_PAGE,
+        LABELS_PAGE,
+        URL_PICKER_PAGE,
+        LABEL_PICKER_PAGE,
+        ADMINS_PAGE,
+        TEMPLATES_PAGE,
+    )
+)
+
+_DIGITS = string.digits + string.ascii_lowercase
+
+
+def _to_base36(number):
+    if number < 0:
+        return "-" + _to_base36(-number)
+    digits = []
+    while True:
+        number, remainder = divmod(number, 36)
+        digits.append(_DIGITS[remainder])
+        if not number:
+            return "".join(reversed(digits))
+
+
+def encode(opcode, entry_id):
+    """callback_data for applying opcode to the entry with the given id"""
+    return f"{opcode}:{_to_base36(int(entry_id))}"
+
+
+def decode(data):
+    """Return (opcode, id) for encoded callback_data, or None for anything else"""
+    opcode, sep, packed = data.partition(":")
+    if not sep or opcode not in OPCODES:
+        return None
+    try:
+        return opcode, int(packed, 36)
+    except ValueError:
+        return None
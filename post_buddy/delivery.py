@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+import random
+from collections import Counter
+
+from telegram.error import NetworkError, TimedOut
+from telegram.request import BaseRequest, HTTPXRequest
+
+from post_buddy.metrics import API_REQUEST_SECONDS, ERRORS
+
+logger = logging.getLogger(__name__)
+
+# Long polling has its own retry loop in the Updater
+NOT_RETRIED = ("getUpdates",)
+
+
+def retry_after_of(payload):
+    """Seconds Telegram asks us to wait in a 429 response, or None"""
+    try:
+        parameters = json.loads(payload).get("parameters") or {}
+    except (ValueError, AttributeError):
+        return None
+    return parameters.get("retry_after")
+
+
+class RetryingRequest(BaseRequest):
+    """Request wrapper that retries transient Bot API failures.
+
+    Errors are sorted into three kinds:
+
+    * flood control (HTTP 429): wait the ``retry_after`` Telegram asked
+      for, plus a little jitter so parallel senders do not retry in step;
+    * transient (timeouts, connection errors, HTTP 5xx): retry with
+      jittered exponential backoff;
+    * permanent (any other 4xx): returned at once, so python-telegram-bot
+      raises the usual BadRequest, Forbidden etc.
+
+    The response is only retried inside ``do_request``, where the request
+    body has already been built, so uploads are resent intact. A send that
+    timed out may still have reached Telegram; it is retried anyway, since
+    a rare duplicate is better than a lost post.
+
+    ``stats`` counts requests, retries by reason and failures. The latency
+    of every call, retries included, is recorded per API method in
+    API_REQUEST_SECONDS, and every error in ERRORS by HTTP status or
+    exception type.
+    """
+
+    def __init__(
+        self,
+        request=None,
+        max_attempts=5,
+        base_delay=0.5,
+        max_delay=30.0,
+        max_retry_after=120,
+        sleep=asyncio.sleep,
+        rng=random.random,
+    ):
+        self._request = request if request is not None else HTTPXRequest()
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self._sleep = sleep
+        self._rng = rng
+        self.stats = Counter()
+
+    @property
+    def read_timeout(self):
+        return self._request.read_timeout
+
+    async def initialize(self):
+        await self._request.initialize()
+
+    async def shutdown(self):
+        await self._request.shutdown()
+
+    def backoff(self, attempt):
+        """Full-jitter exponential delay before retry number ``attempt``"""
+        return self._rng() * min(self.max_delay, self.base_delay * 2**attempt)
+
+    async def do_request(self, url, method, request_data=None, **timeouts):
+        api_method = url.rsplit("/", 1)[-1]
+        if api_method in NOT_RETRIED:
+            return await self._request.do_request(url, method, request_data, **timeouts)
+
+        with API_REQUEST_SECONDS.time(api_method):
+            return await self._do_request(
+                api_method, url, method, request_data, timeouts
+            )
+
+    async def _do_request(self, api_method, url, method, request_data, timeouts):
+        self.stats["requests"] += 1
+        for attempt in range(self.max_attempts):
+            last_attempt = attempt == self.max_attempts - 1
+            try:
+                code, payload = await self._request.do_request(
+                    url, method, request_data, **timeouts
+                )
+            except (TimedOut, NetworkError) as e:
+                reason = "timeouts" if isinstance(e, TimedOut) else "network_errors"
+                self.stats[reason] += 1
+                ERRORS.inc("api", type(e).__name__)
+                if last_attempt:
+                    self.stats["failures"] += 1
+                    raise
+                delay = self.backoff(attempt)
+            else:
+                if code >= 400:
+                    ERRORS.inc("api", str(code))
+                if code == 429:
+                    self.stats["flood_waits"] += 1
+                    retry_after = retry_after_of(payload)
+                    if (
+                        last_attempt
+                        or retry_after is None
+                        or retry_after > self.max_retry_after
+                    ):
+                        self.stats["failures"] += 1
+                        return code, payload
+                    delay = retry_after + self._rng() * self.base_delay
+                    self.stats["flood_wait_seconds"] += retry_after
+                elif code >= 500:
+                    self.stats["server_errors"] += 1
+                    if last_attempt:
+                        self.stats["failures"] += 1
+                        return code, payload
+                    delay = self.backoff(attempt)
+                else:
+                    if code >= 400:
+                        self.stats["permanent_errors"] += 1
+                    return code, payload
+
+            self.stats["retries"] += 1
+            logger.info(
+                "Retrying %s in %.1fs (attempt %d of %d)",
+                api_method,
+                delay,
+                attempt + 2,
+                self.max_attempts,
+            )
+            await self._sleep(delay)
@@ -0,0 +1,86 @@
+import os
+
+from post_buddy.file_id_cache import FileIdCache
+from post_buddy.imaging import ImagePreprocessor
+from post_buddy.storage import STORE_FILE, read_templates
+from post_buddy.templates import compile_templates
+from post_buddy.worker import SendWorker
+
+# Form field -> (environment variable, default) filled in by "Load from .env"
+ENV_FIELDS = {
+    "token": ("BOT_TOKEN", ""),
+    "channel": ("CHANNEL_NAME", ""),
+    "url": ("MINI_APP_URL", ""),
+    "label": ("BUTTON_LABEL", "Open Mini App"),
+}
+
+
+def load_env_form():
+    """Form values from the .env file and the environment"""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return {
+        name: os.getenv(var, default) for name, (var, default) in ENV_FIELDS.items()
+    }
+
+
+def load_templates():
+    """Templates saved in the bot's store (STORE_FILE), by name"""
+    rows = read_templates(os.getenv("STORE_FILE", STORE_FILE))
+    return {template.name: template for template in compile_templates(rows).values()}
+
+
+class DesktopSender:
+    """Everything the Tk and Qt windows need to send a Post.
+
+    Holds the file_id cache, the image preprocessor and the send worker.
+    Nothing here imports telegram or Pillow; both are loaded by the worker
+    thread and the preprocessing processes when the first post is sent, so
+    the window opens without waiting for them.
+
+    ``listener`` receives the worker's progress updates, see SendWorker.
+    While images are uploaded it also gets "progress" updates whose detail
+    is (bytes sent, bytes in total).
+    """
+
+    def __init__(self, listener=None):
+        self.file_id_cache = FileIdCache()
+        self.image_preprocessor = ImagePreprocessor()
+        self._worker = SendWorker(listener)
+
+    def start(self):
+        self._worker.start()
+
+    def stop(self, timeout=None):
+        """Let queued sends finish, then release the worker and the process pool"""
+        self._worker.stop(timeout)
+        self.image_preprocessor.shutdown()
+        self.file_id_cache.flush()
+
+    def submit(self, token, post):
+        """Queue post for sending with the bot owning token; return the job id"""
+        job_id, _ = self._worker.submit(token, lambda bot: self._send(bot, post))
+        return job_id
+
+    async def _send(self, bot, post):
+        from post_buddy.sender import send_album_post
+        from post_buddy.upload import UploadProgress
+
+        progress = UploadProgress(
+            lambda sent, total: self._worker.report_progress((sent, total))
+        )
+
+        return await send_album_post(
+            bot,
+            post.channel,
+            post.text,
+            post.url,
+            post.label,
+            post.images,
+            self.file_id_cache,
+            self.image_preprocessor,
+            # Optional chat used to upload album images in parallel first
+            staging_chat=os.getenv("STAGING_CHAT_ID"),
+            progress=progress,
+        )
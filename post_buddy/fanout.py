@@ -0,0 +1,73 @@
+import asyncio
+
+
+async def fan_out(send, chat_ids, limiter=None, concurrency=10):
+    """Call ``send(chat_id)`` for every chat concurrently.
+
+    At most ``concurrency`` sends are in flight at once and each one waits
+    for ``limiter`` first. Returns a list of ``(chat_id, result)`` pairs in
+    the order of ``chat_ids``; a failed send has its exception as result.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def deliver(chat_id):
+        async with semaphore:
+            if limiter is not None:
+                await limiter.acquire(chat_id)
+            try:
+                return chat_id, await send(chat_id)
+            except Exception as e:
+                return chat_id, e
+
+    return await asyncio.gather(*(deliver(chat_id) for chat_id in chat_ids))
+
+
+async def fan_out_stream(send, items, chat_id_of, limiter=None, concurrency=10):
+    """Call ``send(item)`` for a possibly endless iterable of items.
+
+    Like fan_out, but items are pulled lazily and ``(item, result)`` pairs
+    are yielded as sends finish, so only ``concurrency`` sends exist at a
+    time however long the input is. ``chat_id_of(item)`` gives the chat
+    ``limiter`` is keyed by.
+    """
+
+    async def deliver(item):
+        if limiter is not None:
+            await limiter.acquire(chat_id_of(item))
+        try:
+            return item, await send(item)
+        except Exception as e:
+            return item, e
+
+    items = iter(items)
+    pending = set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                else:
+                    pending.add(asyncio.ensure_future(deliver(item)))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def parse_channel_ids(value):
+    """Split a comma separated channel list, dropping blanks and duplicates"""
+    channel_ids = []
+    for channel_id in (value or "").split(","):
+        channel_id = channel_id.strip()
+        if channel_id and channel_id not in channel_ids:
+            channel_ids.append(channel_id)
+    return channel_ids
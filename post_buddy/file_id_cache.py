@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import time
+
+CACHE_FILE = "file_id_cache.json"
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileIdCache:
+    """Persistent map from image content to the Telegram file_id it was uploaded as.
+
+    file_ids are only valid for the bot that received them, so entries are
+    keyed by the bot's numeric id as well as the content hash.
+
+    Changes are kept in memory and the file is rewritten at most once every
+    ``flush_interval`` seconds rather than after every upload; call
+    ``flush()`` on shutdown to save the rest. Entries lost in a crash only
+    cost an upload.
+    """
+
+    def __init__(self, path=CACHE_FILE, flush_interval=30.0, clock=time.monotonic):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._entries = None
+        self._dirty = False
+        self._saved_at = clock()
+        # (path, mtime, size) -> digest, so unchanged files are hashed once
+        self._digests = {}
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _changed(self):
+        self._dirty = True
+        if self._clock() - self._saved_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write pending changes to the file"""
+        if self._dirty:
+            self._save()
+            self._dirty = False
+        self._saved_at = self._clock()
+
+    def key(self, token, image_path):
+        """Cache key for sending image_path with the bot owning token"""
+        stat = os.stat(image_path)
+        stamp = (image_path, stat.st_mtime_ns, stat.st_size)
+        digest = self._digests.get(stamp)
+        if digest is None:
+            digest = self._digests[stamp] = file_digest(image_path)
+        return f"{token.split(':', 1)[0]}:{digest}"
+
+    def get(self, key):
+        return self._load().get(key)
+
+    def put(self, key, file_id):
+        if self._load().get(key) != file_id:
+            self._entries[key] = file_id
+            self._changed()
+
+    def invalidate(self, key):
+        if self._load().pop(key, None) is not None:
+            self._changed()
+
+
+def is_stale_file_id_error(error):
+    """Whether Telegram rejected a request because of the file_id itself"""
+    message = str(error).lower()
+    return "file" in message and (
+        "identifier" in message or "reference" in message or "not found" in message
+    )
+
+
+async def send_photo_cached(bot, cache, chat_id, image_path, progress=None, **kwargs):
+    """Send a local image, uploading it only if no valid file_id is cached
+
+    An upload is streamed from disk and reported to ``progress``, an
+    UploadProgress.
+    """
+    # Imported here so the GUIs can create a cache without loading telegram
+    from telegram.error import BadRequest
+
+    from post_buddy.upload import upload_file
+
+    key = cache.key(bot.token, image_path)
+    file_id = cache.get(key)
+    if file_id:
+        try:
+            return await bot.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+        except BadRequest as e:
+            if not is_stale_file_id_error(e):
+                raise
+            # Telegram no longer knows this id, fall back to a fresh upload
+            cache.invalidate(key)
+
+    with upload_file(image_path, progress) as photo:
+        message = await bot.send_photo(chat_id=chat_id, photo=photo, **kwargs)
+    cache.put(key, message.photo[-1].file_id)
+    return message
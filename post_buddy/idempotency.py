@@ -0,0 +1,50 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+
+def request_key(*parts):
+    """Stable digest of JSON-serialisable parts, e.g. (user, draft, channels)"""
+    encoded = json.dumps(parts, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class IdempotencyCache:
+    """Keys claimed in the last ``ttl`` seconds, to absorb repeated requests.
+
+    ``claim(key)`` returns True the first time a key is seen and False while
+    it is still remembered. Every key lives for the same ttl, so keys expire
+    in the order they were claimed and are dropped from the front of an
+    OrderedDict: claims cost O(1) amortised and the cache only ever holds
+    the keys of the last ttl seconds. Claims happen without awaiting, so
+    two handlers racing on the event loop can never both get True.
+    """
+
+    def __init__(self, ttl=60.0, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._expiry = OrderedDict()  # key -> expiry time, oldest first
+
+    def __len__(self):
+        return len(self._expiry)
+
+    def _expire(self, now):
+        while self._expiry:
+            key, expires = next(iter(self._expiry.items()))
+            if expires > now:
+                return
+            del self._expiry[key]
+
+    def claim(self, key):
+        """Remember key; return False if it was already claimed within ttl"""
+        now = self._clock()
+        self._expire(now)
+        if key in self._expiry:
+            return False
+        self._expiry[key] = now + self.ttl
+        return True
+
+    def release(self, key):
+        """Forget key so the request can be made again, e.g. after a failure"""
+        self._expiry.pop(key, None)
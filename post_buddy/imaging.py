@@ -0,0 +1,124 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from post_buddy.file_id_cache import file_digest
+
+CACHE_DIR = os.path.join(".post_buddy_cache", "images")
+
+# Telegram downscales photos to at most 2560 px on the long side anyway
+MAX_SIDE = 2560
+JPEG_QUALITY = 85
+
+
+def _preprocess(src, dst, max_side, quality):
+    """Write a resized, metadata-free JPEG of src to dst.
+
+    Runs in a worker process. Returns False, without writing dst, when the
+    source should be uploaded as it is: animations, and JPEG or PNG files
+    that need no resizing, carry no metadata and would not get smaller.
+    """
+    # Only worker processes need Pillow
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as image:
+        if getattr(image, "is_animated", False):
+            return False
+        source_format = image.format
+        has_metadata = bool(image.info.get("exif") or image.getexif())
+        # Bake the EXIF orientation into the pixels before dropping the tags
+        image = ImageOps.exif_transpose(image)
+        needs_resize = max(image.size) > max_side
+        if needs_resize:
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        tmp_path = f"{dst}.{os.getpid()}.tmp"
+        image.save(tmp_path, "JPEG", quality=quality, optimize=True)
+
+    if (
+        not needs_resize
+        and not has_metadata
+        and source_format in ("JPEG", "PNG")
+        and os.path.getsize(tmp_path) >= os.path.getsize(src)
+    ):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, dst)
+    return True
+
+
+class ImagePreprocessor:
+    """Shrink images before upload, caching the results by source content.
+
+    Large creatives are resized to Telegram's photo size, re-encoded as
+    JPEG and stripped of EXIF data in a process pool, so the event loop and
+    the UI stay free while Pillow works. Results live in cache_dir under
+    the hash of the source file, so each image is processed once. Workers
+    are spawned rather than forked, so a script using this needs an
+    ``if __name__ == "__main__"`` guard.
+    """
+
+    def __init__(
+        self, cache_dir=CACHE_DIR, max_side=MAX_SIDE, quality=JPEG_QUALITY, workers=2
+    ):
+        self.cache_dir = cache_dir
+        self.max_side = max_side
+        self.quality = quality
+        self._workers = workers
+        self._pool = None
+        # (path, mtime, size) -> prepared path, so unchanged files skip hashing
+        self._prepared = {}
+        self._in_flight = {}
+
+    def _cache_path(self, digest):
+        return os.path.join(
+            self.cache_dir, f"{digest}-{self.max_side}-q{self.quality}.jpg"
+        )
+
+    async def prepare(self, image_path):
+        """Path of the file to upload in place of image_path"""
+        stat = os.stat(image_path)
+        stamp = (image_path, stat.st_mtime_ns, stat.st_size)
+        prepared = self._prepared.get(stamp)
+        if prepared is not None:
+            return prepared
+
+        task = self._in_flight.get(stamp)
+        if task is None:
+            task = asyncio.ensure_future(self._prepare(image_path))
+            self._in_flight[stamp] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(stamp, None))
+        prepared = await task
+        self._prepared[stamp] = prepared
+        return prepared
+
+    async def _prepare(self, image_path):
+        loop = asyncio.get_running_loop()
+        if self._pool is None:
+            # The GUIs start this from a worker thread; forking a process
+            # with running threads can deadlock the child, so spawn instead
+            self._pool = ProcessPoolExecutor(
+                self._workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        digest = await loop.run_in_executor(None, file_digest, image_path)
+        dst = self._cache_path(digest)
+        if os.path.exists(dst):
+            return dst
+        os.makedirs(self.cache_dir, exist_ok=True)
+        written = await loop.run_in_executor(
+            self._pool, _preprocess, image_path, dst, self.max_side, self.quality
+        )
+        return dst if written else image_path
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
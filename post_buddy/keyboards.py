@@ -0,0 +1,16 @@
+class KeyboardCache:
+    """Reuse reply markups until the data they were built from changes.
+
+    InlineKeyboardMarkup objects are immutable, so one instance can be sent
+    to any number of users. Each entry remembers the version it was built
+    for and is rebuilt only when asked for with a different version.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, key, version, build):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            entry = self._entries[key] = (version, build())
+        return entry[1]
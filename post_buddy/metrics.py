@@ -0,0 +1,308 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+A small, dependency-free subset of what prometheus_client offers: counters,
+gauges and histograms with labels, collected in a MetricsRegistry and served
+by MetricsServer on ``GET /metrics``. The metrics every part of the bot
+records into are defined at the bottom of this module.
+"""
+
+import asyncio
+import bisect
+import functools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, from a fast SQLite write to a slow upload
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing count per combination of label values"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in sorted(values):
+            yield self.name + _labels(self.labels, label_values), value
+
+
+class Gauge:
+    """Current value, either set directly or read from a function when scraped"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, function=None):
+        self.name = name
+        self.help = help_text
+        self._function = function
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    def set_function(self, function):
+        self._function = function
+
+    def value(self):
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+    def samples(self):
+        try:
+            yield self.name, self.value()
+        except Exception:
+            logger.exception("Could not read gauge %s", self.name)
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_label_values", "_started")
+
+    def __init__(self, histogram, label_values):
+        self._histogram = histogram
+        self._label_values = label_values
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(
+            time.perf_counter() - self._started, *self._label_values
+        )
+
+
+class Histogram:
+    """Distribution of observed values per combination of label values"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (the last one is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                ]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, *label_values):
+        """Context manager observing the time spent in its body"""
+        return _Timer(self, label_values)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def summary(self):
+        """{label values: (count, sum)} of every series observed so far"""
+        with self._lock:
+            return {
+                label_values: (sum(counts), total)
+                for label_values, (counts, total) in self._series.items()
+            }
+
+    def samples(self):
+        with self._lock:
+            series = [
+                (label_values, list(counts), total)
+                for label_values, (counts, total) in self._series.items()
+            ]
+        for label_values, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _labels(self.labels, label_values, [("le", _number(bound))])
+                yield f"{self.name}_bucket{labels}", cumulative
+            labels = _labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels}", total
+            yield f"{self.name}_count{labels}", cumulative
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, function=None):
+        return self._add(Gauge(name, help_text, function))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name} {_number(value)}" for name, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Minimal HTTP server answering ``GET /metrics`` with registry.render()"""
+
+    def __init__(self, registry, host="127.0.0.1", port=9464):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        if not self.port:
+            self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Serving metrics on http://%s:%d/metrics", self.host, self.port)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10)
+            method, path = (head.split(b"\r\n", 1)[0].split(b" ") + [b"", b""])[:2]
+            if method != b"GET":
+                status, body = "405 Method Not Allowed", "Method not allowed\n"
+            elif path.split(b"?", 1)[0] != b"/metrics":
+                status, body = "404 Not Found", "Not found\n"
+            else:
+                status, body = "200 OK", self.registry.render()
+            payload = body.encode()
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Connection: close\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+        except (
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+            asyncio.TimeoutError,
+            OSError,
+        ):
+            pass
+        finally:
+            writer.close()
+
+
+def timed(handler):
+    """Record the latency of an async update handler under its name"""
+    name = handler.__name__
+
+    @functools.wraps(handler)
+    async def wrapper(*args, **kwargs):
+        with HANDLER_SECONDS.time(name):
+            return await handler(*args, **kwargs)
+
+    return wrapper
+
+
+REGISTRY = MetricsRegistry()
+
+HANDLER_SECONDS = REGISTRY.histogram(
+    "post_buddy_handler_seconds", "Time spent in update handlers", ("handler",)
+)
+API_REQUEST_SECONDS = REGISTRY.histogram(
+    "post_buddy_api_request_seconds",
+    "Bot API call latency, retries included",
+    ("method",),
+)
+STORE_WRITE_SECONDS = REGISTRY.histogram(
+    "post_buddy_store_write_seconds", "Duration of SQLite writes", ("table",)
+)
+ERRORS = REGISTRY.counter(
+    "post_buddy_errors_total",
+    "Errors by where they happened and their type",
+    ("source", "type"),
+)
+UPDATE_QUEUE_DEPTH = REGISTRY.gauge(
+    "post_buddy_update_queue_depth", "Updates received but not yet processed"
+)
+UPDATES_IN_PROGRESS = REGISTRY.gauge(
+    "post_buddy_updates_in_progress", "Updates being processed right now"
+)
+DUPLICATE_SENDS = REGISTRY.counter(
+    "post_buddy_duplicate_sends_total",
+    "Confirmations dropped because the same post had just been sent",
+)
+SCHEDULED_POSTS = REGISTRY.gauge(
+    "post_buddy_scheduled_posts", "Scheduled posts waiting to be sent"
+)
@@ -0,0 +1,37 @@
+from telegram import InlineKeyboardButton
+
+from post_buddy import callbacks
+
+# Entries shown per page of a list keyboard
+PAGE_SIZE = 8
+
+# callback_data of buttons that only display information
+NOOP = "noop"
+
+
+def nav_row(page_opcode, page, pages):
+    """Previous / "page N of M" / next buttons, empty for a single page"""
+    if pages <= 1:
+        return []
+    row = []
+    if page > 0:
+        row.append(
+            InlineKeyboardButton(
+                "◀️", callback_data=callbacks.encode(page_opcode, page - 1)
+            )
+        )
+    row.append(InlineKeyboardButton(f"{page + 1}/{pages}", callback_data=NOOP))
+    if page < pages - 1:
+        row.append(
+            InlineKeyboardButton(
+                "▶️", callback_data=callbacks.encode(page_opcode, page + 1)
+            )
+        )
+    return row
+
+
+def page_of(values, page, page_size=PAGE_SIZE):
+    """Slice a sequence into (items, page, pages) like Registry.page"""
+    pages = max(1, -(-len(values) // page_size))
+    page = min(max(page, 0), pages - 1)
+    return values[page * page_size : (page + 1) * page_size], page, pages
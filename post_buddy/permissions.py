@@ -0,0 +1,201 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+
+from telegram.ext import ConversationHandler
+
+logger = logging.getLogger(__name__)
+
+OWNER = "owner"
+ADMIN = "admin"
+
+# Meta key holding the admins.json contents last applied to the store
+FILE_SNAPSHOT_KEY = "admins_file"
+
+
+def parse_user_ids(values):
+    """Integer user ids from a list of ids, skipping anything not numeric"""
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(str(value).strip()))
+        except ValueError:
+            logger.warning("Ignoring invalid admin id %r", value)
+    return ids
+
+
+def parse_owner_id(value):
+    """The owner's user id from OWNER_ID, or None if it is not set.
+
+    Raises ValueError with a readable message for anything not numeric.
+    """
+    if value is None or not str(value).strip():
+        return None
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise ValueError(
+            f"OWNER_ID must be a numeric Telegram user id, got {value!r}"
+        ) from None
+
+
+class Permissions:
+    """Owner and admin sets, checked with one set lookup per handler call.
+
+    The owner id is read once, at startup, and the admins are kept as a
+    set of integers, so a check never touches the environment or the
+    store. The owner holds every role.
+
+    ``admins_file`` is watched for changes (by polling its mtime) so ops
+    can edit it without restarting the bot. Only the difference from the
+    previous version of the file is applied: ids added to the file become
+    admins, ids removed from it stop being admins, and admins added or
+    removed in the bot are left alone otherwise.
+    """
+
+    def __init__(self, store, owner_id=None, admins_file=None):
+        self._store = store
+        self.owner_id = parse_owner_id(owner_id)
+        self.admins_file = admins_file
+        self._admins = parse_user_ids(store.load_admins())
+        self._roles = {}
+        self._rebuild()
+        self._file_stamp = None
+        # admins.json as last applied, or None until start() records it
+        snapshot = store.get_meta(FILE_SNAPSHOT_KEY)
+        self._file_admins = None if snapshot is None else set(json.loads(snapshot))
+        self._task = None
+
+    def _rebuild(self):
+        owner = set() if self.owner_id is None else {self.owner_id}
+        self._roles = {
+            OWNER: frozenset(owner),
+            ADMIN: frozenset(self._admins | owner),
+        }
+
+    def has(self, user_id, role):
+        return user_id in self._roles[role]
+
+    def admin_ids(self):
+        """Admins (not counting the owner) in ascending order"""
+        return sorted(self._admins)
+
+    async def add_admin(self, user_id):
+        self._admins.add(user_id)
+        self._rebuild()
+        await self._store.add_admin(user_id)
+
+    async def remove_admin(self, user_id):
+        self._admins.discard(user_id)
+        self._rebuild()
+        await self._store.remove_admin(user_id)
+
+    def _read_file(self):
+        """Admin ids listed in admins_file, or None if it is missing or invalid"""
+        if not self.admins_file:
+            return None
+        try:
+            with open(self.admins_file, "r") as f:
+                return parse_user_ids(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as e:
+            logger.warning("Could not read %s: %s", self.admins_file, e)
+            return None
+
+    async def _snapshot(self, listed):
+        """Remember listed as the last applied version of admins_file"""
+        self._file_admins = listed
+        await self._store.set_meta(FILE_SNAPSHOT_KEY, json.dumps(sorted(listed)))
+
+    async def reload(self):
+        """Apply changes made to admins_file since the last call.
+
+        Returns whether anything was applied. An unreadable file is skipped
+        and tried again on the next call.
+        """
+        try:
+            stat = os.stat(self.admins_file)
+        except (OSError, TypeError):
+            return False
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._file_stamp:
+            return False
+        listed = self._read_file()
+        if listed is None:
+            return False
+        self._file_stamp = stamp
+
+        previous = self._file_admins or set()
+        added = listed - previous
+        removed = previous - listed
+        if not added and not removed:
+            return False
+        for user_id in added:
+            await self.add_admin(user_id)
+        for user_id in removed:
+            await self.remove_admin(user_id)
+        await self._snapshot(listed)
+        logger.info(
+            "Reloaded %s: %d admin(s) added, %d removed",
+            self.admins_file,
+            len(added),
+            len(removed),
+        )
+        return True
+
+    async def start(self, interval=5.0):
+        """Apply edits made to admins_file while the bot was down, then
+        check it for changes every ``interval`` seconds"""
+        if not self.admins_file or self._task is not None:
+            return
+        if self._file_admins is None:
+            # The store imported the file on first start; later edits are
+            # applied relative to this snapshot
+            await self._snapshot(self._read_file() or set())
+        try:
+            await self.reload()
+        except Exception:
+            logger.exception("Failed to reload %s", self.admins_file)
+        self._task = asyncio.create_task(self._watch(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except Exception:
+                logger.exception("Failed to reload %s", self.admins_file)
+
+    def requires(self, role, denied_text="You are not allowed to do that."):
+        """Decorator letting only users with ``role`` run a handler.
+
+        Anyone else is shown ``denied_text`` and the conversation ends.
+        """
+
+        def decorate(handler):
+            @functools.wraps(handler)
+            async def gated(update, context, *args):
+                user = update.effective_user
+                if user is not None and self.has(user.id, role):
+                    return await handler(update, context, *args)
+                if update.callback_query is not None:
+                    await update.callback_query.message.edit_text(denied_text)
+                elif update.effective_message is not None:
+                    await update.effective_message.reply_text(denied_text)
+                return ConversationHandler.END
+
+            return gated
+
+        return decorate
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import logging
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+USER_DATA = "user_data"
+
+
+class SQLitePersistence(BasePersistence):
+    """Keeps conversation states and user data in the bot's Store.
+
+    Only entries that changed are written, one row per user or
+    conversation, instead of dumping everything on every save. Changes
+    reported together by the application (every ``update_interval``
+    seconds and on shutdown) are coalesced into a single transaction on
+    the store's writer thread, so persistence never blocks a handler.
+    Chat, bot and callback data are not used by the bot and not stored.
+    """
+
+    def __init__(self, store, update_interval=5):
+        super().__init__(
+            store_data=PersistenceInput(
+                bot_data=False, chat_data=False, user_data=True, callback_data=False
+            ),
+            update_interval=update_interval,
+        )
+        self._store = store
+        # (kind, key) -> JSON text, or None for a deletion
+        self._pending = {}
+        self._writer = None
+
+    def _queue(self, kind, key, data):
+        if data is not None:
+            try:
+                data = json.dumps(data, separators=(",", ":"))
+            except (TypeError, ValueError):
+                logger.exception("Cannot persist %s %s", kind, key)
+                return
+        self._pending[(kind, key)] = data
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._write_pending())
+
+    async def _write_pending(self):
+        # Let the rest of this round of updates queue up first
+        await asyncio.sleep(0)
+        while self._pending:
+            changes = [(kind, key, data) for (kind, key), data in self._pending.items()]
+            self._pending = {}
+            await self._store.save_persisted(changes)
+
+    async def get_user_data(self):
+        return {
+            int(user_id): data
+            for user_id, data in self._store.load_persisted(USER_DATA).items()
+        }
+
+    async def update_user_data(self, user_id, data):
+        self._queue(USER_DATA, str(user_id), data)
+
+    async def drop_user_data(self, user_id):
+        self._queue(USER_DATA, str(user_id), None)
+
+    async def refresh_user_data(self, user_id, user_data):
+        pass
+
+    async def get_conversations(self, name):
+        return {
+            tuple(json.loads(key)): state
+            for key, state in self._store.load_persisted(f"conversation:{name}").items()
+        }
+
+    async def update_conversation(self, name, key, new_state):
+        self._queue(f"conversation:{name}", json.dumps(list(key)), new_state)
+
+    async def get_chat_data(self):
+        return {}
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def get_bot_data(self):
+        return {}
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def get_callback_data(self):
+        return None
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def flush(self):
+        if self._writer is not None:
+            await self._writer
+        if self._pending:
+            await self._write_pending()
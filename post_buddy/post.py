@@ -0,0 +1,51 @@
+from dataclasses import dataclass, field
+
+# Telegram accepts between 2 and 10 items in one media group
+MAX_ALBUM_SIZE = 10
+
+# Fields a post needs before it can be sent from the GUIs or the batch sender
+REQUIRED_FIELDS = ("channel", "text", "url", "label")
+
+
+@dataclass
+class Post:
+    """One channel post: text, a link button and up to MAX_ALBUM_SIZE images.
+
+    ``images`` holds local paths in the GUIs and the batch sender, and
+    Telegram file_ids in the bot, whose drafts and scheduled posts are kept
+    as plain dicts (see from_dict and to_dict). ``channel`` is empty when
+    the post goes to the bot's configured channels.
+    """
+
+    text: str = ""
+    url: str = ""
+    label: str = ""
+    images: list = field(default_factory=list)
+    channel: str = ""
+
+    @classmethod
+    def from_dict(cls, data):
+        """Post from a draft or schedule payload; older ones have a single "image" """
+        images = data.get("images") or ([data["image"]] if data.get("image") else [])
+        return cls(
+            text=data.get("text") or "",
+            url=data.get("url") or "",
+            label=data.get("label") or "",
+            images=list(images)[:MAX_ALBUM_SIZE],
+            channel=data.get("channel") or "",
+        )
+
+    def to_dict(self):
+        data = {
+            "text": self.text,
+            "url": self.url,
+            "label": self.label,
+            "images": list(self.images),
+        }
+        if self.channel:
+            data["channel"] = self.channel
+        return data
+
+    def missing(self, fields=REQUIRED_FIELDS):
+        """Names of the given fields that are still empty"""
+        return [name for name in fields if not getattr(self, name)]
@@ -0,0 +1,252 @@
+"""The window of telegram_post_buddy_qt.py"""
+
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QLabel,
+    QLineEdit,
+    QTextEdit,
+    QPushButton,
+    QFileDialog,
+    QMessageBox,
+    QDesktopWidget,
+    QHBoxLayout,
+    QComboBox,
+)
+from PyQt5.QtCore import Qt, QObject, pyqtSignal
+from PyQt5.QtGui import QPixmap
+from post_buddy.desktop import DesktopSender, load_env_form, load_templates
+from post_buddy.post import MAX_ALBUM_SIZE, Post
+from post_buddy.thumbnails import ThumbnailCache
+
+# Initialize global variable for the image file paths (several make an album)
+image_paths = []
+
+# Image previews, decoded at reduced size and kept on disk
+thumbnails = ThumbnailCache((300, 300))
+preview_executor = ThreadPoolExecutor(max_workers=1)
+
+
+class SendSignals(QObject):
+    """Carries SendWorker updates from the worker thread to the UI thread"""
+
+    progress = pyqtSignal(int, str, object)
+
+
+class PreviewSignals(QObject):
+    """Delivers finished thumbnails to the UI thread"""
+
+    ready = pyqtSignal(str, object)
+
+
+class TelegramSenderApp(QWidget):
+    def __init__(self):
+        super().__init__()
+
+        # Set up the UI
+        self.setWindowTitle("Telegram Mini App Sender")
+        self.resize(1000, 1300)  # Set window size
+        self.center()  # Center the window
+
+        # Create layout
+        self.layout = QVBoxLayout()
+
+        # Load from .env button
+        self.env_button = QPushButton("Load from .env File")
+        self.env_button.clicked.connect(self.load_env_variables)
+        self.layout.addWidget(self.env_button)
+
+        # Input fields
+        self.token_label = QLabel("Telegram Bot Token:")
+        self.layout.addWidget(self.token_label)
+        self.token_input = QLineEdit()
+        self.layout.addWidget(self.token_input)
+
+        self.channel_label = QLabel("Telegram Channel Name (@channel):")
+        self.layout.addWidget(self.channel_label)
+        self.channel_input = QLineEdit()
+        self.layout.addWidget(self.channel_input)
+
+        self.mini_app_label = QLabel("Telegram Mini App URL:")
+        self.layout.addWidget(self.mini_app_label)
+        self.mini_app_input = QLineEdit()
+        self.layout.addWidget(self.mini_app_input)
+
+        self.button_label_label = QLabel("Mini App Button Label:")
+        self.layout.addWidget(self.button_label_label)
+        self.button_label_input = QLineEdit()
+        self.layout.addWidget(self.button_label_input)
+
+        # Message input
+        self.message_label = QLabel("Write Your Message:")
+        self.layout.addWidget(self.message_label)
+
+        # Templates saved in the bot fill in the message, URL and label
+        self.templates = load_templates()
+        if self.templates:
+            self.template_box = QComboBox()
+            self.template_box.addItem("Use a template...")
+            self.template_box.addItems(list(self.templates))
+            self.template_box.activated[str].connect(self.use_template)
+            self.layout.addWidget(self.template_box)
+        self.message_input = QTextEdit()
+        self.layout.addWidget(self.message_input)
+
+        # Upload image button
+        self.upload_button = QPushButton("Upload Image")
+        self.upload_button.clicked.connect(self.upload_image)
+        self.layout.addWidget(self.upload_button)
+
+        # Image preview (centered)
+        self.image_preview_layout = QHBoxLayout()
+        self.image_label = QLabel()
+        self.image_label.setAlignment(Qt.AlignCenter)
+        self.image_preview_layout.addWidget(self.image_label)
+        self.layout.addLayout(self.image_preview_layout)
+
+        # Send message button
+        self.send_button = QPushButton("Send Message")
+        self.send_button.clicked.connect(self.send_message)
+        self.layout.addWidget(self.send_button)
+
+        # Progress of queued sends
+        self.status_label = QLabel("")
+        self.layout.addWidget(self.status_label)
+
+        # Clear inputs button
+        self.clear_button = QPushButton("Clear Inputs")
+        self.clear_button.clicked.connect(self.clear_inputs)
+        self.layout.addWidget(self.clear_button)
+
+        # Set layout
+        self.setLayout(self.layout)
+
+        # Sends run on a background thread so the window never freezes
+        self.signals = SendSignals()
+        self.signals.progress.connect(self.on_send_progress)
+        self.post_sender = DesktopSender(self.signals.progress.emit)
+        self.post_sender.start()
+
+        # Image previews are decoded off the UI thread
+        self.preview_signals = PreviewSignals()
+        self.preview_signals.ready.connect(self.show_preview)
+
+    def closeEvent(self, event):
+        """Let queued sends finish before the window goes away."""
+        self.post_sender.stop(timeout=10)
+        super().closeEvent(event)
+
+    def center(self):
+        """Center the window on the screen."""
+        screen_geometry = QDesktopWidget().availableGeometry().center()
+        frame_geometry = self.frameGeometry()
+        frame_geometry.moveCenter(screen_geometry)
+        self.move(frame_geometry.topLeft())
+
+    def load_env_variables(self):
+        """Load variables from the .env file."""
+        values = load_env_form()
+        self.token_input.setText(values["token"])
+        self.channel_input.setText(values["channel"])
+        self.mini_app_input.setText(values["url"])
+        self.button_label_input.setText(values["label"])
+        QMessageBox.information(self, "Info", "Loaded credentials from .env file.")
+
+    def use_template(self, name):
+        """Fill the form from a template; its {placeholders} are left to replace."""
+        template = self.templates.get(name)
+        if template is None:
+            return
+        self.message_input.setPlainText(template.text)
+        if template.url:
+            self.mini_app_input.setText(template.url)
+        if template.label:
+            self.button_label_input.setText(template.label)
+        if template.variables:
+            self.status_label.setText(
+                "Replace "
+                + ", ".join(f"{{{name}}}" for name in sorted(template.variables))
+            )
+
+    def upload_image(self):
+        """Upload one image, or several to send as an album, and preview the first."""
+        global image_paths
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, "Upload Image", "", "Image Files (*.png *.jpg *.jpeg *.gif)"
+        )
+        if paths:
+            if len(paths) > MAX_ALBUM_SIZE:
+                QMessageBox.warning(
+                    self,
+                    "Warning",
+                    f"Only the first {MAX_ALBUM_SIZE} images will be sent.",
+                )
+            image_paths = paths[:MAX_ALBUM_SIZE]
+            self.status_label.setText(
+                f"{len(image_paths)} images (album)" if len(image_paths) > 1 else ""
+            )
+            # Build the preview on a worker thread; show_preview gets the result
+            path = image_paths[0]
+            future = preview_executor.submit(thumbnails.get, path)
+            future.add_done_callback(
+                lambda future: self.preview_signals.ready.emit(path, future)
+            )
+
+    def show_preview(self, path, future):
+        """Display a finished thumbnail (runs on the UI thread)."""
+        if not image_paths or path != image_paths[0]:
+            # Another image was picked in the meantime
+            return
+        try:
+            pixmap = QPixmap(future.result())
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to load image: {e}")
+            return
+        self.image_label.setPixmap(pixmap)
+
+    def send_message(self):
+        """Collect input data and queue the message on the send worker."""
+        token = self.token_input.text().strip()
+        # The form may change while the job waits, so capture it now
+        post = Post(
+            channel=self.channel_input.text().strip(),
+            text=self.message_input.toPlainText().strip(),
+            url=self.mini_app_input.text().strip(),
+            label=self.button_label_input.text().strip(),
+            images=list(image_paths),
+        )
+
+        if not token or post.missing():
+            QMessageBox.warning(self, "Error", "All fields are required!")
+            return
+
+        job_id = self.post_sender.submit(token, post)
+        self.status_label.setText(f"Message {job_id} queued")
+
+    def on_send_progress(self, job_id, status, detail):
+        """Show the progress of a queued send (runs on the UI thread)."""
+        if status == "sending":
+            self.status_label.setText(f"Sending message {job_id}...")
+        elif status == "progress":
+            sent, total = detail
+            self.status_label.setText(
+                f"Uploading message {job_id}: {sent * 100 // max(total, 1)}%"
+            )
+        elif status == "sent":
+            self.status_label.setText(f"Message {job_id} sent")
+            QMessageBox.information(self, "Success", "Message sent successfully!")
+        else:
+            self.status_label.setText(f"Message {job_id} failed")
+            QMessageBox.critical(self, "Error", f"Failed to send message: {detail}")
+
+    def clear_inputs(self):
+        """Clear all input fields and reset the form."""
+        global image_paths
+        self.token_input.clear()
+        self.channel_input.clear()
+        self.mini_app_input.clear()
+        self.button_label_input.clear()
+        self.message_input.clear()
+        self.image_label.clear()
+        image_paths = []
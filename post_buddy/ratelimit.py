@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Token bucket that hands out send slots at a fixed rate.
+
+    Tokens may go negative: every caller reserves the next free slot and
+    sleeps until it arrives, so waiters are served in FIFO order without a
+    lock.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def reserve(self):
+        """Take one token and return how long to wait before using it"""
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    async def acquire(self):
+        """Wait until a token is available"""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class RateLimiter:
+    """Per-chat and global limits matching Telegram's broadcast guidance.
+
+    Telegram allows roughly one message per second to the same chat and
+    about thirty messages per second overall.
+    """
+
+    def __init__(self, per_chat_rate=1.0, global_rate=30.0, clock=time.monotonic):
+        self.per_chat_rate = per_chat_rate
+        self._clock = clock
+        self._global = TokenBucket(global_rate, clock=clock)
+        self._chats = {}
+
+    def _bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(
+                self.per_chat_rate, clock=self._clock
+            )
+        return bucket
+
+    async def acquire(self, chat_id):
+        """Wait until a message may be sent to chat_id"""
+        # Take the chat slot first so the global slot is reserved at the
+        # moment the message actually goes out.
+        await self._bucket(chat_id).acquire()
+        await self._global.acquire()
@@ -0,0 +1,144 @@
+import bisect
+
+
+class Registry:
+    """Ordered set of unique values (URLs or labels) with stable integer ids.
+
+    Lookups, inserts, edits and deletes are dictionary operations, so they
+    cost the same whether a few or tens of thousands of values are stored.
+    Each entry also counts how often it has been used in a post, and
+    ``version`` changes whenever values are added, edited or removed so
+    views built from the registry know when to rebuild.
+    """
+
+    def __init__(self, entries=()):
+        self._values = {}  # id -> value, in insertion order
+        self._ids = {}  # value -> id
+        self._uses = {}  # id -> number of posts using the value
+        self._next_id = 1
+        self.version = 0
+        # Lazily rebuilt views used for paging and prefix search
+        self._ordered = ()
+        self._ordered_version = None
+        self._sorted = []
+        self._sorted_version = None
+        for entry_id, value, uses in entries:
+            if value in self._ids:
+                continue
+            self._values[entry_id] = value
+            self._ids[value] = entry_id
+            self._uses[entry_id] = uses
+            self._next_id = max(self._next_id, entry_id + 1)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values.values())
+
+    def __contains__(self, value):
+        return value in self._ids
+
+    def items(self):
+        """(id, value) pairs in insertion order"""
+        return self._values.items()
+
+    def get(self, entry_id):
+        return self._values.get(entry_id)
+
+    def id_of(self, value):
+        return self._ids.get(value)
+
+    def uses(self, entry_id):
+        return self._uses.get(entry_id, 0)
+
+    def add(self, value, entry_id=None):
+        """Store value unless present; return (id, whether it was added).
+
+        entry_id is the id the store assigned; without one the next unused
+        id is taken.
+        """
+        existing = self._ids.get(value)
+        if existing is not None:
+            return existing, False
+        if entry_id is None:
+            entry_id = self._next_id
+        self._next_id = max(self._next_id, entry_id + 1)
+        self._values[entry_id] = value
+        self._ids[value] = entry_id
+        self._uses[entry_id] = 0
+        self.version += 1
+        return entry_id, True
+
+    def replace(self, entry_id, value):
+        """Change the value of an entry in place.
+
+        Raises KeyError for an unknown id and ValueError if another entry
+        already holds the new value.
+        """
+        old_value = self._values[entry_id]
+        if value == old_value:
+            return
+        if value in self._ids:
+            raise ValueError(f"{value!r} is already stored")
+        del self._ids[old_value]
+        self._values[entry_id] = value
+        self._ids[value] = entry_id
+        self.version += 1
+
+    def remove(self, entry_id):
+        """Delete an entry and return its value, or None if it is unknown"""
+        value = self._values.pop(entry_id, None)
+        if value is not None:
+            del self._ids[value]
+            del self._uses[entry_id]
+            self.version += 1
+        return value
+
+    def page(self, page, page_size, prefix=None):
+        """Return (entries, page, pages) for one page of (id, value) pairs.
+
+        Without a prefix entries are in insertion order; with one only values
+        starting with it (ignoring case) are listed, alphabetically. page is
+        clamped to the valid range. Only the requested slice is materialised,
+        so the cost does not grow with the size of the registry.
+        """
+        if prefix:
+            keys = self._sorted_keys()
+            folded = prefix.casefold()
+            start = bisect.bisect_left(keys, (folded,))
+            # Every key starting with the prefix sorts below prefix + U+10FFFF
+            end = bisect.bisect_left(keys, (folded + "\U0010ffff",), start)
+            total = end - start
+        else:
+            ordered = self._ordered_ids()
+            start, total = 0, len(ordered)
+
+        pages = max(1, -(-total // page_size))
+        page = min(max(page, 0), pages - 1)
+        first = start + page * page_size
+        last = min(start + total, first + page_size)
+        if prefix:
+            ids = [keys[i][1] for i in range(first, last)]
+        else:
+            ids = ordered[first:last]
+        return [(entry_id, self._values[entry_id]) for entry_id in ids], page, pages
+
+    def _ordered_ids(self):
+        if self._ordered_version != self.version:
+            self._ordered = tuple(self._values)
+            self._ordered_version = self.version
+        return self._ordered
+
+    def _sorted_keys(self):
+        if self._sorted_version != self.version:
+            self._sorted = sorted(
+                (value.casefold(), entry_id) for entry_id, value in self._values.items()
+            )
+            self._sorted_version = self.version
+        return self._sorted
+
+    def record_use(self, entry_id):
+        """Count one more post using the entry"""
+        if entry_id in self._uses:
+            self._uses[entry_id] += 1
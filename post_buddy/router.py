@@ -0,0 +1,26 @@
+from post_buddy import callbacks
+
+
+class CallbackRouter:
+    """Look up the handler for a button's callback_data in constant time.
+
+    Plain callbacks such as ``"insert_post"`` are matched exactly; callbacks
+    produced by :func:`post_buddy.callbacks.encode` are matched by opcode and
+    their id is passed to the handler as an extra argument.
+    """
+
+    def __init__(self, routes=None, opcode_routes=None):
+        self._routes = dict(routes or {})
+        self._opcode_routes = dict(opcode_routes or {})
+
+    def resolve(self, data):
+        """Return (handler, extra args), or (None, ()) if nothing matches"""
+        handler = self._routes.get(data)
+        if handler is not None:
+            return handler, ()
+        decoded = callbacks.decode(data)
+        if decoded is not None:
+            handler = self._opcode_routes.get(decoded[0])
+            if handler is not None:
+                return handler, (decoded[1],)
+        return None, ()
@@ -0,0 +1,145 @@
+import asyncio
+import heapq
+import logging
+import re
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+_DELAY = re.compile(r"^\+?\s*(\d+)\s*([mhd])$")
+_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def parse_send_time(text, now=None):
+    """Parse "30m", "2h", "1d" or "YYYY-MM-DD HH:MM" (local time) to a timestamp.
+
+    Returns None if the text is not understood.
+    """
+    now = time.time() if now is None else now
+    text = text.strip().lower()
+    match = _DELAY.match(text)
+    if match:
+        return now + int(match.group(1)) * _UNITS[match.group(2)]
+    try:
+        return datetime.strptime(text, "%Y-%m-%d %H:%M").timestamp()
+    except ValueError:
+        return None
+
+
+class PostScheduler:
+    """Persistent queue of posts to be sent later.
+
+    Posts are kept in the store and, in memory, in a heap ordered by send
+    time. A single task sleeps until the earliest post is due (or a new one
+    is queued ahead of it), so thousands of queued posts cost one timer.
+
+    Delivery is at most once: a post is marked as sending before it goes
+    out and as sent afterwards. A post still marked as sending after a
+    restart may or may not have reached the channels, so it is flagged as
+    interrupted instead of being sent again. A post whose delivery fails
+    while the scheduler is stopping is put back to pending and sent on the
+    next start, since the failure is most likely the shutdown itself.
+    """
+
+    def __init__(self, store, concurrency=10):
+        self._store = store
+        self._concurrency = concurrency
+        self._heap = []
+        self._wakeup = None
+        self._task = None
+        self._deliver = None
+        self._sending = set()
+        self._stopping = False
+
+    def __len__(self):
+        return len(self._heap)
+
+    def start(self, deliver):
+        """Load pending posts and start dispatching them with ``await deliver(post)``"""
+        interrupted = self._store.mark_interrupted()
+        if interrupted:
+            logger.warning(
+                "%d scheduled post(s) were being sent during shutdown and "
+                "will not be resent",
+                interrupted,
+            )
+        self._heap = [
+            (send_at, post_id, payload)
+            for post_id, send_at, payload in self._store.load_scheduled()
+        ]
+        heapq.heapify(self._heap)
+        self._deliver = deliver
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop dispatching and wait for posts already going out"""
+        self._stopping = True
+        try:
+            if self._task is not None:
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+                self._task = None
+            # Let posts already going out finish and record their status
+            if self._sending:
+                await asyncio.gather(*self._sending, return_exceptions=True)
+        finally:
+            self._stopping = False
+
+    async def schedule(self, post, send_at):
+        """Queue post (a JSON-serialisable dict) for send_at; return its id"""
+        post_id = await self._store.add_scheduled(send_at, post)
+        heapq.heappush(self._heap, (send_at, post_id, post))
+        if self._wakeup is not None and self._heap[0][1] == post_id:
+            # New earliest post: re-arm the timer
+            self._wakeup.set()
+        return post_id
+
+    async def _run(self):
+        semaphore = asyncio.Semaphore(self._concurrency)
+        while True:
+            self._wakeup.clear()
+            if self._heap:
+                delay = self._heap[0][0] - time.time()
+            else:
+                delay = None
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, post_id, post = heapq.heappop(self._heap)
+                await semaphore.acquire()
+                task = asyncio.create_task(self._send(post_id, post, semaphore))
+                self._sending.add(task)
+                task.add_done_callback(self._sending.discard)
+
+    async def _send(self, post_id, post, semaphore):
+        try:
+            await self._store.set_scheduled_status(post_id, "sending")
+            try:
+                await self._deliver(post)
+            except Exception as e:
+                if self._stopping:
+                    logger.warning(
+                        "Scheduled post %s was interrupted by shutdown and "
+                        "will be sent on the next start",
+                        post_id,
+                        exc_info=True,
+                    )
+                    await self._store.set_scheduled_status(post_id, "pending")
+                else:
+                    logger.exception("Scheduled post %s failed", post_id)
+                    await self._store.set_scheduled_status(post_id, "failed", str(e))
+            else:
+                await self._store.set_scheduled_status(post_id, "sent")
+        finally:
+            semaphore.release()
@@ -0,0 +1,227 @@
+import asyncio
+import contextlib
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
+from telegram.error import BadRequest, TelegramError
+
+from post_buddy.file_id_cache import is_stale_file_id_error, send_photo_cached
+from post_buddy.post import MAX_ALBUM_SIZE
+from post_buddy.upload import upload_file
+
+
+def button_markup(url, label):
+    return InlineKeyboardMarkup([[InlineKeyboardButton(label, url=url)]])
+
+
+async def send_button_post(
+    bot,
+    channel,
+    text,
+    url,
+    label,
+    image_path=None,
+    file_id_cache=None,
+    image_preprocessor=None,
+    progress=None,
+):
+    """Send text with a single link button, as a photo caption if there is an image.
+
+    Shared by the GUIs and the batch sender. With image_preprocessor the
+    image is shrunk before upload; with file_id_cache an earlier upload of
+    the same image is reused. Uploads are streamed from disk and reported
+    to ``progress``, an UploadProgress.
+    """
+    reply_markup = button_markup(url, label)
+
+    if not image_path:
+        return await bot.send_message(
+            chat_id=channel, text=text, reply_markup=reply_markup
+        )
+
+    if image_preprocessor is not None:
+        # Upload a resized copy without metadata instead of the original
+        image_path = await image_preprocessor.prepare(image_path)
+    if file_id_cache is not None:
+        return await send_photo_cached(
+            bot,
+            file_id_cache,
+            channel,
+            image_path,
+            progress,
+            caption=text,
+            reply_markup=reply_markup,
+        )
+    with upload_file(image_path, progress) as photo:
+        return await bot.send_photo(
+            chat_id=channel, photo=photo, caption=text, reply_markup=reply_markup
+        )
+
+
+def album_media(photos, caption):
+    """InputMediaPhoto list with the caption on the first item, as Telegram shows it"""
+    return [
+        InputMediaPhoto(photo, caption=caption if i == 0 else None)
+        for i, photo in enumerate(photos)
+    ]
+
+
+async def send_album(bot, chat_id, photos, text, url, label, before_button=None):
+    """Send photos (file_ids or open files) as one album, then the link button.
+
+    Media groups cannot carry an inline keyboard, so the button follows in
+    a separate message with the label as its text. ``await before_button()``
+    runs between the two, e.g. to wait for a rate limiter.
+    """
+    messages = await bot.send_media_group(
+        chat_id=chat_id, media=album_media(photos, text or None)
+    )
+    if before_button is not None:
+        await before_button()
+    await bot.send_message(
+        chat_id=chat_id, text=label, reply_markup=button_markup(url, label)
+    )
+    return messages
+
+
+async def send_prepared_post(bot, chat_id, post, before_button=None):
+    """Send a Post whose images are already file_ids or URLs, as the bot has them.
+
+    Several images go out as an album followed by the button (see
+    send_album); ``before_button`` is only awaited in that case.
+    """
+    if len(post.images) > 1:
+        return await send_album(
+            bot,
+            chat_id,
+            post.images,
+            post.text,
+            post.url,
+            post.label,
+            before_button=before_button,
+        )
+    reply_markup = button_markup(post.url, post.label)
+    if post.images:
+        return await bot.send_photo(
+            chat_id=chat_id,
+            photo=post.images[0],
+            caption=post.text,
+            reply_markup=reply_markup,
+        )
+    return await bot.send_message(
+        chat_id=chat_id, text=post.text, reply_markup=reply_markup
+    )
+
+
+async def upload_file_ids(bot, file_id_cache, staging_chat, image_paths, progress=None):
+    """file_ids for image_paths, uploading the uncached ones in parallel.
+
+    Each upload is a photo sent silently to staging_chat and deleted again
+    once Telegram has assigned its file_id.
+    """
+
+    async def upload(image_path):
+        key = file_id_cache.key(bot.token, image_path)
+        file_id = file_id_cache.get(key)
+        if file_id:
+            return file_id
+        with upload_file(image_path, progress) as photo:
+            message = await bot.send_photo(
+                chat_id=staging_chat, photo=photo, disable_notification=True
+            )
+        file_id = message.photo[-1].file_id
+        file_id_cache.put(key, file_id)
+        with contextlib.suppress(TelegramError):
+            await bot.delete_message(staging_chat, message.message_id)
+        return file_id
+
+    return await asyncio.gather(*map(upload, image_paths))
+
+
+async def send_album_post(
+    bot,
+    channel,
+    text,
+    url,
+    label,
+    image_paths,
+    file_id_cache=None,
+    image_preprocessor=None,
+    staging_chat=None,
+    progress=None,
+    before_button=None,
+):
+    """Send a post with any number of local images; several become one album.
+
+    With file_id_cache and staging_chat the images are uploaded in parallel
+    first and the album is sent by file_id; otherwise the album request
+    uploads them all itself, and with file_id_cache the file_ids Telegram
+    assigns are kept so sending the same images again needs no upload.
+    ``progress`` (an UploadProgress) follows the uploads; ``before_button``
+    is awaited before an album's button message (see send_album).
+    """
+    image_paths = list(image_paths)[:MAX_ALBUM_SIZE]
+    if len(image_paths) <= 1:
+        return await send_button_post(
+            bot,
+            channel,
+            text,
+            url,
+            label,
+            image_paths[0] if image_paths else None,
+            file_id_cache,
+            image_preprocessor,
+            progress,
+        )
+
+    if image_preprocessor is not None:
+        image_paths = await asyncio.gather(
+            *map(image_preprocessor.prepare, image_paths)
+        )
+    if file_id_cache is not None and staging_chat:
+        file_ids = await upload_file_ids(
+            bot, file_id_cache, staging_chat, image_paths, progress
+        )
+        try:
+            return await send_album(
+                bot, channel, file_ids, text, url, label, before_button
+            )
+        except BadRequest as e:
+            if not is_stale_file_id_error(e):
+                raise
+            # A cached id has expired: forget them all and upload again
+            for image_path in image_paths:
+                file_id_cache.invalidate(file_id_cache.key(bot.token, image_path))
+            file_ids = await upload_file_ids(
+                bot, file_id_cache, staging_chat, image_paths, progress
+            )
+            return await send_album(
+                bot, channel, file_ids, text, url, label, before_button
+            )
+
+    keys = []
+    if file_id_cache is not None:
+        keys = [file_id_cache.key(bot.token, path) for path in image_paths]
+        file_ids = [file_id_cache.get(key) for key in keys]
+        if all(file_ids):
+            try:
+                return await send_album(
+                    bot, channel, file_ids, text, url, label, before_button
+                )
+            except BadRequest as e:
+                if not is_stale_file_id_error(e):
+                    raise
+                for key in keys:
+                    file_id_cache.invalidate(key)
+    with contextlib.ExitStack() as stack:
+        photos = [
+            stack.enter_context(upload_file(path, progress, attach=True))
+            for path in image_paths
+        ]
+        messages = await send_album(
+            bot, channel, photos, text, url, label, before_button
+        )
+    # Keep the ids of the uploaded images, in album order
+    for key, message in zip(keys, messages):
+        if message.photo:
+            file_id_cache.put(key, message.photo[-1].file_id)
+    return messages
@@ -0,0 +1,316 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from post_buddy.metrics import STORE_WRITE_SECONDS
+
+STORE_FILE = "post_buddy.db"
+
+# Registry kinds and the tables holding them
+TABLES = {"urls": "urls", "labels": "labels"}
+
+# Table a write statement touches, used to label its duration
+_WRITTEN_TABLE = re.compile(r"\b(?:INTO|FROM|UPDATE)\s+(\w+)")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS admins (user_id TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    value TEXT NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS scheduled_posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    send_at REAL NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS scheduled_posts_status
+    ON scheduled_posts (status, send_at);
+CREATE TABLE IF NOT EXISTS persistence (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS labels (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    value TEXT NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS templates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL DEFAULT '',
+    url TEXT NOT NULL DEFAULT '',
+    label TEXT NOT NULL DEFAULT '',
+    image TEXT NOT NULL DEFAULT ''
+);
+"""
+
+
+# Columns of a stored post template
+TEMPLATE_COLUMNS = ("name", "text", "url", "label", "image")
+
+
+def _select_templates(conn):
+    rows = conn.execute(
+        f"SELECT id, {', '.join(TEMPLATE_COLUMNS)} FROM templates ORDER BY name"
+    )
+    return [(row[0], dict(zip(TEMPLATE_COLUMNS, row[1:]))) for row in rows]
+
+
+def read_templates(path=STORE_FILE):
+    """Stored templates as (id, dict) ordered by name, without writing.
+
+    Used by the GUIs and the batch sender, which only read templates; a
+    missing database or one from before templates existed has none.
+    """
+    if not os.path.exists(path):
+        return []
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return _select_templates(conn)
+    except sqlite3.OperationalError:
+        return []
+    finally:
+        conn.close()
+
+
+class Store:
+    """SQLite store for admins, URLs, labels, templates, scheduled posts and drafts.
+
+    The database runs in WAL mode and every edit is a single statement, so a
+    change costs the same no matter how many rows exist and a crash can
+    never leave a half-written file behind. Reads happen once at startup;
+    writes run on one dedicated thread (keeping them in submission order) so
+    handlers awaiting them never block the event loop.
+    """
+
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="post-buddy-store"
+        )
+
+    def _migrate(self):
+        """Bring databases created by older versions up to date"""
+        for table in TABLES.values():
+            columns = {
+                row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")
+            }
+            if "uses" not in columns:
+                self._conn.execute(
+                    f"ALTER TABLE {table} ADD COLUMN uses INTEGER NOT NULL DEFAULT 0"
+                )
+            # Values are unique; keep the oldest copy of any duplicate
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE id NOT IN "
+                f"(SELECT MIN(id) FROM {table} GROUP BY value)"
+            )
+            self._conn.execute(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_value ON {table} (value)"
+            )
+
+    def import_json(self, admins_file, urls_file):
+        """Copy the legacy JSON files into the database on first start"""
+        if self._conn.execute(
+            "SELECT 1 FROM meta WHERE key = 'imported_json'"
+        ).fetchone():
+            return
+        try:
+            with open(admins_file, "r") as f:
+                admins = json.load(f)
+        except FileNotFoundError:
+            admins = []
+        try:
+            with open(urls_file, "r") as f:
+                urls_and_labels = json.load(f)
+        except FileNotFoundError:
+            urls_and_labels = {}
+
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO admins (user_id) VALUES (?)",
+                [(str(admin_id),) for admin_id in admins],
+            )
+            for kind, table in TABLES.items():
+                self._conn.executemany(
+                    f"INSERT OR IGNORE INTO {table} (value) VALUES (?)",
+                    [(value,) for value in urls_and_labels.get(kind, [])],
+                )
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO templates ({', '.join(TEMPLATE_COLUMNS)}) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    tuple(template.get(column) or "" for column in TEMPLATE_COLUMNS)
+                    for template in urls_and_labels.get("templates", [])
+                    if template.get("name")
+                ],
+            )
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('imported_json', '1')"
+            )
+
+    def load_admins(self):
+        """Load admins as a set of user id strings"""
+        return {row[0] for row in self._conn.execute("SELECT user_id FROM admins")}
+
+    def load_entries(self, kind):
+        """Load the stored URLs or labels as (id, value, uses) in insertion order"""
+        return self._conn.execute(
+            f"SELECT id, value, uses FROM {TABLES[kind]} ORDER BY id"
+        ).fetchall()
+
+    def _execute(self, sql, params):
+        with STORE_WRITE_SECONDS.time(_WRITTEN_TABLE.search(sql).group(1)):
+            return self._conn.execute(sql, params).lastrowid
+
+    async def _write(self, sql, params=()):
+        """Run one statement on the writer thread and return the new row id"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._execute, sql, params)
+
+    def get_meta(self, key):
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    async def set_meta(self, key, value):
+        await self._write(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    async def add_admin(self, user_id):
+        await self._write(
+            "INSERT OR IGNORE INTO admins (user_id) VALUES (?)", (str(user_id),)
+        )
+
+    async def remove_admin(self, user_id):
+        await self._write("DELETE FROM admins WHERE user_id = ?", (str(user_id),))
+
+    def _insert_value(self, table, value):
+        with STORE_WRITE_SECONDS.time(table):
+            cursor = self._conn.execute(
+                f"INSERT OR IGNORE INTO {table} (value) VALUES (?)", (value,)
+            )
+            if cursor.rowcount:
+                return cursor.lastrowid
+            return self._conn.execute(
+                f"SELECT id FROM {table} WHERE value = ?", (value,)
+            ).fetchone()[0]
+
+    async def add_value(self, kind, value):
+        """Store a URL or label and return its id.
+
+        Ids are assigned by SQLite (AUTOINCREMENT), so an id is never
+        handed out again after its entry is deleted, even across restarts,
+        and old buttons carrying it cannot act on a newer entry. A value
+        that is already stored keeps its id.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._insert_value, TABLES[kind], value
+        )
+
+    async def remove_value(self, kind, entry_id):
+        await self._write(f"DELETE FROM {TABLES[kind]} WHERE id = ?", (entry_id,))
+
+    async def replace_value(self, kind, entry_id, value):
+        await self._write(
+            f"UPDATE {TABLES[kind]} SET value = ? WHERE id = ?", (value, entry_id)
+        )
+
+    async def record_use(self, kind, entry_id):
+        await self._write(
+            f"UPDATE {TABLES[kind]} SET uses = uses + 1 WHERE id = ?", (entry_id,)
+        )
+
+    def load_templates(self):
+        """Stored templates as (id, dict) ordered by name"""
+        return _select_templates(self._conn)
+
+    async def save_template(self, template):
+        """Store a template dict, replacing one of the same name; return its id"""
+        return await self._write(
+            f"INSERT OR REPLACE INTO templates ({', '.join(TEMPLATE_COLUMNS)}) "
+            "VALUES (?, ?, ?, ?, ?)",
+            tuple(template.get(column) or "" for column in TEMPLATE_COLUMNS),
+        )
+
+    async def remove_template(self, template_id):
+        await self._write("DELETE FROM templates WHERE id = ?", (template_id,))
+
+    def load_scheduled(self):
+        """Pending scheduled posts as (id, send_at, payload dict)"""
+        rows = self._conn.execute(
+            "SELECT id, send_at, payload FROM scheduled_posts "
+            "WHERE status = 'pending' ORDER BY send_at"
+        )
+        return [(row[0], row[1], json.loads(row[2])) for row in rows]
+
+    def mark_interrupted(self):
+        """Flag posts whose delivery was cut short so they are never resent.
+
+        Returns how many posts were affected.
+        """
+        return self._conn.execute(
+            "UPDATE scheduled_posts SET status = 'interrupted' "
+            "WHERE status = 'sending'"
+        ).rowcount
+
+    async def add_scheduled(self, send_at, payload):
+        """Queue a post and return its id"""
+        return await self._write(
+            "INSERT INTO scheduled_posts (send_at, payload) VALUES (?, ?)",
+            (send_at, json.dumps(payload)),
+        )
+
+    async def set_scheduled_status(self, post_id, status, error=None):
+        await self._write(
+            "UPDATE scheduled_posts SET status = ?, error = ? WHERE id = ?",
+            (status, error, post_id),
+        )
+
+    def load_persisted(self, kind):
+        """Persisted conversation or user data of one kind as {key: value}"""
+        rows = self._conn.execute(
+            "SELECT key, data FROM persistence WHERE kind = ?", (kind,)
+        )
+        return {key: json.loads(data) for key, data in rows}
+
+    def _save_persisted(self, changes):
+        with STORE_WRITE_SECONDS.time("persistence"), self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO persistence (kind, key, data) VALUES (?, ?, ?)",
+                [change for change in changes if change[2] is not None],
+            )
+            self._conn.executemany(
+                "DELETE FROM persistence WHERE kind = ? AND key = ?",
+                [change[:2] for change in changes if change[2] is None],
+            )
+
+    async def save_persisted(self, changes):
+        """Apply (kind, key, JSON text or None to delete) changes in one transaction"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._save_persisted, changes)
+
+    def close(self):
+        """Finish pending writes and close the database"""
+        self._executor.shutdown(wait=True)
+        self._conn.close()
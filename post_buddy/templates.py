@@ -0,0 +1,119 @@
+import logging
+import string
+
+from post_buddy.post import Post
+
+logger = logging.getLogger(__name__)
+
+# Template fields that may contain placeholders
+TEMPLATE_FIELDS = ("text", "url", "label")
+
+# The image column holds an album's file_ids joined by this; file_ids never
+# contain it
+IMAGE_SEPARATOR = ";"
+
+
+class TemplateError(ValueError):
+    """A template that cannot be compiled or rendered"""
+
+
+def compile_field(source):
+    """Turn "Hi {name}" into ("Hi %(name)s", {"name"}).
+
+    Only plain names are accepted as placeholders: attribute and index
+    lookups, conversions and format specs are rejected, so a template typed
+    into the bot cannot reach into the values it is rendered with.
+    """
+    parts = []
+    names = set()
+    try:
+        parsed = list(string.Formatter().parse(source))
+    except ValueError as e:
+        raise TemplateError(f"{e} (write {{{{ and }}}} for literal braces)") from None
+    for literal, name, spec, conversion in parsed:
+        parts.append(literal.replace("%", "%%"))
+        if name is None:
+            continue
+        if not name.isidentifier() or spec or conversion:
+            raise TemplateError(f"invalid placeholder {{{name}}}, use {{name}}")
+        parts.append(f"%({name})s")
+        names.add(name)
+    return "".join(parts), names
+
+
+class Template:
+    """Reusable post: text, URL and label with {name} placeholders, and images.
+
+    The placeholders are parsed once, when the template is created, into
+    %-style format strings, so rendering a variant is one substitution per
+    field however many variants are rendered. ``images`` are Telegram
+    file_ids, used as the post's image or album by the bot.
+    """
+
+    def __init__(self, name, text="", url="", label="", images=()):
+        self.name = name
+        self.text = text
+        self.url = url
+        self.label = label
+        self.images = list(images)
+        compiled = [compile_field(getattr(self, field)) for field in TEMPLATE_FIELDS]
+        self._formats = tuple(fmt for fmt, _ in compiled)
+        self.variables = frozenset().union(*(names for _, names in compiled))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["name"],
+            data.get("text") or "",
+            data.get("url") or "",
+            data.get("label") or "",
+            [
+                file_id
+                for file_id in (data.get("image") or "").split(IMAGE_SEPARATOR)
+                if file_id
+            ],
+        )
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "text": self.text,
+            "url": self.url,
+            "label": self.label,
+            "image": IMAGE_SEPARATOR.join(self.images),
+        }
+
+    def missing(self, values):
+        """Placeholders that values has no entry for, sorted"""
+        return sorted(name for name in self.variables if name not in values)
+
+    def render(self, values, channel=""):
+        """Post with every placeholder replaced by its entry in values.
+
+        Raises TemplateError naming the placeholders values lacks.
+        """
+        text_format, url_format, label_format = self._formats
+        try:
+            return Post(
+                text=text_format % values,
+                url=url_format % values,
+                label=label_format % values,
+                images=list(self.images),
+                channel=channel,
+            )
+        except KeyError:
+            raise TemplateError(f"missing {', '.join(self.missing(values))}") from None
+
+
+def compile_templates(rows):
+    """{id: Template} for stored (id, template dict) rows.
+
+    Templates that no longer compile are logged and left out.
+    """
+    templates = {}
+    for template_id, data in rows:
+        try:
+            templates[template_id] = Template.from_dict(data)
+        except TemplateError as e:
+            logger.warning("Skipping template %r: %s", data.get("name"), e)
+    return templates
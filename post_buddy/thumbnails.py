@@ -0,0 +1,57 @@
+import hashlib
+import os
+import threading
+
+CACHE_DIR = os.path.join(".post_buddy_cache", "thumbnails")
+
+
+class ThumbnailCache:
+    """Small preview images kept on disk, keyed by path, mtime and size.
+
+    JPEGs are decoded in draft mode, which lets libjpeg scale them down by
+    up to 8x while decoding, so previewing a 50-megapixel photo never
+    materialises the full-resolution bitmap. get() does file I/O and
+    decoding; GUIs call it off the UI thread and display the small PNG it
+    returns.
+    """
+
+    def __init__(self, size, cache_dir=CACHE_DIR):
+        self.size = size
+        self.cache_dir = cache_dir
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def _cache_path(self, image_path, stat):
+        key = f"{os.path.abspath(image_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        width, height = self.size
+        return os.path.join(self.cache_dir, f"{digest}-{width}x{height}.png")
+
+    def get(self, image_path):
+        """Path of a thumbnail of image_path no larger than self.size"""
+        stat = os.stat(image_path)
+        stamp = (image_path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            path = self._paths.get(stamp)
+        if path is not None and os.path.exists(path):
+            return path
+
+        path = self._cache_path(image_path, stat)
+        if not os.path.exists(path):
+            # Imported on the calling worker thread, not at GUI start-up
+            from PIL import Image, ImageOps
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with Image.open(image_path) as image:
+                # Only JPEG supports reduced decoding; a no-op for other formats
+                image.draft("RGB", self.size)
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail(self.size)
+                if image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+                    image = image.convert("RGB")
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                image.save(tmp_path, "PNG")
+            os.replace(tmp_path, path)
+        with self._lock:
+            self._paths[stamp] = path
+        return path
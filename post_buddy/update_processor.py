@@ -0,0 +1,68 @@
+import asyncio
+
+from telegram.ext import BaseUpdateProcessor
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Process updates concurrently while keeping each user's updates in order.
+
+    Updates from different users run in parallel (up to
+    ``max_concurrent_updates``), but a user's next update only starts once
+    the previous one has finished, so conversation state never sees two
+    steps of the same user interleaved.
+    """
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        # key -> [lock, number of updates holding or waiting for it]
+        self._locks = {}
+        self._accepted = 0
+
+    @property
+    def waiting(self):
+        """Updates accepted but still waiting for their user's turn or a slot"""
+        return self._accepted - self.current_concurrent_updates
+
+    @staticmethod
+    def _key(update):
+        user = getattr(update, "effective_user", None)
+        if user is not None:
+            return user.id
+        chat = getattr(update, "effective_chat", None)
+        return chat.id if chat is not None else None
+
+    async def process_update(self, update, coroutine):
+        self._accepted += 1
+        try:
+            await self._process_in_order(update, coroutine)
+        finally:
+            self._accepted -= 1
+
+    async def _process_in_order(self, update, coroutine):
+        key = self._key(update)
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            # Queue on the user's lock before taking a concurrency slot, so a
+            # user with a backlog does not starve everybody else
+            async with entry[0]:
+                await super().process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    async def do_process_update(self, update, coroutine):
+        await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
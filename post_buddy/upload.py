@@ -0,0 +1,128 @@
+import contextlib
+import mmap
+import os
+
+from telegram import InputFile
+
+
+class UploadProgress:
+    """Bytes uploaded out of the total of every file opened with it.
+
+    ``callback(sent, total)`` is called whenever another ``step`` bytes
+    have been sent and once the last byte is out, so a UI is updated a
+    bounded number of times however large the files are. A retried upload
+    rereads its file from the start, which moves ``sent`` back.
+    """
+
+    def __init__(self, callback, step=1 << 20):
+        self._callback = callback
+        self._step = step
+        self.sent = 0
+        self.total = 0
+        self._reported = 0
+
+    def add(self, size):
+        self.total += size
+
+    def advance(self, count):
+        self.sent += count
+        if (
+            count < 0
+            or self.sent == self.total
+            or self.sent - self._reported >= self._step
+        ):
+            self._reported = self.sent
+            self._callback(self.sent, self.total)
+
+
+class UploadReader:
+    """Read-only file that is read in chunks as the request body is sent.
+
+    python-telegram-bot normally reads a whole file into memory before
+    encoding the request. Wrapped in an InputFile with
+    ``read_file_handle=False`` (see upload_file) this object is handed to
+    httpx instead, which pulls 64 KiB at a time, so memory use does not
+    grow with the file. httpx seeks back to the start when a request is
+    retried.
+
+    With ``use_mmap`` the file is read through a memory map whose pages
+    are released again as soon as they have been sent.
+    """
+
+    def __init__(self, path, on_read=None, use_mmap=False):
+        self.name = path
+        self._file = open(path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._on_read = on_read
+        self._position = 0
+        self._mmap = None
+        if use_mmap and self.size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def fileno(self):
+        # Lets httpx size the body with fstat instead of reading it
+        return self._file.fileno()
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        if self._mmap is None:
+            self._file.seek(offset)
+        if self._on_read is not None and offset != self._position:
+            self._on_read(offset - self._position)
+        self._position = offset
+        return offset
+
+    def read(self, size=-1):
+        if self._mmap is None:
+            data = self._file.read(size)
+        else:
+            end = self.size if size is None or size < 0 else self._position + size
+            data = self._mmap[self._position : end]
+            self._release(self._position, self._position + len(data))
+        self._position += len(data)
+        if self._on_read is not None and data:
+            self._on_read(len(data))
+        return data
+
+    def _release(self, start, end):
+        """Drop mapped pages that have been sent from the resident set"""
+        advice = getattr(mmap, "MADV_DONTNEED", None)
+        start -= start % mmap.PAGESIZE
+        if advice is not None and end > start:
+            with contextlib.suppress(OSError):
+                self._mmap.madvise(advice, start, end - start)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+
+@contextlib.contextmanager
+def upload_file(path, progress=None, attach=False, use_mmap=False):
+    """InputFile streaming path from disk, for use as a photo or document.
+
+    Pass ``attach=True`` for files inside InputMedia (albums). The file is
+    closed when the block exits, so the request must be sent inside it.
+    """
+    reader = UploadReader(
+        path, progress.advance if progress is not None else None, use_mmap
+    )
+    if progress is not None:
+        progress.add(reader.size)
+    try:
+        yield InputFile(
+            reader,
+            filename=os.path.basename(path),
+            attach=attach,
+            read_file_handle=False,
+        )
+    finally:
+        reader.close()
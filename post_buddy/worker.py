@@ -0,0 +1,118 @@
+import asyncio
+import concurrent.futures
+import itertools
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SendWorker:
+    """Background thread owning one event loop and one Bot per token.
+
+    GUI callbacks hand sends to the worker instead of calling asyncio.run,
+    so the window stays responsive and back-to-back sends reuse the same
+    HTTP connection pool. Jobs run one at a time, in the order submitted.
+
+    ``listener(job_id, status, detail)`` is called on the worker thread
+    with status "sending", "progress" (detail is whatever the job passed to
+    report_progress), "sent" (detail is the result) or "failed" (detail is
+    the exception); GUIs must hand it over to their own thread.
+    """
+
+    def __init__(self, listener=None):
+        self._listener = listener
+        self._loop = asyncio.new_event_loop()
+        self._queue = None
+        self._bots = {}
+        self._ids = itertools.count(1)
+        self._current_job = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="send-worker", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self, timeout=None):
+        """Finish queued jobs, close the bots and end the thread"""
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+            self._thread.join(timeout)
+
+    def submit(self, token, send):
+        """Queue ``await send(bot)``; return (job_id, concurrent Future)"""
+        job_id = next(self._ids)
+        future = concurrent.futures.Future()
+        self._loop.call_soon_threadsafe(
+            self._queue.put_nowait, (job_id, token, send, future)
+        )
+        return job_id, future
+
+    def report_progress(self, detail):
+        """Tell the listener how the running job is doing (worker thread only)"""
+        if self._current_job is not None:
+            self._notify(self._current_job, "progress", detail)
+
+    def _notify(self, job_id, status, detail=None):
+        if self._listener is not None:
+            try:
+                self._listener(job_id, status, detail)
+            except Exception:
+                logger.exception("Send listener failed")
+
+    async def bot(self, token):
+        """Long-lived Bot for token, created on first use"""
+        bot = self._bots.get(token)
+        if bot is None:
+            # telegram is loaded by the first send, on the worker thread, so
+            # it does not slow down opening the window
+            from telegram import Bot
+
+            from post_buddy.delivery import RetryingRequest
+
+            # Flood waits and network errors are retried before a job fails
+            bot = Bot(token=token, request=RetryingRequest())
+            await bot.initialize()
+            self._bots[token] = bot
+        return bot
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve())
+        finally:
+            self._loop.close()
+
+    async def _serve(self):
+        self._queue = asyncio.Queue()
+        self._ready.set()
+        try:
+            while True:
+                job = await self._queue.get()
+                if job is None:
+                    break
+                job_id, token, send, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._notify(job_id, "sending")
+                self._current_job = job_id
+                try:
+                    result = await send(await self.bot(token))
+                except Exception as e:
+                    future.set_exception(e)
+                    self._notify(job_id, "failed", e)
+                else:
+                    future.set_result(result)
+                    self._notify(job_id, "sent", result)
+                finally:
+                    self._current_job = None
+        finally:
+            for bot in self._bots.values():
+                try:
+                    await bot.shutdown()
+                except Exception:
+                    logger.exception("Failed to shut down bot")
+            self._bots.clear()
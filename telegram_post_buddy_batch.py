@@ -0,0 +1,287 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+from telegram import Bot
+
+from post_buddy.delivery import RetryingRequest
+from post_buddy.fanout import fan_out_stream
+from post_buddy.file_id_cache import FileIdCache
+from post_buddy.imaging import ImagePreprocessor
+from post_buddy.post import Post
+from post_buddy.ratelimit import RateLimiter
+from post_buddy.sender import send_album_post
+from post_buddy.storage import STORE_FILE, read_templates
+from post_buddy.templates import TemplateError, compile_templates
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+FIELDS = ("channel", "text", "image", "url", "label")
+
+
+def read_posts(path):
+    """Yield (row number, post dict) from a CSV file or a JSON Lines file.
+
+    CSV files need a header row naming the FIELDS columns. Rows are read
+    one at a time, so files of any size are streamed rather than loaded. A
+    line that is not valid JSON is yielded as its JSONDecodeError.
+    """
+    # utf-8-sig drops the byte order mark Excel puts before the header
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield number, json.loads(line)
+                    except json.JSONDecodeError as e:
+                        # Reported as a failed row; the rest of the file is sent
+                        yield number, e
+        else:
+            yield from enumerate(csv.DictReader(f), 1)
+
+
+def complete_posts(rows, default_channel, base_dir, template=None):
+    """Fill in the default channel and resolve image paths against base_dir.
+
+    The image column may list several paths separated by ";", which are
+    sent as one album. With a template every column of a row is a value for
+    its placeholders and the rendered template gives the text, and the URL
+    and label unless the row has its own; a row the template cannot be
+    rendered for is yielded with the TemplateError instead of a post, and so
+    is a JSON line that is not an object.
+    """
+    for number, row in rows:
+        if isinstance(row, Exception):
+            yield number, row
+            continue
+        if not isinstance(row, dict):
+            yield number, ValueError("row is not an object")
+            continue
+        # JSON Lines values may be numbers, e.g. a numeric channel id
+        values = {
+            field: "" if row.get(field) is None else str(row[field]).strip()
+            for field in FIELDS
+        }
+        post = Post(
+            channel=values["channel"] or default_channel,
+            text=values["text"],
+            url=values["url"],
+            label=values["label"],
+            images=[
+                os.path.join(base_dir, path.strip())
+                for path in values["image"].split(";")
+                if path.strip()
+            ],
+        )
+        if template is not None:
+            try:
+                rendered = template.render(
+                    {key: str(value) for key, value in row.items() if value is not None}
+                )
+            except TemplateError as e:
+                yield number, e
+                continue
+            post.text = rendered.text
+            post.url = post.url or rendered.url
+            post.label = post.label or rendered.label
+        yield number, post
+
+
+def skip_done(posts, done):
+    """Drop rows the checkpoint says were already sent"""
+    for number, post in posts:
+        if number not in done:
+            yield number, post
+
+
+class Checkpoint:
+    """Append-only file of the row numbers that have been sent.
+
+    Each number is flushed as soon as its post is delivered, so a run that
+    is interrupted can be restarted and skips everything already sent.
+    Delivery is at least once: a post still in flight when the run is
+    killed may have reached its channel without being recorded, so up to
+    ``concurrency`` rows can be sent again when the run is resumed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self.done = {int(line) for line in f if line.strip()}
+        self._file = open(path, "a")
+
+    def mark(self, number):
+        self.done.add(number)
+        self._file.write(f"{number}\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+async def send_batch(bot, posts, checkpoint, limiter, concurrency, **send_kwargs):
+    """Send every post, checkpointing successes; return (sent, failed)"""
+    sent = failed = 0
+
+    def valid(entries):
+        # Rows that cannot be sent fail here, before taking rate limit tokens
+        nonlocal failed
+        for number, post in entries:
+            if not isinstance(post, Exception):
+                missing = post.missing()
+                if not missing:
+                    yield number, post
+                    continue
+                post = ValueError(f"missing {', '.join(missing)}")
+            failed += 1
+            logger.error("Row %d failed: %s", number, post)
+
+    async def send(entry):
+        _, post = entry
+        return await send_album_post(
+            bot,
+            post.channel,
+            post.text,
+            post.url,
+            post.label,
+            post.images,
+            # An album's button is a second message to the same chat
+            before_button=(
+                (lambda: limiter.acquire(post.channel)) if limiter is not None else None
+            ),
+            **send_kwargs,
+        )
+
+    async for (number, post), result in fan_out_stream(
+        send,
+        valid(posts),
+        lambda entry: entry[1].channel,
+        limiter,
+        concurrency,
+    ):
+        if isinstance(result, Exception):
+            failed += 1
+            logger.error("Row %d failed: %s", number, result)
+        else:
+            sent += 1
+            checkpoint.mark(number)
+            if sent % 100 == 0:
+                logger.info("%d posts sent", sent)
+    return sent, failed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Send every post in a CSV or JSON Lines file. Columns: "
+        + ", ".join(FIELDS)
+        + ". Image paths are relative to the file; separate several with ';'"
+        " to send an album."
+    )
+    parser.add_argument("file", help="CSV or .jsonl file with one post per row")
+    parser.add_argument("--token", default=os.getenv("BOT_TOKEN"))
+    parser.add_argument(
+        "--channel",
+        default=os.getenv("CHANNEL_NAME") or os.getenv("CHANNEL_ID"),
+        help="channel for rows that leave the channel column empty",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="file recording the rows already sent (default: FILE.done)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("FANOUT_CONCURRENCY", "10")),
+    )
+    parser.add_argument(
+        "--per-chat-rate", type=float, default=float(os.getenv("PER_CHAT_RATE", "1"))
+    )
+    parser.add_argument(
+        "--global-rate", type=float, default=float(os.getenv("GLOBAL_RATE", "30"))
+    )
+    parser.add_argument(
+        "--template",
+        help="name of a template saved in the bot; the columns fill in its "
+        "placeholders",
+    )
+    parser.add_argument(
+        "--store",
+        default=os.getenv("STORE_FILE", STORE_FILE),
+        help="bot database the template is read from",
+    )
+    parser.add_argument(
+        "--staging-chat",
+        default=os.getenv("STAGING_CHAT_ID"),
+        help="chat used to upload album images in parallel before sending",
+    )
+    return parser.parse_args(argv)
+
+
+def find_template(path, name):
+    """The compiled template called name in the store at path, or None"""
+    for template in compile_templates(read_templates(path)).values():
+        if template.name == name:
+            return template
+    return None
+
+
+async def run(args, template=None):
+    checkpoint = Checkpoint(args.checkpoint or f"{args.file}.done")
+    if checkpoint.done:
+        logger.info("Resuming, %d rows already sent", len(checkpoint.done))
+    posts = skip_done(
+        complete_posts(
+            read_posts(args.file), args.channel, os.path.dirname(args.file), template
+        ),
+        checkpoint.done,
+    )
+    limiter = RateLimiter(args.per_chat_rate, args.global_rate)
+    file_id_cache = FileIdCache()
+    image_preprocessor = ImagePreprocessor()
+    try:
+        async with Bot(token=args.token, request=RetryingRequest()) as bot:
+            return await send_batch(
+                bot,
+                posts,
+                checkpoint,
+                limiter,
+                args.concurrency,
+                file_id_cache=file_id_cache,
+                image_preprocessor=image_preprocessor,
+                staging_chat=args.staging_chat,
+            )
+    finally:
+        image_preprocessor.shutdown()
+        file_id_cache.flush()
+        checkpoint.close()
+
+
+def main():
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO
+    )
+    args = parse_args()
+    if not args.token:
+        sys.exit("A bot token is required (--token or BOT_TOKEN)")
+    template = None
+    if args.template:
+        template = find_template(args.store, args.template)
+        if template is None:
+            sys.exit(f"No template named {args.template!r} in {args.store}")
+    sent, failed = asyncio.run(run(args, template))
+    logger.info("Done: %d sent, %d failed", sent, failed)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
+import argparse
+import asyncio
+import logging
 import os
-import json
+import secrets
+import time
+from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand
 from telegram.ext import (
     Application,
@@ -12,6 +17,26 @@ from telegram.ext import (
 )
 from dotenv import load_dotenv
 
+from post_buddy import callbacks, metrics
+from post_buddy.delivery import RetryingRequest
+from post_buddy.fanout import fan_out, parse_channel_ids
+from post_buddy.idempotency import IdempotencyCache, request_key
+from post_buddy.keyboards import KeyboardCache
+from post_buddy.pagination import PAGE_SIZE, nav_row, page_of
+from post_buddy.permissions import ADMIN, OWNER, Permissions
+from post_buddy.persistence import SQLitePersistence
+from post_buddy.ratelimit import RateLimiter
+from post_buddy.registry import Registry
+from post_buddy.router import CallbackRouter
+from post_buddy.scheduler import PostScheduler, parse_send_time
+from post_buddy.post import MAX_ALBUM_SIZE, Post
+from post_buddy.sender import send_prepared_post
+from post_buddy.storage import STORE_FILE, Store
+from post_buddy.templates import Template, TemplateError, compile_templates
+from post_buddy.update_processor import PerUserUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 load_dotenv()
 
@@ -34,426 +59,946 @@ load_dotenv()
     WAITING_FOR_URL_EDIT,
     WAITING_FOR_LABEL_EDIT,
     WAITING_FOR_ADMIN_ID,
-) = range(17)
-
-# Store admins and post data
+    WAITING_FOR_SEARCH,
+    WAITING_FOR_SCHEDULE_TIME,
+    TEMPLATE_SELECTION,
+    WAITING_FOR_TEMPLATE_VALUES,
+    WAITING_FOR_TEMPLATE_NAME,
+) = range(22)
+
+# Legacy JSON files, imported into the store on first start
 ADMINS_FILE = "admins.json"
+URLS_FILE = "urls_and_labels.json"
 
+# Admins, URLs and labels are kept in SQLite; edits are written off the event loop
+store = Store(os.getenv("STORE_FILE", STORE_FILE))
+store.import_json(ADMINS_FILE, URLS_FILE)
+
+# Owner and admins are checked against in-memory sets; admins.json is
+# watched so admins can be changed without a restart
+try:
+    permissions = Permissions(store, os.getenv("OWNER_ID"), ADMINS_FILE)
+except ValueError as e:
+    raise SystemExit(str(e)) from None
+admin_only = permissions.requires(ADMIN, "Only admins can do that.")
+
+# Load existing URLs and labels, indexed by their stable ids
+urls_and_labels = {
+    "urls": Registry(store.load_entries("urls")),
+    "labels": Registry(store.load_entries("labels")),
+}
+
+# Post templates by id, compiled once so picking one never re-parses it
+templates = compile_templates(store.load_templates())
+
+# Channels a confirmed post is sent to (CHANNEL_IDS is a comma separated list)
+CHANNEL_IDS = parse_channel_ids(os.getenv("CHANNEL_IDS") or os.getenv("CHANNEL_ID"))
+NO_CHANNELS_TEXT = (
+    "No channels are configured. Set CHANNEL_IDS (comma separated) and restart "
+    "the bot."
+)
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "10"))
 
-def load_admins():
-    """Load admins from file"""
-    try:
-        with open(ADMINS_FILE, "r") as f:
-            return set(json.load(f))
-    except FileNotFoundError:
-        return set()
-
-
-def save_admins(admins):
-    """Save admins to file"""
-    with open(ADMINS_FILE, "w") as f:
-        json.dump(list(admins), f)
-
+# Images of an album arrive as separate messages; the preview is shown
+# once none has arrived for this many seconds
+ALBUM_SETTLE_DELAY = 1.0
+album_previews = {}
 
-admins = load_admins()
-post_data = {}
+# Posts queued with the Schedule button, sent by a task started in post_init
+scheduler = PostScheduler(store)
 
-# File to store URLs and labels
-URLS_FILE = "urls_and_labels.json"
+# Drafts confirmed in the last SEND_DEDUP_TTL seconds, keyed by user, draft
+# and channels, so a double tap or a redelivered callback posts only once
+sent_posts = IdempotencyCache(float(os.getenv("SEND_DEDUP_TTL", "60")))
 
+# Serves /metrics when the bot is started with --metrics-port
+metrics_server = None
 
-def load_urls_and_labels():
-    """Load URLs and labels from file"""
-    try:
-        with open(URLS_FILE, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {"urls": [], "labels": []}
+# Shared by every post so concurrent confirmations respect the same limits
+rate_limiter = RateLimiter(
+    per_chat_rate=float(os.getenv("PER_CHAT_RATE", "1")),
+    global_rate=float(os.getenv("GLOBAL_RATE", "30")),
+)
 
 
-def save_urls_and_labels(data):
-    """Save URLs and labels to file"""
-    with open(URLS_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+async def add_value(kind, value):
+    """Save a URL or label unless it is already stored; return whether it was new"""
+    if value in urls_and_labels[kind]:
+        return False
+    entry_id = await store.add_value(kind, value)
+    return urls_and_labels[kind].add(value, entry_id)[1]
 
 
-# Load existing URLs and labels
-urls_and_labels = load_urls_and_labels()
+async def record_use(kind, value):
+    """Count a post using the given URL or label"""
+    entry_id = urls_and_labels[kind].id_of(value)
+    if entry_id is not None:
+        urls_and_labels[kind].record_use(entry_id)
+        await store.record_use(kind, entry_id)
 
 
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Start command handler - shows main menu"""
-    keyboard = [
+# Keyboards that never change are built once
+MAIN_MENU_KEYBOARD = InlineKeyboardMarkup(
+    [
         [InlineKeyboardButton("Manage Admins", callback_data="manage_admins")],
         [InlineKeyboardButton("Manage URLs & Labels", callback_data="manage_urls")],
         [InlineKeyboardButton("Insert Post", callback_data="insert_post")],
     ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text(
-        "Welcome! Please select an option:", reply_markup=reply_markup
-    )
-    return MAIN_MENU
-
-
-async def admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show admin management menu"""
-    keyboard = [
+)
+ADMIN_MENU_KEYBOARD = InlineKeyboardMarkup(
+    [
         [InlineKeyboardButton("Add Admin", callback_data="add_admin")],
         [InlineKeyboardButton("View/Remove Admins", callback_data="view_admins")],
         [InlineKeyboardButton("Back to Main Menu", callback_data="back_to_main")],
     ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    text = "Admin Management"
+)
+MANAGE_URLS_KEYBOARD = InlineKeyboardMarkup(
+    [
+        [InlineKeyboardButton("Add New URL", callback_data="add_url")],
+        [InlineKeyboardButton("Add New Label", callback_data="add_label")],
+        [InlineKeyboardButton("View URLs", callback_data="view_urls")],
+        [InlineKeyboardButton("View Labels", callback_data="view_labels")],
+        [InlineKeyboardButton("Back to Main Menu", callback_data="back_to_main")],
+    ]
+)
+TEXT_CHOICE_KEYBOARD = InlineKeyboardMarkup(
+    [
+        [InlineKeyboardButton("Add Text", callback_data="add_text")],
+        [InlineKeyboardButton("Skip Text", callback_data="skip_text")],
+        [InlineKeyboardButton("Back", callback_data="insert_post")],
+    ]
+)
+IMAGE_CHOICE_KEYBOARD = InlineKeyboardMarkup(
+    [
+        [InlineKeyboardButton("Add Image", callback_data="add_image")],
+        [InlineKeyboardButton("Skip Image", callback_data="skip_image")],
+        [InlineKeyboardButton("Back", callback_data="insert_post")],
+    ]
+)
+CONFIRM_POST_KEYBOARD = InlineKeyboardMarkup(
+    [
+        [InlineKeyboardButton("Confirm & Send", callback_data="confirm_post")],
+        [InlineKeyboardButton("🕒 Schedule", callback_data="schedule_post")],
+        [InlineKeyboardButton("➕ Add Image", callback_data="add_image")],
+        [InlineKeyboardButton("💾 Save as Template", callback_data="save_template")],
+        [InlineKeyboardButton("Cancel", callback_data="cancel_post")],
+    ]
+)
 
+# Keyboards listing URLs or labels, rebuilt only when the registry changes
+keyboard_cache = KeyboardCache()
+
+
+async def show(update: Update, text, reply_markup=None):
+    """Edit the message of a button press, or reply to a text message"""
     if update.callback_query:
         await update.callback_query.message.edit_text(text, reply_markup=reply_markup)
     else:
         await update.message.reply_text(text, reply_markup=reply_markup)
+
+
+def preview_text(post_data):
+    """Text shown before a post is confirmed"""
+    post = Post.from_dict(post_data)
+    text = f"Preview:\n\nURL: {post.url}\nLabel: {post.label}"
+    if post.text:
+        text += f"\nText: {post.text}"
+    if len(post.images) > 1:
+        text += f"\nImages: {len(post.images)} (sent as an album)"
+    elif post.images:
+        text += "\nImage: 1"
+    return text
+
+
+# Markers of the step a user is at; user_data is persisted, so they are
+# dropped whenever a conversation ends or starts over
+TRANSIENT_KEYS = ("adding_new", "template_values")
+TRANSIENT_POST_KEYS = ("adding_text", "adding_image")
+
+
+def clear_transient(user_data):
+    """Forget step markers left over from an earlier conversation"""
+    for key in TRANSIENT_KEYS:
+        user_data.pop(key, None)
+    for key in TRANSIENT_POST_KEYS:
+        user_data.get("post_data", {}).pop(key, None)
+
+
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Start command handler - shows main menu"""
+    clear_transient(context.user_data)
+    await update.message.reply_text(
+        "Welcome! Please select an option:", reply_markup=MAIN_MENU_KEYBOARD
+    )
+    return MAIN_MENU
+
+
+async def admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show admin management menu"""
+    await show(update, "Admin Management", ADMIN_MENU_KEYBOARD)
     return ADMIN_MENU
 
 
-async def view_admins(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Display all admins with remove option"""
+@permissions.requires(OWNER, "Only the owner can manage admins.")
+async def view_admins(update: Update, context: ContextTypes.DEFAULT_TYPE, page=0):
+    """Display one page of admins with remove option"""
+    page_admins, page, pages = page_of(permissions.admin_ids(), page)
     keyboard = []
-    for admin_id in admins:
+    for admin_id in page_admins:
         keyboard.append(
             [
                 InlineKeyboardButton(
-                    f"Admin: {admin_id}", callback_data=f"admin_info:{admin_id}"
+                    f"Admin: {admin_id}",
+                    callback_data=callbacks.encode(callbacks.ADMIN_INFO, admin_id),
+                ),
+                InlineKeyboardButton(
+                    "❌",
+                    callback_data=callbacks.encode(callbacks.REMOVE_ADMIN, admin_id),
                 ),
-                InlineKeyboardButton("❌", callback_data=f"remove_admin:{admin_id}"),
             ]
         )
+    nav = nav_row(callbacks.ADMINS_PAGE, page, pages)
+    if nav:
+        keyboard.append(nav)
     keyboard.append([InlineKeyboardButton("Back", callback_data="manage_admins")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    text = "Current Admins (❌ to remove):"
-    if update.callback_query:
-        await update.callback_query.answer()
-        await update.callback_query.message.edit_text(text, reply_markup=reply_markup)
-    else:
-        await update.message.reply_text(text, reply_markup=reply_markup)
+    await show(update, "Current Admins (❌ to remove):", InlineKeyboardMarkup(keyboard))
     return ADMIN_MENU
 
 
 async def manage_urls_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show URL and label management menu"""
-    keyboard = [
-        [InlineKeyboardButton("Add New URL", callback_data="add_url")],
-        [InlineKeyboardButton("Add New Label", callback_data="add_label")],
-        [InlineKeyboardButton("View URLs", callback_data="view_urls")],
-        [InlineKeyboardButton("View Labels", callback_data="view_labels")],
-        [InlineKeyboardButton("Back to Main Menu", callback_data="back_to_main")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    text = "URL and Label Management"
+    context.user_data.pop("list_position", None)
+    await show(update, "URL and Label Management", MANAGE_URLS_KEYBOARD)
+    return MANAGE_URLS
 
-    if update.callback_query:
-        await update.callback_query.message.edit_text(text, reply_markup=reply_markup)
+
+def list_page(context, view, page):
+    """Page to show for a list view, remembering it for later returns"""
+    if page is None:
+        # Returning after an edit or delete: stay on the page last shown
+        last_view, last_page = context.user_data.get("list_position", (None, 0))
+        page = last_page if last_view == view else 0
+    return page
+
+
+def remember_position(context, view, page):
+    context.user_data["list_position"] = (view, page)
+
+
+def list_controls(kind, page_opcode, page, pages, prefix):
+    """Page navigation and search rows appended to a list keyboard"""
+    rows = []
+    nav = nav_row(page_opcode, page, pages)
+    if nav:
+        rows.append(nav)
+    if prefix:
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    "✖️ Clear Search", callback_data=f"clear_search_{kind}"
+                )
+            ]
+        )
     else:
-        await update.message.reply_text(text, reply_markup=reply_markup)
-    return MANAGE_URLS
+        rows.append([InlineKeyboardButton("🔍 Search", callback_data=f"search_{kind}")])
+    return rows
 
 
-async def view_urls(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Display all URLs with edit/delete options"""
+def build_edit_keyboard(kind, edit_opcode, delete_opcode, page_opcode, page, prefix):
+    """Keyboard listing one page of URLs or labels with edit and delete buttons"""
+    entries, page, pages = urls_and_labels[kind].page(page, PAGE_SIZE, prefix)
     keyboard = []
-    for url in urls_and_labels["urls"]:
+    for entry_id, value in entries:
         keyboard.append(
             [
-                InlineKeyboardButton(f"📝 {url}", callback_data=f"edit_url:{url}"),
-                InlineKeyboardButton("❌", callback_data=f"delete_url:{url}"),
+                InlineKeyboardButton(
+                    f"📝 {value}", callback_data=callbacks.encode(edit_opcode, entry_id)
+                ),
+                InlineKeyboardButton(
+                    "❌", callback_data=callbacks.encode(delete_opcode, entry_id)
+                ),
             ]
         )
+    keyboard.extend(list_controls(kind, page_opcode, page, pages, prefix))
     keyboard.append([InlineKeyboardButton("Back", callback_data="manage_urls")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    text = "URLs (click to edit, ❌ to delete):"
-    if update.callback_query:
-        await update.callback_query.answer()
-        await update.callback_query.message.edit_text(text, reply_markup=reply_markup)
-    else:
-        await update.message.reply_text(text, reply_markup=reply_markup)
-    return MANAGE_URLS
+    return InlineKeyboardMarkup(keyboard)
 
 
-async def view_labels(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Display all labels with edit/delete options"""
+def build_selection_keyboard(
+    kind, select_opcode, page_opcode, page, prefix, add_callback, add_text, back
+):
+    """Keyboard for picking a URL or label while creating a post"""
+    entries, page, pages = urls_and_labels[kind].page(page, PAGE_SIZE, prefix)
     keyboard = []
-    for label in urls_and_labels["labels"]:
+    for entry_id, value in entries:
         keyboard.append(
             [
                 InlineKeyboardButton(
-                    f"📝 {label}", callback_data=f"edit_label:{label}"
-                ),
-                InlineKeyboardButton("❌", callback_data=f"delete_label:{label}"),
+                    value, callback_data=callbacks.encode(select_opcode, entry_id)
+                )
             ]
         )
-    keyboard.append([InlineKeyboardButton("Back", callback_data="manage_urls")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    keyboard.extend(list_controls(kind, page_opcode, page, pages, prefix))
+    keyboard.append([InlineKeyboardButton(add_text, callback_data=add_callback)])
+    keyboard.append([back])
+    return InlineKeyboardMarkup(keyboard)
+
+
+def list_keyboard(view, kind, page, prefix, build):
+    """Cached keyboard for an unfiltered page, a freshly built one for a search"""
+    if prefix:
+        return build()
+    return keyboard_cache.get((view, page), urls_and_labels[kind].version, build)
+
+
+def list_title(title, prefix):
+    if prefix:
+        return f'{title}\nSearch: "{prefix}…"'
+    return title
+
+
+@admin_only
+async def view_urls(update: Update, context: ContextTypes.DEFAULT_TYPE, page=None):
+    """Display one page of URLs with edit/delete options"""
+    page = list_page(context, "view_urls", page)
+    prefix = context.user_data.get("search_urls")
+    reply_markup = list_keyboard(
+        "view_urls",
+        "urls",
+        page,
+        prefix,
+        lambda: build_edit_keyboard(
+            "urls",
+            callbacks.EDIT_URL,
+            callbacks.DELETE_URL,
+            callbacks.URLS_PAGE,
+            page,
+            prefix,
+        ),
+    )
+    remember_position(context, "view_urls", page)
+    await show(
+        update, list_title("URLs (click to edit, ❌ to delete):", prefix), reply_markup
+    )
+    return MANAGE_URLS
 
-    text = "Labels (click to edit, ❌ to delete):"
-    if update.callback_query:
-        await update.callback_query.answer()
-        await update.callback_query.message.edit_text(text, reply_markup=reply_markup)
-    else:
-        await update.message.reply_text(text, reply_markup=reply_markup)
+
+@admin_only
+async def view_labels(update: Update, context: ContextTypes.DEFAULT_TYPE, page=None):
+    """Display one page of labels with edit/delete options"""
+    page = list_page(context, "view_labels", page)
+    prefix = context.user_data.get("search_labels")
+    reply_markup = list_keyboard(
+        "view_labels",
+        "labels",
+        page,
+        prefix,
+        lambda: build_edit_keyboard(
+            "labels",
+            callbacks.EDIT_LABEL,
+            callbacks.DELETE_LABEL,
+            callbacks.LABELS_PAGE,
+            page,
+            prefix,
+        ),
+    )
+    remember_position(context, "view_labels", page)
+    await show(
+        update,
+        list_title("Labels (click to edit, ❌ to delete):", prefix),
+        reply_markup,
+    )
     return MANAGE_URLS
 
 
-async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle button presses"""
-    query = update.callback_query
-    await query.answer()
+@admin_only
+async def url_selection_menu(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, page=None
+):
+    """Show the URL picker of the post creation flow"""
+    page = list_page(context, "select_url", page)
+    prefix = context.user_data.get("search_urls")
+    reply_markup = list_keyboard(
+        "select_url",
+        "urls",
+        page,
+        prefix,
+        lambda: build_selection_keyboard(
+            "urls",
+            callbacks.SELECT_URL,
+            callbacks.URL_PICKER_PAGE,
+            page,
+            prefix,
+            "new_url",
+            "Add New URL",
+            InlineKeyboardButton("Back to Main Menu", callback_data="back_to_main"),
+        ),
+    )
+    remember_position(context, "select_url", page)
+    await show(
+        update, list_title("Select a URL or add a new one:", prefix), reply_markup
+    )
+    return URL_SELECTION
+
+
+@admin_only
+async def label_selection_menu(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, page=None
+):
+    """Show the label picker of the post creation flow"""
+    page = list_page(context, "select_label", page)
+    prefix = context.user_data.get("search_labels")
+    reply_markup = list_keyboard(
+        "select_label",
+        "labels",
+        page,
+        prefix,
+        lambda: build_selection_keyboard(
+            "labels",
+            callbacks.SELECT_LABEL,
+            callbacks.LABEL_PICKER_PAGE,
+            page,
+            prefix,
+            "new_label",
+            "Add New Label",
+            InlineKeyboardButton("Back", callback_data="insert_post"),
+        ),
+    )
+    remember_position(context, "select_label", page)
+    await show(
+        update, list_title("Select a label or add a new one:", prefix), reply_markup
+    )
+    return LABEL_SELECTION
 
-    if query.data == "manage_admins":
-        if str(query.from_user.id) == os.getenv("OWNER_ID"):
-            return await admin_menu(update, context)
-        else:
-            await query.message.edit_text("Only the owner can manage admins.")
-            return ConversationHandler.END
-
-    elif query.data == "view_admins":
-        return await view_admins(update, context)
-
-    elif query.data.startswith("remove_admin:"):
-        if str(query.from_user.id) == os.getenv("OWNER_ID"):
-            admin_id = query.data.replace("remove_admin:", "")
-            admins.remove(admin_id)
-            save_admins(admins)
-            return await view_admins(update, context)
-        else:
-            await query.message.edit_text("Only the owner can remove admins.")
-            return ConversationHandler.END
 
-    elif query.data == "add_admin":
-        if str(query.from_user.id) == os.getenv("OWNER_ID"):
-            await query.message.edit_text(
-                "Please enter the Telegram ID of the user you want to add as admin:"
-            )
-            return WAITING_FOR_ADMIN_ID
-        else:
-            await query.message.edit_text("Only the owner can add admins.")
-            return ConversationHandler.END
-
-    elif query.data == "manage_urls":
-        if str(query.from_user.id) in admins or str(query.from_user.id) == os.getenv(
-            "OWNER_ID"
-        ):
-            return await manage_urls_menu(update, context)
-        else:
-            await query.message.edit_text("Only admins can manage URLs and labels.")
-            return ConversationHandler.END
+# List views a search returns to, by the name they remember themselves under
+LIST_VIEWS = {
+    "view_urls": view_urls,
+    "view_labels": view_labels,
+    "select_url": url_selection_menu,
+    "select_label": label_selection_menu,
+}
 
-    elif query.data == "view_urls":
-        return await view_urls(update, context)
 
-    elif query.data == "view_labels":
-        return await view_labels(update, context)
+async def show_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show the first page of the list view the user was last on"""
+    view, _ = context.user_data.get("list_position", ("view_urls", 0))
+    return await LIST_VIEWS[view](update, context, 0)
+
+
+@admin_only
+async def search_urls(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data["searching"] = "urls"
+    await update.callback_query.message.edit_text(
+        "Send the beginning of the URL to look for:"
+    )
+    return WAITING_FOR_SEARCH
+
 
-    elif query.data.startswith("edit_url:"):
-        url = query.data.replace("edit_url:", "")
-        context.user_data["editing_url"] = url
-        await query.message.edit_text(f"Please enter new URL to replace:\n{url}")
-        return WAITING_FOR_URL_EDIT
-
-    elif query.data.startswith("edit_label:"):
-        label = query.data.replace("edit_label:", "")
-        context.user_data["editing_label"] = label
-        await query.message.edit_text(f"Please enter new label to replace:\n{label}")
-        return WAITING_FOR_LABEL_EDIT
-
-    elif query.data.startswith("delete_url:"):
-        url = query.data.replace("delete_url:", "")
-        urls_and_labels["urls"].remove(url)
-        save_urls_and_labels(urls_and_labels)
+@admin_only
+async def search_labels(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data["searching"] = "labels"
+    await update.callback_query.message.edit_text(
+        "Send the beginning of the label to look for:"
+    )
+    return WAITING_FOR_SEARCH
+
+
+@admin_only
+async def clear_search_urls(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data.pop("search_urls", None)
+    return await show_list(update, context)
+
+
+@admin_only
+async def clear_search_labels(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data.pop("search_labels", None)
+    return await show_list(update, context)
+
+
+async def text_choice_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Ask whether the post gets text"""
+    if context.user_data.get("post_data", {}).get("from_template"):
+        # The template already gave the post its text and image
+        return await confirm_menu(update, context)
+    await show(update, "Would you like to add text to your post?", TEXT_CHOICE_KEYBOARD)
+    return WAITING_FOR_TEXT
+
+
+async def image_choice_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Ask whether the post gets an image"""
+    await show(
+        update, "Would you like to add an image to your post?", IMAGE_CHOICE_KEYBOARD
+    )
+    return WAITING_FOR_IMAGE
+
+
+async def confirm_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show the post preview with confirm and cancel buttons"""
+    post_data = context.user_data.get("post_data", {})
+    await show(update, preview_text(post_data), CONFIRM_POST_KEYBOARD)
+    return CONFIRM_POST
+
+
+@permissions.requires(OWNER, "Only the owner can manage admins.")
+async def manage_admins(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Open admin management (owner only)"""
+    return await admin_menu(update, context)
+
+
+@permissions.requires(OWNER, "Only the owner can add admins.")
+async def add_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Ask for the id of a new admin (owner only)"""
+    await update.callback_query.message.edit_text(
+        "Please enter the Telegram ID of the user you want to add as admin:"
+    )
+    return WAITING_FOR_ADMIN_ID
+
+
+@permissions.requires(OWNER, "Only the owner can remove admins.")
+async def remove_admin(update: Update, context: ContextTypes.DEFAULT_TYPE, admin_id):
+    """Remove an admin (owner only)"""
+    await permissions.remove_admin(admin_id)
+    return await view_admins(update, context)
+
+
+@permissions.requires(ADMIN, "Only admins can manage URLs and labels.")
+async def manage_urls(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Open URL and label management (admins only)"""
+    return await manage_urls_menu(update, context)
+
+
+@admin_only
+async def add_url(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.callback_query.message.edit_text("Please enter the new URL:")
+    return ADD_NEW_URL
+
+
+@admin_only
+async def add_label(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.callback_query.message.edit_text("Please enter the new label:")
+    return ADD_NEW_LABEL
+
+
+@admin_only
+async def edit_url(update: Update, context: ContextTypes.DEFAULT_TYPE, url_id):
+    """Ask for the replacement of a stored URL"""
+    url = urls_and_labels["urls"].get(url_id)
+    if url is None:
         return await view_urls(update, context)
+    context.user_data["editing_url"] = url_id
+    await update.callback_query.message.edit_text(
+        f"Please enter new URL to replace:\n{url}"
+    )
+    return WAITING_FOR_URL_EDIT
 
-    elif query.data.startswith("delete_label:"):
-        label = query.data.replace("delete_label:", "")
-        urls_and_labels["labels"].remove(label)
-        save_urls_and_labels(urls_and_labels)
+
+@admin_only
+async def edit_label(update: Update, context: ContextTypes.DEFAULT_TYPE, label_id):
+    """Ask for the replacement of a stored label"""
+    label = urls_and_labels["labels"].get(label_id)
+    if label is None:
         return await view_labels(update, context)
+    context.user_data["editing_label"] = label_id
+    await update.callback_query.message.edit_text(
+        f"Please enter new label to replace:\n{label}"
+    )
+    return WAITING_FOR_LABEL_EDIT
 
-    elif query.data == "add_url":
-        await query.message.edit_text("Please enter the new URL:")
-        return ADD_NEW_URL
-
-    elif query.data == "add_label":
-        await query.message.edit_text("Please enter the new label:")
-        return ADD_NEW_LABEL
-
-    elif query.data == "back_to_main":
-        keyboard = [
-            [InlineKeyboardButton("Manage Admins", callback_data="manage_admins")],
-            [InlineKeyboardButton("Manage URLs & Labels", callback_data="manage_urls")],
-            [InlineKeyboardButton("Insert Post", callback_data="insert_post")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.message.edit_text("Main Menu:", reply_markup=reply_markup)
-        return MAIN_MENU
-
-    elif query.data == "insert_post":
-        if str(query.from_user.id) in admins or str(query.from_user.id) == os.getenv(
-            "OWNER_ID"
-        ):
-            context.user_data["post_data"] = {}
-            # Show URL selection buttons
-            keyboard = []
-            for url in urls_and_labels["urls"]:
-                keyboard.append([InlineKeyboardButton(url, callback_data=f"url:{url}")])
-            keyboard.append(
-                [InlineKeyboardButton("Add New URL", callback_data="new_url")]
-            )
-            keyboard.append(
-                [
-                    InlineKeyboardButton(
-                        "Back to Main Menu", callback_data="back_to_main"
-                    )
-                ]
-            )
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.message.edit_text(
-                "Select a URL or add a new one:", reply_markup=reply_markup
-            )
-            return URL_SELECTION
-        else:
-            await query.message.edit_text("Only admins can create posts.")
-            return ConversationHandler.END
-
-    elif query.data.startswith("url:"):
-        url = query.data.replace("url:", "")
-        context.user_data["post_data"]["url"] = url
-        # Show label selection buttons
-        keyboard = []
-        for label in urls_and_labels["labels"]:
-            keyboard.append(
-                [InlineKeyboardButton(label, callback_data=f"label:{label}")]
-            )
-        keyboard.append(
-            [InlineKeyboardButton("Add New Label", callback_data="new_label")]
-        )
-        keyboard.append([InlineKeyboardButton("Back", callback_data="insert_post")])
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.message.edit_text(
-            "Select a label or add a new one:", reply_markup=reply_markup
-        )
-        return LABEL_SELECTION
-
-    elif query.data.startswith("label:"):
-        label = query.data.replace("label:", "")
-        context.user_data["post_data"]["label"] = label
-        keyboard = [
-            [InlineKeyboardButton("Add Text", callback_data="add_text")],
-            [InlineKeyboardButton("Skip Text", callback_data="skip_text")],
-            [InlineKeyboardButton("Back", callback_data="insert_post")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.message.edit_text(
-            "Would you like to add text to your post?", reply_markup=reply_markup
-        )
-        return WAITING_FOR_TEXT
 
-    elif query.data == "add_text":
-        await query.message.edit_text(
-            "Please enter the post text:\n\n(Send /cancel to go back to main menu)"
-        )
-        context.user_data["post_data"]["adding_text"] = True
-        return WAITING_FOR_TEXT
-
-    elif query.data == "skip_text":
-        context.user_data["post_data"]["text"] = ""  # Empty text
-        keyboard = [
-            [InlineKeyboardButton("Add Image", callback_data="add_image")],
-            [InlineKeyboardButton("Skip Image", callback_data="skip_image")],
-            [InlineKeyboardButton("Back", callback_data="insert_post")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.message.edit_text(
-            "Would you like to add an image to your post?", reply_markup=reply_markup
-        )
-        return WAITING_FOR_IMAGE
+@admin_only
+async def delete_url(update: Update, context: ContextTypes.DEFAULT_TYPE, url_id):
+    """Delete a stored URL"""
+    if urls_and_labels["urls"].remove(url_id) is not None:
+        await store.remove_value("urls", url_id)
+    return await view_urls(update, context)
 
-    elif query.data == "add_image":
-        await query.message.edit_text(
-            "Please send the image for the post:\n\n(Send /cancel to go back to main menu)"
-        )
-        context.user_data["post_data"]["adding_image"] = True
-        return WAITING_FOR_IMAGE
 
-    elif query.data == "skip_image":
-        post_data = context.user_data.get("post_data", {})
-        preview_text = (
-            f"Preview:\n\nURL: {post_data['url']}\nLabel: {post_data['label']}"
-        )
-        if post_data.get("text"):
-            preview_text += f"\nText: {post_data['text']}"
+@admin_only
+async def delete_label(update: Update, context: ContextTypes.DEFAULT_TYPE, label_id):
+    """Delete a stored label"""
+    if urls_and_labels["labels"].remove(label_id) is not None:
+        await store.remove_value("labels", label_id)
+    return await view_labels(update, context)
 
-        keyboard = [
-            [InlineKeyboardButton("Confirm & Send", callback_data="confirm_post")],
-            [InlineKeyboardButton("Cancel", callback_data="cancel_post")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
 
-        await query.message.edit_text(preview_text, reply_markup=reply_markup)
-        return CONFIRM_POST
+async def back_to_main(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.callback_query.message.edit_text(
+        "Main Menu:", reply_markup=MAIN_MENU_KEYBOARD
+    )
+    return MAIN_MENU
+
 
-    elif query.data == "new_url":
-        await query.message.edit_text("Please enter the new URL:")
-        context.user_data["adding_new"] = "url"
-        return ADD_NEW_URL
+@permissions.requires(ADMIN, "Only admins can create posts.")
+async def insert_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Start creating a post (admins only)"""
+    # The draft id tells a repeated confirmation from a new, identical post
+    context.user_data["post_data"] = {"draft_id": secrets.token_hex(8)}
+    context.user_data.pop("list_position", None)
+    if templates:
+        return await template_selection_menu(update, context)
+    # Show URL selection buttons
+    return await url_selection_menu(update, context)
 
-    elif query.data == "new_label":
-        await query.message.edit_text("Please enter the new label:")
-        context.user_data["adding_new"] = "label"
-        return ADD_NEW_LABEL
 
-    elif query.data == "confirm_post":
-        # Send post to channel
-        post_data = context.user_data.get("post_data", {})
-        channel_id = os.getenv("CHANNEL_ID")
+@admin_only
+async def from_scratch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Create the post without a template"""
+    return await url_selection_menu(update, context)
 
-        keyboard = [
+
+@admin_only
+async def template_selection_menu(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, page=0
+):
+    """Offer the stored templates as starting points for the post"""
+    ordered = sorted(templates.items(), key=lambda item: item[1].name.casefold())
+    entries, page, pages = page_of(ordered, page)
+    keyboard = []
+    for template_id, template in entries:
+        keyboard.append(
             [
                 InlineKeyboardButton(
-                    text=post_data.get("label", "Visit Website"),
-                    url=post_data.get("url", ""),
-                )
+                    f"📄 {template.name}",
+                    callback_data=callbacks.encode(
+                        callbacks.SELECT_TEMPLATE, template_id
+                    ),
+                ),
+                InlineKeyboardButton(
+                    "❌",
+                    callback_data=callbacks.encode(
+                        callbacks.DELETE_TEMPLATE, template_id
+                    ),
+                ),
             ]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        if post_data.get("image"):
-            # Send with image
-            await context.bot.send_photo(
-                chat_id=channel_id,
-                photo=post_data.get("image"),
-                caption=post_data.get("text", ""),
-                reply_markup=reply_markup,
-            )
-        else:
-            # Send text only
-            await context.bot.send_message(
-                chat_id=channel_id,
-                text=post_data.get("text", ""),
-                reply_markup=reply_markup,
-            )
+        )
+    nav = nav_row(callbacks.TEMPLATES_PAGE, page, pages)
+    if nav:
+        keyboard.append(nav)
+    keyboard.append(
+        [InlineKeyboardButton("✏️ Start from Scratch", callback_data="from_scratch")]
+    )
+    keyboard.append(
+        [InlineKeyboardButton("Back to Main Menu", callback_data="back_to_main")]
+    )
+    await show(
+        update,
+        "Start from a template (❌ to delete) or from scratch:",
+        InlineKeyboardMarkup(keyboard),
+    )
+    return TEMPLATE_SELECTION
+
+
+@admin_only
+async def select_template(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, template_id
+):
+    """Fill the post from a template, asking for its placeholders first"""
+    template = templates.get(template_id)
+    if template is None:
+        return await template_selection_menu(update, context)
+    if not template.variables:
+        return await apply_template(update, context, template, {})
+    context.user_data["template_id"] = template_id
+    context.user_data["template_values"] = {}
+    await show(update, template_values_prompt(template))
+    return WAITING_FOR_TEMPLATE_VALUES
+
+
+def template_values_prompt(template, missing=None):
+    names = missing or sorted(template.variables)
+    if len(template.variables) == 1:
+        return f"Please enter the value for {{{names[0]}}}:"
+    return (
+        "Please send one line per placeholder, as name=value:\n"
+        + "\n".join(f"{name}=" for name in names)
+        + "\n\n(Send /cancel to go back to main menu)"
+    )
 
-        await query.message.edit_text("Post has been sent to the channel!")
-        return ConversationHandler.END
 
-    elif query.data == "cancel_post":
-        await query.message.edit_text("Post cancelled.")
+async def apply_template(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, template, values
+):
+    """Start the post from a rendered template and ask for what it lacks"""
+    post_data = template.render(values).to_dict()
+    post_data["from_template"] = True
+    post_data["draft_id"] = context.user_data.get("post_data", {}).get("draft_id")
+    context.user_data["post_data"] = post_data
+    if not post_data["url"]:
+        return await url_selection_menu(update, context)
+    if not post_data["label"]:
+        return await label_selection_menu(update, context)
+    return await confirm_menu(update, context)
+
+
+@admin_only
+async def delete_template(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, template_id
+):
+    """Delete a stored template"""
+    if templates.pop(template_id, None) is not None:
+        await store.remove_template(template_id)
+    if not templates:
+        return await url_selection_menu(update, context)
+    return await template_selection_menu(update, context)
+
+
+@admin_only
+async def save_template(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Ask for the name to save the previewed post under"""
+    await update.callback_query.message.edit_text(
+        "Please enter a name for the template. Write {name} in the text, URL "
+        "or label for a placeholder that is filled in whenever the template "
+        "is used; a template with the same name is replaced."
+        "\n\n(Send /cancel to go back to main menu)"
+    )
+    return WAITING_FOR_TEMPLATE_NAME
+
+
+@admin_only
+async def select_url(update: Update, context: ContextTypes.DEFAULT_TYPE, url_id):
+    """Use a stored URL for the post being created"""
+    url = urls_and_labels["urls"].get(url_id)
+    if url is None:
+        # Deleted since the picker was shown
+        return await url_selection_menu(update, context)
+    context.user_data["post_data"]["url"] = url
+    return await label_selection_menu(update, context)
+
+
+@admin_only
+async def select_label(update: Update, context: ContextTypes.DEFAULT_TYPE, label_id):
+    """Use a stored label for the post being created"""
+    label = urls_and_labels["labels"].get(label_id)
+    if label is None:
+        return await label_selection_menu(update, context)
+    context.user_data["post_data"]["label"] = label
+    return await text_choice_menu(update, context)
+
+
+@admin_only
+async def new_url(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.callback_query.message.edit_text("Please enter the new URL:")
+    context.user_data["adding_new"] = "url"
+    return ADD_NEW_URL
+
+
+@admin_only
+async def new_label(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.callback_query.message.edit_text("Please enter the new label:")
+    context.user_data["adding_new"] = "label"
+    return ADD_NEW_LABEL
+
+
+@admin_only
+async def add_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.callback_query.message.edit_text(
+        "Please enter the post text:\n\n(Send /cancel to go back to main menu)"
+    )
+    context.user_data["post_data"]["adding_text"] = True
+    return WAITING_FOR_TEXT
+
+
+@admin_only
+async def skip_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data["post_data"]["text"] = ""  # Empty text
+    return await image_choice_menu(update, context)
+
+
+@admin_only
+async def add_image(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.callback_query.message.edit_text(
+        f"Please send an image, or an album of up to {MAX_ALBUM_SIZE}, for the post:"
+        "\n\n(Send /cancel to go back to main menu)"
+    )
+    context.user_data["post_data"]["adding_image"] = True
+    return WAITING_FOR_IMAGE
+
+
+@admin_only
+async def skip_image(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    return await confirm_menu(update, context)
+
+
+async def send_post(bot, post):
+    """Send a Post to every configured channel; return (channel, result) pairs"""
+    post.label = post.label or "Visit Website"
+
+    async def send(channel_id):
+        return await send_prepared_post(
+            bot,
+            channel_id,
+            post,
+            # An album's button is a second message to the same channel
+            before_button=lambda: rate_limiter.acquire(channel_id),
+        )
+
+    results = await fan_out(send, CHANNEL_IDS, rate_limiter, FANOUT_CONCURRENCY)
+    await record_use("urls", post.url)
+    await record_use("labels", post.label)
+    return results
+
+
+def failed_channels(results):
+    """Describe the channels a post could not be sent to"""
+    return [
+        f"{channel_id}: {result}"
+        for channel_id, result in results
+        if isinstance(result, Exception)
+    ]
+
+
+async def send_scheduled_post(bot, payload):
+    """Deliver a post from the schedule, raising if any channel failed"""
+    if not CHANNEL_IDS:
+        raise RuntimeError(NO_CHANNELS_TEXT)
+    failed = failed_channels(await send_post(bot, Post.from_dict(payload)))
+    if failed:
+        raise RuntimeError("Failed:\n" + "\n".join(failed))
+
+
+@admin_only
+async def confirm_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Send the post to every configured channel"""
+    post_data = context.user_data.get("post_data")
+    if not post_data:
+        # A stale button of a post that has been sent already
+        return ConversationHandler.END
+    if not CHANNEL_IDS:
+        # Nowhere to send to; keep the draft for after the restart
+        await update.callback_query.message.edit_text(
+            NO_CHANNELS_TEXT + "\n\n" + preview_text(post_data),
+            reply_markup=CONFIRM_POST_KEYBOARD,
+        )
+        return CONFIRM_POST
+    post = Post.from_dict(post_data)
+    key = request_key(
+        update.effective_user.id,
+        post_data.get("draft_id"),
+        post.to_dict(),
+        CHANNEL_IDS,
+    )
+    if not sent_posts.claim(key):
+        # Another confirmation of the same draft is sending or just sent it
+        metrics.DUPLICATE_SENDS.inc()
         return ConversationHandler.END
 
+    results = await send_post(context.bot, post)
+    failed = failed_channels(results)
+    if failed and len(failed) == len(results):
+        # Nothing went out: keep the draft and let the user confirm again
+        sent_posts.release(key)
+        await update.callback_query.message.edit_text(
+            "Post could not be sent.\nFailed:\n"
+            + "\n".join(failed)
+            + "\n\n"
+            + preview_text(post_data),
+            reply_markup=CONFIRM_POST_KEYBOARD,
+        )
+        return CONFIRM_POST
+
+    context.user_data.pop("post_data", None)
+    clear_transient(context.user_data)
+    if not failed:
+        await update.callback_query.message.edit_text(
+            "Post has been sent to the channel!"
+            if len(results) == 1
+            else f"Post has been sent to {len(results)} channels!"
+        )
+    else:
+        await update.callback_query.message.edit_text(
+            f"Post sent to {len(results) - len(failed)} of {len(results)} "
+            "channels.\nFailed:\n" + "\n".join(failed)
+        )
+    return ConversationHandler.END
 
+
+@admin_only
+async def schedule_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Ask when the post should be sent"""
+    await update.callback_query.message.edit_text(
+        "When should the post be sent?\n\n"
+        "Send a delay like 30m, 2h or 1d, or a time as YYYY-MM-DD HH:MM.\n"
+        "(Send /cancel to go back to main menu)"
+    )
+    return WAITING_FOR_SCHEDULE_TIME
+
+
+@admin_only
+async def cancel_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    clear_transient(context.user_data)
+    await update.callback_query.message.edit_text("Post cancelled.")
+    return ConversationHandler.END
+
+
+# Button callbacks, routed by exact callback_data or by encoded opcode
+router = CallbackRouter(
+    {
+        "manage_admins": manage_admins,
+        "view_admins": view_admins,
+        "add_admin": add_admin,
+        "manage_urls": manage_urls,
+        "view_urls": view_urls,
+        "view_labels": view_labels,
+        "add_url": add_url,
+        "add_label": add_label,
+        "back_to_main": back_to_main,
+        "insert_post": insert_post,
+        "add_text": add_text,
+        "skip_text": skip_text,
+        "add_image": add_image,
+        "skip_image": skip_image,
+        "new_url": new_url,
+        "new_label": new_label,
+        "confirm_post": confirm_post,
+        "cancel_post": cancel_post,
+        "schedule_post": schedule_post,
+        "from_scratch": from_scratch,
+        "save_template": save_template,
+        "search_urls": search_urls,
+        "search_labels": search_labels,
+        "clear_search_urls": clear_search_urls,
+        "clear_search_labels": clear_search_labels,
+    },
+    {
+        callbacks.REMOVE_ADMIN: remove_admin,
+        callbacks.EDIT_URL: edit_url,
+        callbacks.EDIT_LABEL: edit_label,
+        callbacks.DELETE_URL: delete_url,
+        callbacks.DELETE_LABEL: delete_label,
+        callbacks.SELECT_URL: select_url,
+        callbacks.SELECT_LABEL: select_label,
+        callbacks.URLS_PAGE: view_urls,
+        callbacks.LABELS_PAGE: view_labels,
+        callbacks.URL_PICKER_PAGE: url_selection_menu,
+        callbacks.LABEL_PICKER_PAGE: label_selection_menu,
+        callbacks.ADMINS_PAGE: view_admins,
+        callbacks.SELECT_TEMPLATE: select_template,
+        callbacks.DELETE_TEMPLATE: delete_template,
+        callbacks.TEMPLATES_PAGE: template_selection_menu,
+    },
+)
+
+
+async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle button presses"""
+    query = update.callback_query
+    await query.answer()
+
+    handler, args = router.resolve(query.data)
+    if handler is None:
+        return None
+    with metrics.HANDLER_SECONDS.time(handler.__name__):
+        return await handler(update, context, *args)
+
+
+@permissions.requires(OWNER, "Only the owner can add admins.")
 async def handle_admin_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle admin ID input"""
     try:
         new_admin_id = str(update.message.text).strip()
         if new_admin_id.isdigit():
-            admins.add(new_admin_id)
-            save_admins(admins)
+            await permissions.add_admin(int(new_admin_id))
             await update.message.reply_text(
                 f"Admin with ID {new_admin_id} added successfully!"
             )
@@ -466,198 +1011,265 @@ async def handle_admin_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return WAITING_FOR_ADMIN_ID
 
 
+@admin_only
 async def handle_new_url(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle new URL input"""
     if update.message.text == "/cancel":
-        keyboard = [
-            [InlineKeyboardButton("Manage Admins", callback_data="manage_admins")],
-            [InlineKeyboardButton("Manage URLs & Labels", callback_data="manage_urls")],
-            [InlineKeyboardButton("Insert Post", callback_data="insert_post")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.message.reply_text(
-            "Operation cancelled. Back to main menu:", reply_markup=reply_markup
-        )
-        return MAIN_MENU
+        return await cancel(update, context)
 
     new_url = update.message.text
-    if "adding_new" in context.user_data:
+    adding_to_post = context.user_data.pop("adding_new", None)
+    if adding_to_post and "post_data" in context.user_data:
         # Adding URL during post creation
         context.user_data["post_data"]["url"] = new_url
-        urls_and_labels["urls"].append(new_url)
-        save_urls_and_labels(urls_and_labels)
+        await add_value("urls", new_url)
         # Show label selection
-        keyboard = []
-        for label in urls_and_labels["labels"]:
-            keyboard.append(
-                [InlineKeyboardButton(label, callback_data=f"label:{label}")]
-            )
-        keyboard.append(
-            [InlineKeyboardButton("Add New Label", callback_data="new_label")]
-        )
-        keyboard.append([InlineKeyboardButton("Back", callback_data="insert_post")])
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.message.reply_text(
-            "Select a label or add a new one:", reply_markup=reply_markup
-        )
-        return LABEL_SELECTION
+        return await label_selection_menu(update, context)
     else:
         # Adding URL from management menu
-        urls_and_labels["urls"].append(new_url)
-        save_urls_and_labels(urls_and_labels)
-        await update.message.reply_text(f"URL added: {new_url}")
+        if await add_value("urls", new_url):
+            await update.message.reply_text(f"URL added: {new_url}")
+        else:
+            await update.message.reply_text(f"URL already saved: {new_url}")
         return await manage_urls_menu(update, context)
 
 
+@admin_only
 async def handle_new_label(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle new label input"""
     if update.message.text == "/cancel":
-        keyboard = [
-            [InlineKeyboardButton("Manage Admins", callback_data="manage_admins")],
-            [InlineKeyboardButton("Manage URLs & Labels", callback_data="manage_urls")],
-            [InlineKeyboardButton("Insert Post", callback_data="insert_post")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.message.reply_text(
-            "Operation cancelled. Back to main menu:", reply_markup=reply_markup
-        )
-        return MAIN_MENU
+        return await cancel(update, context)
 
     new_label = update.message.text
-    if "adding_new" in context.user_data:
+    adding_to_post = context.user_data.pop("adding_new", None)
+    if adding_to_post and "post_data" in context.user_data:
         # Adding label during post creation
         context.user_data["post_data"]["label"] = new_label
-        urls_and_labels["labels"].append(new_label)
-        save_urls_and_labels(urls_and_labels)
-        keyboard = [
-            [InlineKeyboardButton("Add Text", callback_data="add_text")],
-            [InlineKeyboardButton("Skip Text", callback_data="skip_text")],
-            [InlineKeyboardButton("Back", callback_data="insert_post")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.message.reply_text(
-            "Would you like to add text to your post?", reply_markup=reply_markup
-        )
-        return WAITING_FOR_TEXT
+        await add_value("labels", new_label)
+        return await text_choice_menu(update, context)
     else:
         # Adding label from management menu
-        urls_and_labels["labels"].append(new_label)
-        save_urls_and_labels(urls_and_labels)
-        await update.message.reply_text(f"Label added: {new_label}")
+        if await add_value("labels", new_label):
+            await update.message.reply_text(f"Label added: {new_label}")
+        else:
+            await update.message.reply_text(f"Label already saved: {new_label}")
         return await manage_urls_menu(update, context)
 
 
+@admin_only
 async def handle_url_edit(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle URL editing"""
     if update.message.text == "/cancel":
-        keyboard = [
-            [InlineKeyboardButton("Manage Admins", callback_data="manage_admins")],
-            [InlineKeyboardButton("Manage URLs & Labels", callback_data="manage_urls")],
-            [InlineKeyboardButton("Insert Post", callback_data="insert_post")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.message.reply_text(
-            "Operation cancelled. Back to main menu:", reply_markup=reply_markup
-        )
-        return MAIN_MENU
+        return await cancel(update, context)
 
     new_url = update.message.text
-    old_url = context.user_data["editing_url"]
-    idx = urls_and_labels["urls"].index(old_url)
-    urls_and_labels["urls"][idx] = new_url
-    save_urls_and_labels(urls_and_labels)
+    url_id = context.user_data["editing_url"]
+    old_url = urls_and_labels["urls"].get(url_id)
+    if old_url is None:
+        await update.message.reply_text("That URL no longer exists.")
+        return await view_urls(update, context)
+    try:
+        urls_and_labels["urls"].replace(url_id, new_url)
+    except ValueError:
+        await update.message.reply_text(f"URL already saved: {new_url}")
+        return await view_urls(update, context)
+    await store.replace_value("urls", url_id, new_url)
     await update.message.reply_text(f"URL updated from:\n{old_url}\nto:\n{new_url}")
     return await view_urls(update, context)
 
 
+@admin_only
 async def handle_label_edit(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle label editing"""
     if update.message.text == "/cancel":
-        keyboard = [
-            [InlineKeyboardButton("Manage Admins", callback_data="manage_admins")],
-            [InlineKeyboardButton("Manage URLs & Labels", callback_data="manage_urls")],
-            [InlineKeyboardButton("Insert Post", callback_data="insert_post")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.message.reply_text(
-            "Operation cancelled. Back to main menu:", reply_markup=reply_markup
-        )
-        return MAIN_MENU
+        return await cancel(update, context)
 
     new_label = update.message.text
-    old_label = context.user_data["editing_label"]
-    idx = urls_and_labels["labels"].index(old_label)
-    urls_and_labels["labels"][idx] = new_label
-    save_urls_and_labels(urls_and_labels)
+    label_id = context.user_data["editing_label"]
+    old_label = urls_and_labels["labels"].get(label_id)
+    if old_label is None:
+        await update.message.reply_text("That label no longer exists.")
+        return await view_labels(update, context)
+    try:
+        urls_and_labels["labels"].replace(label_id, new_label)
+    except ValueError:
+        await update.message.reply_text(f"Label already saved: {new_label}")
+        return await view_labels(update, context)
+    await store.replace_value("labels", label_id, new_label)
     await update.message.reply_text(
         f"Label updated from:\n{old_label}\nto:\n{new_label}"
     )
     return await view_labels(update, context)
 
 
-async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle post text input"""
+@admin_only
+async def handle_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Filter the current list by the prefix the user typed"""
+    if update.message.text == "/cancel":
+        return await cancel(update, context)
+
+    kind = context.user_data.pop("searching", "urls")
+    context.user_data[f"search_{kind}"] = update.message.text.strip()
+    return await show_list(update, context)
+
+
+@admin_only
+async def handle_schedule_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Queue the post for the time the user typed"""
     if update.message.text == "/cancel":
-        keyboard = [
-            [InlineKeyboardButton("Manage Admins", callback_data="manage_admins")],
-            [InlineKeyboardButton("Manage URLs & Labels", callback_data="manage_urls")],
-            [InlineKeyboardButton("Insert Post", callback_data="insert_post")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        return await cancel(update, context)
+
+    send_at = parse_send_time(update.message.text)
+    if send_at is None:
+        await update.message.reply_text(
+            "Please send a delay like 30m, 2h or 1d, or a time as YYYY-MM-DD HH:MM."
+        )
+        return WAITING_FOR_SCHEDULE_TIME
+    if send_at <= time.time():
         await update.message.reply_text(
-            "Operation cancelled. Back to main menu:", reply_markup=reply_markup
+            "That time has already passed. Please send a time in the future."
         )
-        return MAIN_MENU
+        return WAITING_FOR_SCHEDULE_TIME
 
-    context.user_data["post_data"]["text"] = update.message.text
-    keyboard = [
-        [InlineKeyboardButton("Add Image", callback_data="add_image")],
-        [InlineKeyboardButton("Skip Image", callback_data="skip_image")],
-        [InlineKeyboardButton("Back", callback_data="insert_post")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text(
-        "Would you like to add an image to your post?", reply_markup=reply_markup
+    post_data = context.user_data.get("post_data")
+    if not post_data:
+        # The draft was sent or scheduled already
+        return ConversationHandler.END
+    post = Post.from_dict(post_data)
+    key = request_key(
+        update.effective_user.id,
+        post_data.get("draft_id"),
+        post.to_dict(),
+        CHANNEL_IDS,
     )
-    return WAITING_FOR_IMAGE
+    if not sent_posts.claim(key):
+        # A repeated message for a draft that is being queued or sent
+        metrics.DUPLICATE_SENDS.inc()
+        return ConversationHandler.END
 
+    await scheduler.schedule(post.to_dict(), send_at)
+    context.user_data.pop("post_data", None)
+    clear_transient(context.user_data)
+    when = datetime.fromtimestamp(send_at).strftime("%Y-%m-%d %H:%M")
+    await update.message.reply_text(f"Post scheduled for {when}.")
+    return ConversationHandler.END
 
-async def handle_image(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle image input"""
-    if update.message.photo:
-        context.user_data["post_data"]["image"] = update.message.photo[-1].file_id
 
-        # Show preview and confirmation buttons
-        post_data = context.user_data["post_data"]
-        preview_text = (
-            f"Preview:\n\nURL: {post_data['url']}\nLabel: {post_data['label']}"
+@admin_only
+async def handle_template_values(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Render the chosen template with the placeholder values the user sent"""
+    if update.message.text == "/cancel":
+        return await cancel(update, context)
+
+    template = templates.get(context.user_data.get("template_id"))
+    if template is None:
+        await update.message.reply_text("That template no longer exists.")
+        return await insert_post(update, context)
+    # Values sent so far; a reply may give only the ones still missing
+    values = context.user_data.setdefault("template_values", {})
+    if len(template.variables) == 1:
+        (name,) = template.variables
+        values[name] = update.message.text.strip()
+    else:
+        for line in update.message.text.splitlines():
+            name, sep, value = line.partition("=")
+            if sep:
+                values[name.strip()] = value.strip()
+    missing = template.missing(values)
+    if missing:
+        await update.message.reply_text(template_values_prompt(template, missing))
+        return WAITING_FOR_TEMPLATE_VALUES
+    context.user_data.pop("template_id", None)
+    context.user_data.pop("template_values", None)
+    return await apply_template(update, context, template, values)
+
+
+@admin_only
+async def handle_template_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Save the previewed post as a template"""
+    if update.message.text == "/cancel":
+        return await cancel(update, context)
+
+    post = Post.from_dict(context.user_data.get("post_data", {}))
+    try:
+        template = Template(
+            update.message.text.strip(),
+            post.text,
+            post.url,
+            post.label,
+            post.images,
         )
-        if post_data.get("text"):
-            preview_text += f"\nText: {post_data['text']}"
+    except TemplateError as e:
+        await update.message.reply_text(f"Could not save the template: {e}")
+        return await confirm_menu(update, context)
+    template_id = await store.save_template(template.to_dict())
+    # Saving under an existing name replaces that template
+    for other_id, other in list(templates.items()):
+        if other.name == template.name:
+            del templates[other_id]
+    templates[template_id] = template
+    await update.message.reply_text(f'Template "{template.name}" saved.')
+    return await confirm_menu(update, context)
+
+
+@admin_only
+async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle post text input"""
+    if update.message.text == "/cancel":
+        return await cancel(update, context)
 
-        keyboard = [
-            [InlineKeyboardButton("Confirm & Send", callback_data="confirm_post")],
-            [InlineKeyboardButton("Cancel", callback_data="cancel_post")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+    context.user_data["post_data"]["text"] = update.message.text
+    return await image_choice_menu(update, context)
 
-        await update.message.reply_text(preview_text, reply_markup=reply_markup)
-        return CONFIRM_POST
+
+@admin_only
+async def handle_image(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle image input; an album arrives as one message per image"""
+    if update.message.photo:
+        images = context.user_data["post_data"].setdefault("images", [])
+        if len(images) >= MAX_ALBUM_SIZE:
+            if not update.message.media_group_id:
+                await update.message.reply_text(
+                    f"A post can have at most {MAX_ALBUM_SIZE} images."
+                )
+            return CONFIRM_POST
+        images.append(update.message.photo[-1].file_id)
+
+        if update.message.media_group_id:
+            # Wait for the rest of the album before showing the preview
+            show_album_preview(update, context)
+            return CONFIRM_POST
+
+        # Show preview and confirmation buttons
+        return await confirm_menu(update, context)
     else:
         await update.message.reply_text("Please send an image file.")
         return WAITING_FOR_IMAGE
 
 
+def show_album_preview(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show the preview once no album image has arrived for ALBUM_SETTLE_DELAY"""
+    user_id = update.effective_user.id
+    previous = album_previews.pop(user_id, None)
+    if previous is not None:
+        previous.cancel()
+
+    async def preview():
+        await asyncio.sleep(ALBUM_SETTLE_DELAY)
+        del album_previews[user_id]
+        await update.message.reply_text(
+            preview_text(context.user_data.get("post_data", {})),
+            reply_markup=CONFIRM_POST_KEYBOARD,
+        )
+
+    album_previews[user_id] = asyncio.create_task(preview())
+
+
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Cancel current operation and return to main menu"""
-    keyboard = [
-        [InlineKeyboardButton("Manage Admins", callback_data="manage_admins")],
-        [InlineKeyboardButton("Manage URLs & Labels", callback_data="manage_urls")],
-        [InlineKeyboardButton("Insert Post", callback_data="insert_post")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    clear_transient(context.user_data)
     await update.message.reply_text(
-        "Operation cancelled. Back to main menu:", reply_markup=reply_markup
+        "Operation cancelled. Back to main menu:", reply_markup=MAIN_MENU_KEYBOARD
     )
     return MAIN_MENU
 
@@ -685,16 +1297,26 @@ Features:
    - Add/Edit/Delete URLs
    - Add/Edit/Delete Labels
    - View all URLs and Labels
+   - Long lists are split into pages; use 🔍 Search to filter by prefix
 
 3. Create Posts (Admins):
+   - Start from a saved template or from scratch
    - Select or add new URL
    - Select or add new Label
-   - Optional text and image
+   - Optional text and an image or an album of up to 10 images
    - Preview before posting
+   - Send now or 🕒 Schedule for later (30m, 2h, 1d or YYYY-MM-DD HH:MM)
+   - 💾 Save the post as a template; {name} placeholders are asked for on use
 """
     await update.message.reply_text(help_text)
 
 
+async def on_error(update: object, context: ContextTypes.DEFAULT_TYPE):
+    """Count and log exceptions raised by handlers"""
+    metrics.ERRORS.inc("handler", type(context.error).__name__)
+    logger.error("Exception while handling an update", exc_info=context.error)
+
+
 async def post_init(application: Application):
     """Set up bot commands"""
     commands = [
@@ -704,55 +1326,231 @@ async def post_init(application: Application):
     ]
     await application.bot.set_my_commands(commands)
 
+    # Send scheduled posts when they are due
+    scheduler.start(lambda post: send_scheduled_post(application.bot, post))
+    await permissions.start()
 
-def main():
-    """Start the bot"""
-    # Create application
-    application = Application.builder().token(os.getenv("BOT_TOKEN")).build()
+    processor = application.update_processor
+    metrics.UPDATE_QUEUE_DEPTH.set_function(
+        lambda: application.update_queue.qsize() + getattr(processor, "waiting", 0)
+    )
+    metrics.UPDATES_IN_PROGRESS.set_function(
+        lambda: processor.current_concurrent_updates
+    )
+    metrics.SCHEDULED_POSTS.set_function(lambda: len(scheduler))
+    if metrics_server is not None:
+        await metrics_server.start()
+
+
+async def post_stop(application: Application):
+    """Let scheduled posts going out finish while the bot can still send"""
+    await scheduler.stop()
+
+
+async def post_shutdown(application: Application):
+    """Stop background tasks and flush pending storage writes"""
+    if metrics_server is not None:
+        await metrics_server.stop()
+    await permissions.stop()
+    store.close()
+
+
+def build_application(builder=None, workers=1, metrics_port=None, metrics_listen=None):
+    """Create the application and register all handlers"""
+    global metrics_server
+    if builder is None:
+        # Flood waits and transient network errors are retried transparently
+        builder = (
+            Application.builder()
+            .token(os.getenv("BOT_TOKEN"))
+            .request(RetryingRequest())
+        )
+    # Drafts and conversation states are saved to the store
+    builder = builder.persistence(SQLitePersistence(store))
+    if workers > 1:
+        # Handle different users in parallel, each user's updates in order
+        builder = builder.concurrent_updates(PerUserUpdateProcessor(workers))
+    application = builder.build()
+    if metrics_port:
+        metrics_server = metrics.MetricsServer(
+            metrics.REGISTRY, metrics_listen or "127.0.0.1", metrics_port
+        )
+
+    # Every handler's latency is recorded; buttons also per routed callback
+    buttons = CallbackQueryHandler(metrics.timed(button_handler))
 
     # Add conversation handler
     conv_handler = ConversationHandler(
-        entry_points=[CommandHandler("start", start)],
+        entry_points=[CommandHandler("start", metrics.timed(start))],
         states={
-            MAIN_MENU: [CallbackQueryHandler(button_handler)],
-            ADMIN_MENU: [CallbackQueryHandler(button_handler)],
+            MAIN_MENU: [buttons],
+            ADMIN_MENU: [buttons],
             WAITING_FOR_ADMIN_ID: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_admin_id)
+                MessageHandler(
+                    filters.TEXT & ~filters.COMMAND, metrics.timed(handle_admin_id)
+                )
             ],
-            MANAGE_URLS: [CallbackQueryHandler(button_handler)],
+            MANAGE_URLS: [buttons],
             ADD_NEW_URL: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_new_url)
+                MessageHandler(
+                    filters.TEXT & ~filters.COMMAND, metrics.timed(handle_new_url)
+                )
             ],
             ADD_NEW_LABEL: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_new_label)
+                MessageHandler(
+                    filters.TEXT & ~filters.COMMAND, metrics.timed(handle_new_label)
+                )
             ],
             WAITING_FOR_URL_EDIT: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_url_edit)
+                MessageHandler(
+                    filters.TEXT & ~filters.COMMAND, metrics.timed(handle_url_edit)
+                )
             ],
             WAITING_FOR_LABEL_EDIT: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_label_edit)
+                MessageHandler(
+                    filters.TEXT & ~filters.COMMAND, metrics.timed(handle_label_edit)
+                )
+            ],
+            WAITING_FOR_SCHEDULE_TIME: [
+                MessageHandler(
+                    filters.TEXT & ~filters.COMMAND, metrics.timed(handle_schedule_time)
+                )
+            ],
+            WAITING_FOR_SEARCH: [
+                MessageHandler(
+                    filters.TEXT & ~filters.COMMAND, metrics.timed(handle_search)
+                )
+            ],
+            TEMPLATE_SELECTION: [buttons],
+            WAITING_FOR_TEMPLATE_VALUES: [
+                MessageHandler(
+                    filters.TEXT & ~filters.COMMAND,
+                    metrics.timed(handle_template_values),
+                )
+            ],
+            WAITING_FOR_TEMPLATE_NAME: [
+                MessageHandler(
+                    filters.TEXT & ~filters.COMMAND,
+                    metrics.timed(handle_template_name),
+                )
             ],
-            URL_SELECTION: [CallbackQueryHandler(button_handler)],
-            LABEL_SELECTION: [CallbackQueryHandler(button_handler)],
+            URL_SELECTION: [buttons],
+            LABEL_SELECTION: [buttons],
             WAITING_FOR_TEXT: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text)
+                buttons,
+                MessageHandler(
+                    filters.TEXT & ~filters.COMMAND, metrics.timed(handle_text)
+                ),
             ],
             WAITING_FOR_IMAGE: [
-                MessageHandler(filters.PHOTO | filters.TEXT, handle_image)
+                buttons,
+                MessageHandler(
+                    filters.PHOTO | filters.TEXT, metrics.timed(handle_image)
+                ),
+            ],
+            CONFIRM_POST: [
+                buttons,
+                MessageHandler(filters.PHOTO, metrics.timed(handle_image)),
             ],
-            CONFIRM_POST: [CallbackQueryHandler(button_handler)],
         },
-        fallbacks=[CommandHandler("cancel", cancel)],
+        fallbacks=[CommandHandler("cancel", metrics.timed(cancel))],
+        # Conversation states survive restarts, see SQLitePersistence; /start
+        # still leads back to the main menu from whatever state was saved
+        allow_reentry=True,
+        name="post_buddy",
+        persistent=True,
     )
 
     application.add_handler(conv_handler)
-    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("help", metrics.timed(help_command)))
+    application.add_error_handler(on_error)
 
     # Set up commands
     application.post_init = post_init
+    application.post_stop = post_stop
+    application.post_shutdown = post_shutdown
+
+    return application
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Telegram Post Buddy bot")
+    parser.add_argument(
+        "--webhook",
+        action="store_true",
+        help="receive updates through a webhook instead of long polling",
+    )
+    parser.add_argument(
+        "--listen",
+        default=os.getenv("WEBHOOK_LISTEN", "127.0.0.1"),
+        help="address the webhook server binds to",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=int(os.getenv("WEBHOOK_PORT", "8443")),
+        help="port the webhook server listens on",
+    )
+    parser.add_argument(
+        "--url-path",
+        default=os.getenv("WEBHOOK_PATH", "telegram"),
+        help="path of the webhook endpoint",
+    )
+    parser.add_argument(
+        "--webhook-url",
+        default=os.getenv("WEBHOOK_URL"),
+        help="public URL Telegram should post updates to (e.g. behind a reverse proxy)",
+    )
+    parser.add_argument(
+        "--secret-token",
+        default=os.getenv("WEBHOOK_SECRET"),
+        help="value Telegram must send in the X-Telegram-Bot-Api-Secret-Token "
+        "header; a random one is generated when omitted",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WORKERS", "8")),
+        help="number of updates processed concurrently (1 disables concurrency)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=int(os.getenv("METRICS_PORT", "0")),
+        help="serve Prometheus metrics on this port at /metrics (0 disables)",
+    )
+    parser.add_argument(
+        "--metrics-listen",
+        default=os.getenv("METRICS_LISTEN", "127.0.0.1"),
+        help="address the metrics server binds to",
+    )
+    return parser.parse_args(argv)
+
+
+def main():
+    """Start the bot"""
+    args = parse_args()
+    if not CHANNEL_IDS:
+        logger.warning(NO_CHANNELS_TEXT)
+    application = build_application(
+        workers=args.workers,
+        metrics_port=args.metrics_port,
+        metrics_listen=args.metrics_listen,
+    )
 
     # Start the bot
-    application.run_polling()
+    if args.webhook:
+        # Requests without the matching secret token header are rejected
+        application.run_webhook(
+            listen=args.listen,
+            port=args.port,
+            url_path=args.url_path,
+            webhook_url=args.webhook_url,
+            secret_token=args.secret_token or secrets.token_urlsafe(32),
+        )
+    else:
+        application.run_polling()
 
 
 if __name__ == "__main__":
@@ -1,95 +1,142 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from PIL import Image, ImageTk
-from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
-import asyncio
-import os
-from dotenv import load_dotenv
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from post_buddy.desktop import DesktopSender, load_env_form, load_templates
+from post_buddy.post import MAX_ALBUM_SIZE, Post
+from post_buddy.thumbnails import ThumbnailCache
 
-# Initialize global variable for the image file path
-image_path = None
+# Initialize global variable for the image file paths (several make an album)
+image_paths = []
 
 
 # Load environment variables from .env file if selected
 def load_env_variables():
-    load_dotenv()
+    values = load_env_form()
     token_input.delete(0, tk.END)
     channel_input.delete(0, tk.END)
     mini_app_input.delete(0, tk.END)
     button_label_input.delete(0, tk.END)
-    token_input.insert(0, os.getenv("BOT_TOKEN", ""))
-    channel_input.insert(0, os.getenv("CHANNEL_NAME", ""))
-    mini_app_input.insert(0, os.getenv("MINI_APP_URL", ""))
-    button_label_input.insert(0, os.getenv("BUTTON_LABEL", "Open Mini App"))
+    token_input.insert(0, values["token"])
+    channel_input.insert(0, values["channel"])
+    mini_app_input.insert(0, values["url"])
+    button_label_input.insert(0, values["label"])
     messagebox.showinfo("Info", "Loaded credentials from .env file.")
 
 
-# Function to send the message, image, and inline button
-async def async_send_message(token, channel, message, mini_app_url, button_label):
-    try:
-        bot = Bot(token=token)
-
-        # Create inline button for the mini app
-        reply_markup = InlineKeyboardMarkup(
-            [[InlineKeyboardButton(button_label, url=mini_app_url)]]
+# Fill the form from a template; its {placeholders} are left to be replaced
+def use_template(name):
+    template = templates[name]
+    text_input.delete("1.0", tk.END)
+    text_input.insert("1.0", template.text)
+    if template.url:
+        mini_app_input.delete(0, tk.END)
+        mini_app_input.insert(0, template.url)
+    if template.label:
+        button_label_input.delete(0, tk.END)
+        button_label_input.insert(0, template.label)
+    if template.variables:
+        status_label.config(
+            text="Replace "
+            + ", ".join(f"{{{name}}}" for name in sorted(template.variables))
         )
 
-        if image_path:
-            with open(image_path, "rb") as photo:
-                await bot.send_photo(
-                    chat_id=channel,
-                    photo=photo,
-                    caption=message,
-                    reply_markup=reply_markup,
-                )
-        else:
-            await bot.send_message(
-                chat_id=channel, text=message, reply_markup=reply_markup
-            )
-
-        messagebox.showinfo("Success", "Message sent successfully!")
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to send message: {e}")
-
 
 def send_message():
-    global image_path
     token = token_input.get().strip()
-    channel = channel_input.get().strip()
-    message = text_input.get("1.0", tk.END).strip()
-    mini_app_url = mini_app_input.get().strip()
-    button_label = button_label_input.get().strip()
+    # Capture the images as they are now; the form may change while queued
+    post = Post(
+        channel=channel_input.get().strip(),
+        text=text_input.get("1.0", tk.END).strip(),
+        url=mini_app_input.get().strip(),
+        label=button_label_input.get().strip(),
+        images=list(image_paths),
+    )
 
-    if not token or not channel or not message or not mini_app_url or not button_label:
+    if not token or post.missing():
         messagebox.showerror(
             "Error",
             "Bot Token, Channel Name, Message, Mini App URL, and Button Label are required!",
         )
         return
 
-    # Run the async send message function
-    asyncio.run(async_send_message(token, channel, message, mini_app_url, button_label))
+    # Hand the send to the worker thread
+    job_id = post_sender.submit(token, post)
+    status_label.config(text=f"Message {job_id} queued")
+
+
+# Show worker updates; Tk is not thread-safe, so they are polled from the UI thread
+def poll_send_updates():
+    while True:
+        try:
+            job_id, status, detail = send_updates.get_nowait()
+        except queue.Empty:
+            break
+        if status == "sending":
+            status_label.config(text=f"Sending message {job_id}...")
+        elif status == "progress":
+            sent, total = detail
+            status_label.config(
+                text=f"Uploading message {job_id}: {sent * 100 // max(total, 1)}%"
+            )
+        elif status == "sent":
+            status_label.config(text=f"Message {job_id} sent")
+            messagebox.showinfo("Success", "Message sent successfully!")
+        else:
+            status_label.config(text=f"Message {job_id} failed")
+            messagebox.showerror("Error", f"Failed to send message: {detail}")
+    root.after(100, poll_send_updates)
+
+
+# Let queued sends finish before closing the window
+def on_close():
+    post_sender.stop(timeout=10)
+    root.destroy()
 
 
-# Function to upload an image
+# Function to upload one image, or several to send as an album
 def upload_image():
-    global image_path
-    image_path = filedialog.askopenfilename(
+    global image_paths
+    paths = filedialog.askopenfilenames(
         filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.gif")]
     )
-    if image_path:
-        # Load and display the selected image
-        img = Image.open(image_path)
-        img.thumbnail((150, 150))  # Resize the image for display
-        img = ImageTk.PhotoImage(img)
-        image_label.config(image=img)
-        image_label.image = img
-        image_label.pack(pady=10)
+    if not paths:
+        return
+    if len(paths) > MAX_ALBUM_SIZE:
+        messagebox.showwarning(
+            "Warning", f"Only the first {MAX_ALBUM_SIZE} images will be sent."
+        )
+    image_paths = list(paths[:MAX_ALBUM_SIZE])
+    status_label.config(
+        text=f"{len(image_paths)} images (album)" if len(image_paths) > 1 else ""
+    )
+    # Build the preview on a worker thread and show it once it is ready
+    show_preview(
+        image_paths[0], preview_executor.submit(thumbnails.get, image_paths[0])
+    )
+
+
+# Display a finished thumbnail, checking back until the worker is done
+def show_preview(path, future):
+    if not future.done():
+        root.after(20, show_preview, path, future)
+        return
+    if not image_paths or path != image_paths[0]:
+        # Another image was picked in the meantime
+        return
+    try:
+        img = tk.PhotoImage(file=future.result())
+    except Exception as e:
+        messagebox.showerror("Error", f"Failed to load image: {e}")
+        return
+    image_label.config(image=img)
+    image_label.image = img
+    image_label.pack(pady=10)
 
 
 # Function to clear all inputs
 def clear_inputs():
-    global image_path
+    global image_paths
     token_input.delete(0, tk.END)
     channel_input.delete(0, tk.END)
     text_input.delete("1.0", tk.END)
@@ -97,68 +144,94 @@ def clear_inputs():
     button_label_input.delete(0, tk.END)
     image_label.config(image="")
     image_label.image = None
-    image_path = None
-
-
-# Set up the Tkinter GUI
-root = tk.Tk()
-root.title("Telegram Mini App Sender")
-root.geometry("400x800")
-
-# Button to load credentials from .env
-env_button = tk.Button(
-    root, text="Load from .env File", font=("Arial", 12), command=load_env_variables
-)
-env_button.pack(pady=5)
-
-# Input for Telegram Bot Token
-tk.Label(root, text="Telegram Bot Token:", font=("Arial", 12)).pack(pady=5)
-token_input = tk.Entry(root, width=40, font=("Arial", 12))
-token_input.pack(pady=5)
-
-# Input for Telegram Channel Name
-tk.Label(root, text="Telegram Channel Name (@channel):", font=("Arial", 12)).pack(
-    pady=5
-)
-channel_input = tk.Entry(root, width=40, font=("Arial", 12))
-channel_input.pack(pady=5)
-
-# Input for Telegram Mini App URL
-tk.Label(root, text="Telegram Mini App URL:", font=("Arial", 12)).pack(pady=5)
-mini_app_input = tk.Entry(root, width=40, font=("Arial", 12))
-mini_app_input.pack(pady=5)
-
-# Input for Button Label
-tk.Label(root, text="Mini App Button Label:", font=("Arial", 12)).pack(pady=5)
-button_label_input = tk.Entry(root, width=40, font=("Arial", 12))
-button_label_input.pack(pady=5)
-
-# Label and Textbox for Message
-tk.Label(root, text="Write Your Message:", font=("Arial", 12)).pack(pady=5)
-text_input = tk.Text(root, wrap="word", height=10, width=40)
-text_input.pack(pady=5)
-
-# Button to upload an image
-upload_button = tk.Button(
-    root, text="Upload Image", font=("Arial", 12), command=upload_image
-)
-upload_button.pack(pady=5)
-
-# Label for displaying the selected image
-image_label = tk.Label(root)
-image_label.pack()
-
-# Send button
-send_button = tk.Button(
-    root, text="Send Message", font=("Arial", 12), command=send_message
-)
-send_button.pack(pady=10)
-
-# Clear inputs button
-clear_button = tk.Button(
-    root, text="Clear Inputs", font=("Arial", 12), command=clear_inputs
-)
-clear_button.pack(pady=5)
-
-# Run the GUI application
-root.mainloop()
+    image_paths = []
+
+
+if __name__ == "__main__":
+    # Set up here rather than on import: the processes spawned for image
+    # preprocessing import this script again
+
+    # Image previews, decoded at reduced size off the UI thread and kept on disk
+    thumbnails = ThumbnailCache((150, 150))
+    preview_executor = ThreadPoolExecutor(max_workers=1)
+
+    # Sends run on a background thread with one long-lived Bot per token; its
+    # progress updates are queued here and picked up by poll_send_updates
+    send_updates = queue.Queue()
+    post_sender = DesktopSender(lambda *update: send_updates.put(update))
+
+    # Templates saved in the bot, by name
+    templates = load_templates()
+
+    # Set up the Tkinter GUI
+    root = tk.Tk()
+    root.title("Telegram Mini App Sender")
+    root.geometry("400x800")
+
+    # Button to load credentials from .env
+    env_button = tk.Button(
+        root, text="Load from .env File", font=("Arial", 12), command=load_env_variables
+    )
+    env_button.pack(pady=5)
+
+    # Input for Telegram Bot Token
+    tk.Label(root, text="Telegram Bot Token:", font=("Arial", 12)).pack(pady=5)
+    token_input = tk.Entry(root, width=40, font=("Arial", 12))
+    token_input.pack(pady=5)
+
+    # Input for Telegram Channel Name
+    tk.Label(root, text="Telegram Channel Name (@channel):", font=("Arial", 12)).pack(
+        pady=5
+    )
+    channel_input = tk.Entry(root, width=40, font=("Arial", 12))
+    channel_input.pack(pady=5)
+
+    # Input for Telegram Mini App URL
+    tk.Label(root, text="Telegram Mini App URL:", font=("Arial", 12)).pack(pady=5)
+    mini_app_input = tk.Entry(root, width=40, font=("Arial", 12))
+    mini_app_input.pack(pady=5)
+
+    # Input for Button Label
+    tk.Label(root, text="Mini App Button Label:", font=("Arial", 12)).pack(pady=5)
+    button_label_input = tk.Entry(root, width=40, font=("Arial", 12))
+    button_label_input.pack(pady=5)
+
+    # Label and Textbox for Message
+    tk.Label(root, text="Write Your Message:", font=("Arial", 12)).pack(pady=5)
+    if templates:
+        template_choice = tk.StringVar(value="Use a template...")
+        tk.OptionMenu(root, template_choice, *templates, command=use_template).pack()
+    text_input = tk.Text(root, wrap="word", height=10, width=40)
+    text_input.pack(pady=5)
+
+    # Button to upload an image
+    upload_button = tk.Button(
+        root, text="Upload Image", font=("Arial", 12), command=upload_image
+    )
+    upload_button.pack(pady=5)
+
+    # Label for displaying the selected image
+    image_label = tk.Label(root)
+    image_label.pack()
+
+    # Send button
+    send_button = tk.Button(
+        root, text="Send Message", font=("Arial", 12), command=send_message
+    )
+    send_button.pack(pady=10)
+
+    # Progress of queued sends
+    status_label = tk.Label(root, text="", font=("Arial", 10))
+    status_label.pack()
+
+    # Clear inputs button
+    clear_button = tk.Button(
+        root, text="Clear Inputs", font=("Arial", 12), command=clear_inputs
+    )
+    clear_button.pack(pady=5)
+
+    # Run the GUI application
+    post_sender.start()
+    root.after(100, poll_send_updates)
+    root.protocol("WM_DELETE_WINDOW", on_close)
+    root.mainloop()